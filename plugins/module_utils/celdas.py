@@ -0,0 +1,131 @@
+# -*- coding: utf-8 -*-
+
+"""
+Interpretación de direcciones de Excel compartida por los módulos leer_excel y mod_excel.
+
+Acepta notación A1 completa (columnas de varias letras hasta XFD), anclas C($), referencias
+con hoja (C(Hoja!A1:B5), C('Hoja con espacios'!A1)) y rangos con nombre definidos en el libro.
+La conversión entre letras e índices de columna usa una tabla que se calcula una sola vez.
+"""
+
+import re
+from itertools import product
+from string import ascii_uppercase
+
+MAX_COLUMNAS = 16384
+MAX_FILAS = 1048576
+
+PATRON_CELDA = re.compile(r'^\$?([A-Za-z]{1,3})\$?([0-9]+)$')
+
+_letras_columnas = []
+_indices_columnas = {}
+
+def tabla_columnas():
+    """Retorna las letras de todas las columnas (índice 1 en la posición 0) y el índice de cada letra."""
+
+    if not _letras_columnas:
+        for largo in (1, 2, 3):
+            for letras in product(ascii_uppercase, repeat=largo):
+                _letras_columnas.append(''.join(letras))
+                if len(_letras_columnas) == MAX_COLUMNAS:
+                    break
+        _indices_columnas.update((letras, indice) for indice, letras in enumerate(_letras_columnas, start=1))
+
+    return _letras_columnas, _indices_columnas
+
+def indice_columna(letras):
+    """Índice (desde 1) de la columna C(letras), por ejemplo C(AB) -> 28."""
+
+    indice = tabla_columnas()[1].get(letras.upper())
+    if indice is None:
+        raise ValueError(f"Columna inválida: '{letras}'")
+    return indice
+
+def letra_columna(indice):
+    """Letras de la columna C(indice), por ejemplo 28 -> C(AB)."""
+
+    if not 1 <= indice <= MAX_COLUMNAS:
+        raise ValueError(f"Columna fuera de rango: {indice}")
+    return tabla_columnas()[0][indice - 1]
+
+def parsear_celda(celda):
+    """Retorna (fila, columna) de una celda en notación A1, por ejemplo C($AB$34) -> (34, 28)."""
+
+    coincidencia = PATRON_CELDA.match(celda.strip())
+    if not coincidencia:
+        raise ValueError(f"Celda inválida: '{celda}'")
+
+    fila = int(coincidencia.group(2))
+    if not 1 <= fila <= MAX_FILAS:
+        raise ValueError(f"Fila fuera de rango en la celda '{celda}'")
+
+    return fila, indice_columna(coincidencia.group(1))
+
+def separar_hoja(referencia):
+    """Separa C(Hoja!A1:B5) en (hoja, A1:B5). La hoja es None si la referencia no la indica."""
+
+    referencia = referencia.strip()
+    if '!' not in referencia:
+        return None, referencia
+
+    hoja, _, direccion = referencia.rpartition('!')
+    if len(hoja) >= 2 and hoja[0] == hoja[-1] == "'":
+        hoja = hoja[1:-1].replace("''", "'")
+
+    return hoja, direccion
+
+def parsear_rango(referencia):
+    """Interpreta C(A1), C(A1:B5) o C(Hoja!$A$1:$B$5).
+
+    Retorna un diccionario con C(hoja) (None si no se indica), C(fila_inicial), C(columna_inicial),
+    C(fila_final) y C(columna_final). Como en Excel, un rango invertido (C(C3:A1)) equivale a C(A1:C3).
+    """
+
+    hoja, direccion = separar_hoja(referencia)
+    inicio, _, fin = direccion.partition(':')
+
+    fila_a, columna_a = parsear_celda(inicio)
+    fila_b, columna_b = parsear_celda(fin) if fin else (fila_a, columna_a)
+
+    return {
+        'hoja': hoja,
+        'fila_inicial': min(fila_a, fila_b),
+        'columna_inicial': min(columna_a, columna_b),
+        'fila_final': max(fila_a, fila_b),
+        'columna_final': max(columna_a, columna_b),
+    }
+
+def buscar_nombre(libro, nombre, hoja=None):
+    """Busca un rango con nombre, primero en la hoja indicada y luego en el libro."""
+
+    if hoja and hoja in libro.sheetnames:
+        definido = getattr(libro[hoja], 'defined_names', {}).get(nombre)
+        if definido is not None:
+            return definido
+
+    return libro.defined_names.get(nombre)
+
+def resolver_rango(libro, referencia, hoja=None):
+    """Interpreta una referencia que puede ser un rango con nombre del libro o una dirección A1.
+
+    Si la referencia no indica hoja se usa C(hoja), que puede ser None.
+    """
+
+    definido = buscar_nombre(libro, referencia.strip(), hoja)
+
+    if definido is not None:
+        destinos = list(definido.destinations)
+        if not destinos:
+            raise ValueError(f"El nombre '{referencia}' no corresponde a un rango de celdas.")
+        hoja_destino, direccion = destinos[0]
+        rango = parsear_rango(direccion)
+        rango['hoja'] = hoja_destino
+        return rango
+
+    try:
+        rango = parsear_rango(referencia)
+    except ValueError:
+        raise ValueError(f"'{referencia}' no es una dirección válida ni un rango con nombre del libro.")
+
+    rango['hoja'] = rango['hoja'] or hoja
+    return rango
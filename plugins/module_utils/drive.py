@@ -0,0 +1,372 @@
+# -*- coding: utf-8 -*-
+
+"""
+Cliente HTTP para la API v3 de Google Drive, compartido por los módulos drive_*.
+
+Usa solo la librería estándar. Cada hilo mantiene sus propias conexiones persistentes por host,
+por lo que las peticiones sucesivas de un hilo reutilizan la misma conexión TLS en lugar de abrir
+una por archivo. Como C(uri) y C(get_url), respeta C(https_proxy)/C(http_proxy) y C(no_proxy), y
+C(validate_certs). Los errores transitorios (429, 5xx, límites de cuota y conexiones cortadas) se
+reintentan con espera exponencial.
+"""
+
+import base64
+import http.client
+import json
+import random
+import re
+import ssl
+import threading
+import time
+import uuid
+from urllib.parse import quote, unquote, urlencode, urlsplit
+from urllib.request import getproxies, proxy_bypass
+
+URL_API = 'https://www.googleapis.com'
+TIPO_CARPETA = 'application/vnd.google-apps.folder'
+
+ESTADOS_REINTENTABLES = {429, 500, 502, 503, 504}
+RAZONES_CUOTA = {'rateLimitExceeded', 'userRateLimitExceeded'}
+ESPERA_MAXIMA = 64
+TAMANO_PAGINA = 1000
+MAXIMO_LOTE = 100
+
+ERRORES_CONEXION = (http.client.HTTPException, OSError)
+
+class ErrorDrive(Exception):
+    """Error de la API de Drive; C(estado) es el código HTTP o None si falló la conexión."""
+
+    def __init__(self, mensaje, estado=None):
+        super().__init__(mensaje)
+        self.estado = estado
+
+class Respuesta:
+    """Respuesta ya leída: código, encabezados (en minúsculas) y cuerpo en bytes."""
+
+    def __init__(self, estado, encabezados, cuerpo):
+        self.estado = estado
+        self.encabezados = encabezados
+        self.cuerpo = cuerpo
+
+    def json(self):
+        return json.loads(self.cuerpo) if self.cuerpo else {}
+
+def razon_error(cuerpo):
+    """Extrae la razón (C(rateLimitExceeded), C(notFound), ...) del cuerpo de error de la API."""
+
+    try:
+        error = json.loads(cuerpo).get('error', {})
+        return (error.get('errors') or [{}])[0].get('reason') or error.get('status')
+    except (ValueError, AttributeError, TypeError):
+        return None
+
+def mensaje_error(estado, cuerpo):
+    try:
+        mensaje = json.loads(cuerpo)['error']['message']
+    except (ValueError, KeyError, TypeError):
+        mensaje = cuerpo.decode('utf-8', 'replace')[:200] if isinstance(cuerpo, bytes) else str(cuerpo)
+    return f"HTTP {estado}: {mensaje}"
+
+def es_reintentable(estado, cuerpo):
+    """Indica si la respuesta es un error transitorio: 429, 5xx o un 403 por límite de cuota."""
+
+    return estado in ESTADOS_REINTENTABLES or (estado == 403 and razon_error(cuerpo) in RAZONES_CUOTA)
+
+def escapar_q(valor):
+    """Escapa un valor para usarlo entre comillas simples en el parámetro C(q) de la API."""
+
+    return valor.replace('\\', '\\\\').replace("'", "\\'")
+
+def consulta_nombres(nombres):
+    """Consulta C(q) que selecciona archivos por nombre exacto (C(name = 'a' or name = 'b' ...))."""
+
+    return ' or '.join(f"name = '{escapar_q(nombre)}'" for nombre in nombres)
+
+def encabezados_proxy(proxy):
+    """Encabezado C(Proxy-Authorization) para las credenciales incluidas en la URL del proxy, si las hay."""
+
+    if proxy.username is None:
+        return {}
+    credenciales = f"{unquote(proxy.username)}:{unquote(proxy.password or '')}".encode('utf-8')
+    return {'Proxy-Authorization': f"Basic {base64.b64encode(credenciales).decode('ascii')}"}
+
+def partir(datos):
+    """Separa el bloque de encabezados del cuerpo en un mensaje HTTP o una parte MIME."""
+
+    partes = re.split(rb'\r?\n\r?\n', datos, maxsplit=1)
+    return partes[0], partes[1] if len(partes) > 1 else b''
+
+def leer_lote(respuesta):
+    """Separa la respuesta C(multipart/mixed) del endpoint batch. Retorna {Content-ID: Respuesta}."""
+
+    separador = re.search(r'boundary="?([^";]+)"?', respuesta.encabezados.get('content-type', ''))
+    if not separador:
+        raise ErrorDrive("La respuesta del lote no es multipart/mixed.", respuesta.estado)
+
+    respuestas = {}
+    for parte in respuesta.cuerpo.split(b'--' + separador.group(1).encode('ascii'))[1:]:
+        if parte.startswith(b'--'):
+            break
+
+        cabecera, http = partir(parte.lstrip(b'\r\n'))
+        encabezados_http, cuerpo = partir(http)
+        lineas = re.split(rb'\r?\n', encabezados_http)
+        identificador = re.search(rb'content-id:\s*<?response-([^>\s]+)', cabecera, re.IGNORECASE)
+        if not identificador or not lineas[0].startswith(b'HTTP/'):
+            continue
+
+        encabezados = {}
+        for linea in lineas[1:]:
+            clave, separado, valor = linea.decode('latin-1').partition(':')
+            if separado:
+                encabezados[clave.strip().lower()] = valor.strip()
+
+        respuestas[identificador.group(1).decode('ascii')] = Respuesta(
+            int(lineas[0].split()[1]), encabezados, cuerpo.rstrip(b'\r\n')
+        )
+
+    return respuestas
+
+class ClienteDrive:
+    """Cliente de la API de Drive autenticado con un access token."""
+
+    def __init__(self, access_token, url_api=URL_API, reintentos=5, espera=1.0, timeout=120, validate_certs=True):
+        self.access_token = access_token
+        self.url_api = url_api.rstrip('/')
+        self.reintentos = reintentos
+        self.espera = espera
+        self.timeout = timeout
+        self.contexto = ssl.create_default_context()
+        if not validate_certs:
+            self.contexto.check_hostname = False
+            self.contexto.verify_mode = ssl.CERT_NONE
+        self.local = threading.local()
+        self.bloqueo = threading.Lock()
+        self.conexiones_hilos = []
+
+    def url(self, ruta, **parametros):
+        """Arma la URL de C(ruta) en la API con los parámetros indicados (se omiten los None)."""
+
+        parametros = {clave: valor for clave, valor in parametros.items() if valor is not None}
+        return f"{self.url_api}{ruta}" + (f"?{urlencode(parametros)}" if parametros else '')
+
+    def conexion(self, esquema, host):
+        """Retorna la conexión persistente del hilo actual para C(host), creándola si no existe."""
+
+        conexiones = self.local.__dict__.get('conexiones')
+        if conexiones is None:
+            conexiones = self.local.conexiones = {}
+            with self.bloqueo:
+                self.conexiones_hilos.append(conexiones)
+
+        conexion = conexiones.get((esquema, host))
+        if conexion is None:
+            conexion = conexiones[(esquema, host)] = self.nueva_conexion(esquema, host)
+        return conexion
+
+    def nueva_conexion(self, esquema, host):
+        """Conecta a C(host) directamente o a través del proxy del entorno, salvo que C(no_proxy) lo excluya.
+
+        Por HTTPS se abre un túnel C(CONNECT) en el proxy; por HTTP las peticiones se envían al proxy con la URL
+        completa (ver C(abrir)).
+        """
+
+        proxy = getproxies().get(esquema)
+        if not proxy or proxy_bypass(host):
+            if esquema == 'https':
+                return http.client.HTTPSConnection(host, timeout=self.timeout, context=self.contexto)
+            return http.client.HTTPConnection(host, timeout=self.timeout)
+
+        proxy = urlsplit(proxy if '://' in proxy else f"http://{proxy}")
+        puerto = proxy.port or (443 if proxy.scheme == 'https' else 80)
+        if esquema == 'https':
+            conexion = http.client.HTTPSConnection(proxy.hostname, puerto, timeout=self.timeout, context=self.contexto)
+            conexion.set_tunnel(host, headers=encabezados_proxy(proxy))
+        else:
+            conexion = http.client.HTTPConnection(proxy.hostname, puerto, timeout=self.timeout)
+            conexion.encabezados_proxy = encabezados_proxy(proxy)
+        return conexion
+
+    def descartar_conexion(self, esquema, host):
+        conexion = self.local.__dict__.get('conexiones', {}).pop((esquema, host), None)
+        if conexion is not None:
+            conexion.close()
+
+    def cerrar(self):
+        """Cierra las conexiones de todos los hilos. Se llama cuando ningún hilo está usando el cliente."""
+
+        with self.bloqueo:
+            conexiones_hilos, self.conexiones_hilos = self.conexiones_hilos, []
+            self.local = threading.local()
+
+        for conexiones in conexiones_hilos:
+            for conexion in conexiones.values():
+                conexion.close()
+
+    def abrir(self, metodo, url, cuerpo=None, encabezados=None):
+        """Envía una petición sin reintentos y retorna la respuesta sin leer (para leerla por bloques).
+
+        El cuerpo debe leerse por completo antes de la siguiente petición del hilo, o la conexión
+        debe descartarse con C(descartar).
+        """
+
+        partes = urlsplit(url)
+        ruta = partes.path + (f"?{partes.query}" if partes.query else '')
+        encabezados = dict(encabezados or {}, Authorization=f"Bearer {self.access_token}")
+
+        conexion = self.conexion(partes.scheme, partes.netloc)
+        if hasattr(conexion, 'encabezados_proxy'):
+            ruta = url
+            encabezados.update(conexion.encabezados_proxy)
+        try:
+            conexion.request(metodo, ruta, body=cuerpo, headers=encabezados)
+            respuesta = conexion.getresponse()
+        except ERRORES_CONEXION:
+            self.descartar_conexion(partes.scheme, partes.netloc)
+            raise
+
+        respuesta.descartar = lambda: self.descartar_conexion(partes.scheme, partes.netloc)
+        return respuesta
+
+    def enviar(self, metodo, url, cuerpo=None, encabezados=None):
+        """Envía una petición sin reintentos y retorna la C(Respuesta) leída."""
+
+        respuesta = self.abrir(metodo, url, cuerpo, encabezados)
+        try:
+            datos = respuesta.read()
+        except ERRORES_CONEXION:
+            respuesta.descartar()
+            raise
+        if respuesta.will_close:
+            respuesta.descartar()
+
+        return Respuesta(respuesta.status, {clave.lower(): valor for clave, valor in respuesta.getheaders()}, datos)
+
+    def esperar(self, intento, encabezados=None):
+        """Espera exponencial con variación aleatoria, o lo que indique el encabezado Retry-After."""
+
+        try:
+            segundos = float((encabezados or {}).get('retry-after'))
+        except (TypeError, ValueError):
+            segundos = min(self.espera * 2 ** intento, ESPERA_MAXIMA) + random.uniform(0, self.espera)
+        time.sleep(segundos)
+
+    def solicitar(self, metodo, url, cuerpo=None, encabezados=None, esperados=(200,)):
+        """Envía una petición reintentando los errores transitorios. Lanza ErrorDrive si no tiene éxito."""
+
+        for intento in range(self.reintentos + 1):
+            try:
+                respuesta = self.enviar(metodo, url, cuerpo, encabezados)
+            except ERRORES_CONEXION as error:
+                if intento == self.reintentos:
+                    raise ErrorDrive(f"Error de conexión con {urlsplit(url).netloc}: {error}")
+                self.esperar(intento)
+                continue
+
+            if respuesta.estado in esperados:
+                return respuesta
+            if intento < self.reintentos and es_reintentable(respuesta.estado, respuesta.cuerpo):
+                self.esperar(intento, respuesta.encabezados)
+                continue
+
+            raise ErrorDrive(mensaje_error(respuesta.estado, respuesta.cuerpo), respuesta.estado)
+
+    def api(self, metodo, ruta, parametros=None, datos=None, esperados=(200,)):
+        """Petición a la API JSON: envía C(datos) como JSON y retorna el JSON de la respuesta."""
+
+        cuerpo = json.dumps(datos).encode('utf-8') if datos is not None else None
+        encabezados = {'Content-Type': 'application/json; charset=UTF-8'} if datos is not None else {}
+        return self.solicitar(metodo, self.url(ruta, **(parametros or {})), cuerpo, encabezados, esperados).json()
+
+    def listar(self, q, campos='id,name', **parametros):
+        """Recorre todas las páginas de C(files.list) para la consulta C(q) y entrega cada archivo."""
+
+        pagina = None
+        while True:
+            datos = self.api('GET', '/drive/v3/files', dict(
+                parametros,
+                q=q,
+                fields=f"nextPageToken,files({campos})",
+                pageSize=TAMANO_PAGINA,
+                pageToken=pagina,
+                supportsAllDrives='true',
+                includeItemsFromAllDrives='true',
+            ))
+            yield from datos.get('files', [])
+
+            pagina = datos.get('nextPageToken')
+            if not pagina:
+                return
+
+    def lote(self, peticiones):
+        """Envía hasta C(MAXIMO_LOTE) peticiones sin cuerpo (C(metodo), C(ruta)) en una sola llamada al endpoint batch.
+
+        La llamada al endpoint se reintenta como cualquier otra; cada petición del lote tiene su propio código, que
+        debe revisarse. Retorna una C(Respuesta) por petición, en el mismo orden, o None si el lote no la incluyó.
+        """
+
+        separador = f"lote_{uuid.uuid4().hex}"
+        partes = [
+            f"--{separador}\r\nContent-Type: application/http\r\nContent-ID: <{numero}>\r\n\r\n"
+            f"{metodo} {ruta} HTTP/1.1\r\n\r\n"
+            for numero, (metodo, ruta) in enumerate(peticiones)
+        ]
+        cuerpo = (''.join(partes) + f"--{separador}--\r\n").encode('utf-8')
+
+        respuestas = leer_lote(self.solicitar(
+            'POST', f"{self.url_api}/batch/drive/v3", cuerpo, {'Content-Type': f"multipart/mixed; boundary={separador}"}
+        ))
+        return [respuestas.get(str(numero)) for numero in range(len(peticiones))]
+
+def eliminar_por_lotes(cliente, archivos, tamano_lote=MAXIMO_LOTE):
+    """Elimina por lotes los archivos ({id: nombre}); los rechazados por límite de cuota se reintentan en otro lote.
+
+    Retorna (resultado con C(eliminados), C(prohibidos), C(no_encontrados) y C(errores), peticiones, reintentos).
+    """
+
+    resultado = dict(eliminados=[], prohibidos=[], no_encontrados=[], errores=[])
+    peticiones = 0
+    reintentos = 0
+    pendientes = list(archivos)
+
+    for intento in range(cliente.reintentos + 1):
+        reintentar = {}
+        espera = None
+
+        for inicio in range(0, len(pendientes), tamano_lote):
+            ids = pendientes[inicio:inicio + tamano_lote]
+            respuestas = cliente.lote([
+                ('DELETE', f"/drive/v3/files/{quote(archivo_id, safe='')}?supportsAllDrives=true") for archivo_id in ids
+            ])
+            peticiones += 1
+
+            for archivo_id, respuesta in zip(ids, respuestas):
+                archivo = dict(id=archivo_id, nombre=archivos[archivo_id])
+                if respuesta is None:
+                    reintentar[archivo_id] = "Drive no incluyó la respuesta en el lote."
+                elif respuesta.estado in (200, 204):
+                    resultado['eliminados'].append(archivo)
+                elif respuesta.estado == 404:
+                    resultado['no_encontrados'].append(archivo_id)
+                elif es_reintentable(respuesta.estado, respuesta.cuerpo):
+                    reintentar[archivo_id] = mensaje_error(respuesta.estado, respuesta.cuerpo)
+                    espera = respuesta.encabezados
+                elif respuesta.estado == 403:
+                    resultado['prohibidos'].append(dict(archivo, msg=mensaje_error(respuesta.estado, respuesta.cuerpo)))
+                else:
+                    resultado['errores'].append(dict(archivo, msg=mensaje_error(respuesta.estado, respuesta.cuerpo)))
+
+        pendientes = list(reintentar)
+        if not pendientes:
+            break
+        if intento == cliente.reintentos:
+            resultado['errores'] += [
+                dict(id=archivo_id, nombre=archivos[archivo_id], msg=f"Se agotaron los reintentos: {motivo}")
+                for archivo_id, motivo in reintentar.items()
+            ]
+            break
+
+        reintentos += len(pendientes)
+        cliente.esperar(intento, espera)
+
+    return resultado, peticiones, reintentos
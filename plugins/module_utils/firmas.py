@@ -0,0 +1,145 @@
+# -*- coding: utf-8 -*-
+
+"""
+Firma en proceso con la librería cryptography, compartida por los módulos que firman contenido.
+
+La llave se lee y se interpreta una sola vez y la firma se codifica en base64 URL-safe sin
+relleno, el formato que usan JWT y el resto de firmas de la colección.
+"""
+
+import base64
+import hashlib
+import mmap
+import os
+
+ALGORITMOS = ['sha1', 'sha224', 'sha256', 'sha384', 'sha512', 'md5']
+METODOS = ['dgst', 'pkeyutl']
+
+TAMANO_BLOQUE = 1024 * 1024
+
+class ErrorFirma(Exception):
+    """Error al cargar la llave o al firmar."""
+
+def b64url(datos):
+    """Codifica C(datos) en base64 URL-safe sin signos C(=)."""
+
+    return base64.urlsafe_b64encode(datos).rstrip(b'=').decode('ascii')
+
+def algoritmo_hash(nombre):
+    """Retorna la instancia de cryptography para el algoritmo C(nombre)."""
+
+    from cryptography.hazmat.primitives import hashes
+
+    return getattr(hashes, nombre.upper())()
+
+def interpretar_llave(datos, clave=None, origen='la llave privada'):
+    """Interpreta una llave privada PEM ya leída (bytes o str). Lanza ImportError si cryptography no está instalada."""
+
+    from cryptography.hazmat.primitives import serialization
+
+    if isinstance(datos, str):
+        datos = datos.encode('utf-8')
+
+    try:
+        return serialization.load_pem_private_key(datos, password=clave.encode() if clave else None)
+    except (ValueError, TypeError) as error:
+        raise ErrorFirma(f"No se pudo cargar {origen}: {error}")
+
+def cargar_llave(ruta, clave=None):
+    """Lee e interpreta una llave privada PEM. Lanza ImportError si cryptography no está instalada."""
+
+    try:
+        with open(ruta, 'rb') as archivo:
+            datos = archivo.read()
+    except OSError as error:
+        raise ErrorFirma(f"No se pudo leer la llave privada {ruta}: {error.strerror}")
+
+    return interpretar_llave(datos, clave, f"la llave privada {ruta}")
+
+def firmar_digest(llave, digest, algoritmo):
+    """Firma un digest ya calculado con C(algoritmo), equivalente a C(openssl dgst -sign) sobre el contenido original."""
+
+    from cryptography.hazmat.primitives.asymmetric import ec, padding, rsa, utils
+
+    prehashed = utils.Prehashed(algoritmo_hash(algoritmo))
+
+    if isinstance(llave, rsa.RSAPrivateKey):
+        return llave.sign(digest, padding.PKCS1v15(), prehashed)
+    if isinstance(llave, ec.EllipticCurvePrivateKey):
+        return llave.sign(digest, ec.ECDSA(prehashed))
+
+    raise ErrorFirma(f"Las llaves {type(llave).__name__} no admiten firmar un digest; use llaves RSA o EC.")
+
+def firmar(llave, datos, algoritmo):
+    """Firma C(datos) (bytes) con la llave cargada y retorna la firma en bytes."""
+
+    if es_edwards(llave):
+        return llave.sign(datos)
+
+    return firmar_digest(llave, hashlib.new(algoritmo, datos).digest(), algoritmo)
+
+def es_edwards(llave):
+    """Indica si la llave es Ed25519 o Ed448, que firman el mensaje completo y no un digest."""
+
+    from cryptography.hazmat.primitives.asymmetric import ed448, ed25519
+
+    return isinstance(llave, (ed25519.Ed25519PrivateKey, ed448.Ed448PrivateKey))
+
+def recorrer_archivo(ruta, tamano_bloque=TAMANO_BLOQUE, progreso=None):
+    """Entrega el contenido de un archivo por bloques (memoryview) leídos desde un mapeo en memoria.
+
+    El archivo no se copia al heap del proceso: cada bloque es una vista sobre las páginas
+    mapeadas, que el kernel lee de forma secuencial y que se liberan una vez procesadas, por lo que
+    la memoria residente no crece con el tamaño del archivo.
+    C(progreso), si se indica, recibe los bytes procesados y el tamaño total tras cada bloque.
+    """
+
+    with open(ruta, 'rb') as archivo:
+        tamano = os.fstat(archivo.fileno()).st_size
+        if not tamano:
+            return
+
+        with mmap.mmap(archivo.fileno(), 0, access=mmap.ACCESS_READ) as mapa:
+            if hasattr(mapa, 'madvise'):
+                mapa.madvise(mmap.MADV_SEQUENTIAL)
+
+            liberar = hasattr(mapa, 'madvise') and hasattr(mmap, 'MADV_DONTNEED')
+
+            with memoryview(mapa) as vista:
+                for inicio in range(0, tamano, tamano_bloque):
+                    with vista[inicio:inicio + tamano_bloque] as bloque:
+                        yield bloque
+                    if liberar:
+                        mapa.madvise(mmap.MADV_DONTNEED, inicio, min(tamano_bloque, tamano - inicio))
+                    if progreso:
+                        progreso(min(inicio + tamano_bloque, tamano), tamano)
+
+def digest_archivo(ruta, algoritmo, tamano_bloque=TAMANO_BLOQUE, progreso=None):
+    """Calcula el digest de un archivo por bloques sobre un mapeo en memoria. Retorna (digest, tamaño)."""
+
+    digest = hashlib.new(algoritmo)
+    tamano = 0
+    for bloque in recorrer_archivo(ruta, tamano_bloque, progreso):
+        digest.update(bloque)
+        tamano += len(bloque)
+
+    return digest.digest(), tamano
+
+def firmar_archivo(llave, ruta, algoritmo, progreso=None):
+    """Firma el contenido de un archivo. Retorna (firma, digest, tamaño).
+
+    Con llaves RSA y EC se firma el digest calculado por bloques, equivalente a firmar el archivo
+    completo con C(openssl dgst -sign) o con C(openssl pkeyutl -sign -pkeyopt digest:...) sobre su digest.
+    Las llaves Ed25519 y Ed448 firman el mensaje completo, que se entrega mapeado en memoria.
+    """
+
+    digest, tamano = digest_archivo(ruta, algoritmo, progreso=progreso)
+
+    if es_edwards(llave):
+        with open(ruta, 'rb') as archivo:
+            if not tamano:
+                return llave.sign(b''), digest, tamano
+            with mmap.mmap(archivo.fileno(), 0, access=mmap.ACCESS_READ) as mapa:
+                return llave.sign(mapa), digest, tamano
+
+    return firmar_digest(llave, digest, algoritmo), digest, tamano
@@ -0,0 +1,253 @@
+# -*- coding: utf-8 -*-
+
+"""
+Índice local en SQLite de los metadatos de Google Drive, compartido por los módulos drive_*.
+
+La primera vez se llena recorriendo C(files.list); después se mantiene al día con la API de cambios
+(C(changes.list)) desde el page token guardado, por lo que una actualización sin cambios cuesta dos
+peticiones: la identidad de la cuenta y los cambios. Las búsquedas por nombre, carpeta o extensión se resuelven con una consulta local en lugar de
+una consulta C(q) a Drive.
+"""
+
+import os
+import sqlite3
+
+from ansible_collections.xploit9999.utilidades.plugins.module_utils.drive import (
+    TAMANO_PAGINA,
+    TIPO_CARPETA,
+    ErrorDrive,
+)
+
+RUTA_INDICE = '~/.cache/xploit9999.utilidades/drive_indice.sqlite'
+CAMPOS = 'id,name,parents,mimeType,md5Checksum,size,modifiedTime,trashed'
+NOMBRES_POR_CONSULTA = 500
+
+ERRORES_INDICE = (OSError, sqlite3.Error)
+
+ESQUEMA = '''
+CREATE TABLE IF NOT EXISTS archivos (
+    id TEXT PRIMARY KEY,
+    nombre TEXT NOT NULL,
+    mime TEXT,
+    md5 TEXT,
+    tamano INTEGER,
+    modificado TEXT
+);
+CREATE INDEX IF NOT EXISTS archivos_nombre ON archivos (nombre);
+CREATE TABLE IF NOT EXISTS padres (
+    padre TEXT NOT NULL,
+    id TEXT NOT NULL,
+    PRIMARY KEY (padre, id)
+);
+CREATE INDEX IF NOT EXISTS padres_id ON padres (id);
+CREATE TABLE IF NOT EXISTS estado (
+    clave TEXT PRIMARY KEY,
+    valor TEXT
+);
+'''
+
+def cuenta_drive(cliente):
+    """Correo de la cuenta dueña del access token; el índice y su page token solo valen para esa cuenta."""
+
+    return cliente.api('GET', '/drive/v3/about', {'fields': 'user(emailAddress)'})['user']['emailAddress']
+
+class IndiceDrive:
+    """Índice de los archivos de una cuenta de Drive guardado en C(ruta)."""
+
+    def __init__(self, ruta=RUTA_INDICE):
+        self.ruta = os.path.expanduser(ruta)
+        os.makedirs(os.path.dirname(self.ruta) or '.', mode=0o700, exist_ok=True)
+
+        self.conexion = sqlite3.connect(self.ruta, timeout=60)
+        self.conexion.execute('PRAGMA journal_mode=WAL')
+        self.conexion.executescript(ESQUEMA)
+
+    def cerrar(self):
+        self.conexion.close()
+
+    def estado(self, clave):
+        fila = self.conexion.execute('SELECT valor FROM estado WHERE clave = ?', (clave,)).fetchone()
+        return fila[0] if fila else None
+
+    def guardar_estado(self, clave, valor):
+        self.conexion.execute('INSERT OR REPLACE INTO estado (clave, valor) VALUES (?, ?)', (clave, valor))
+
+    def total(self):
+        return self.conexion.execute('SELECT count(*) FROM archivos').fetchone()[0]
+
+    def guardar(self, archivo):
+        """Agrega o actualiza un archivo con los campos de la API; los que están en la papelera se quitan."""
+
+        if archivo.get('trashed'):
+            self.quitar(archivo['id'])
+            return
+
+        self.conexion.execute(
+            'INSERT OR REPLACE INTO archivos (id, nombre, mime, md5, tamano, modificado) VALUES (?, ?, ?, ?, ?, ?)',
+            (
+                archivo['id'],
+                archivo['name'],
+                archivo.get('mimeType'),
+                archivo.get('md5Checksum'),
+                int(archivo['size']) if archivo.get('size') is not None else None,
+                archivo.get('modifiedTime'),
+            ),
+        )
+        self.conexion.execute('DELETE FROM padres WHERE id = ?', (archivo['id'],))
+        self.conexion.executemany(
+            'INSERT OR IGNORE INTO padres (padre, id) VALUES (?, ?)',
+            [(padre, archivo['id']) for padre in archivo.get('parents', [])],
+        )
+
+    def quitar(self, archivo_id):
+        self.conexion.execute('DELETE FROM archivos WHERE id = ?', (archivo_id,))
+        self.conexion.execute('DELETE FROM padres WHERE id = ?', (archivo_id,))
+
+    def reconstruir(self, cliente, cuenta=None):
+        """Vuelve a llenar el índice con todos los archivos de la cuenta. Retorna cuántos se indexaron."""
+
+        cuenta = cuenta or cuenta_drive(cliente)
+        # El token se pide antes de listar para que los cambios hechos durante el listado no se pierdan
+        token = cliente.api('GET', '/drive/v3/changes/startPageToken', {'supportsAllDrives': 'true'})['startPageToken']
+        raiz = cliente.api('GET', '/drive/v3/files/root', {'fields': 'id'})['id']
+
+        with self.conexion:
+            self.conexion.execute('DELETE FROM archivos')
+            self.conexion.execute('DELETE FROM padres')
+            for archivo in cliente.listar('trashed = false', CAMPOS):
+                self.guardar(archivo)
+
+            self.guardar_estado('token', token)
+            self.guardar_estado('raiz', raiz)
+            self.guardar_estado('url_api', cliente.url_api)
+            self.guardar_estado('cuenta', cuenta)
+
+        return self.total()
+
+    def actualizar(self, cliente, reconstruir=False):
+        """Aplica los cambios ocurridos en Drive desde la última actualización.
+
+        Si el índice está vacío, pertenece a otra URL de la API o a otra cuenta, el page token ya no es válido o
+        se pide C(reconstruir), el índice se llena desde cero. Retorna C(completa) y el número de C(cambios) aplicados.
+        """
+
+        token = self.estado('token')
+        cuenta = cuenta_drive(cliente)
+        if (
+            reconstruir or token is None
+            or self.estado('url_api') != cliente.url_api
+            or self.estado('cuenta') != cuenta
+        ):
+            return dict(completa=True, cambios=self.reconstruir(cliente, cuenta))
+
+        cambios = 0
+        with self.conexion:
+            while True:
+                try:
+                    datos = cliente.api('GET', '/drive/v3/changes', dict(
+                        pageToken=token,
+                        fields=f"nextPageToken,newStartPageToken,changes(changeType,fileId,removed,file({CAMPOS}))",
+                        pageSize=TAMANO_PAGINA,
+                        includeRemoved='true',
+                        supportsAllDrives='true',
+                        includeItemsFromAllDrives='true',
+                    ))
+                except ErrorDrive as error:
+                    if error.estado not in (400, 404):
+                        raise
+                    # Token vencido
+                    self.conexion.rollback()
+                    return dict(completa=True, cambios=self.reconstruir(cliente, cuenta))
+
+                for cambio in datos.get('changes', []):
+                    if cambio.get('changeType', 'file') != 'file':
+                        continue
+                    if cambio.get('removed') or 'file' not in cambio:
+                        self.quitar(cambio['fileId'])
+                    else:
+                        self.guardar(cambio['file'])
+                    cambios += 1
+
+                if 'newStartPageToken' in datos:
+                    self.guardar_estado('token', datos['newStartPageToken'])
+                    break
+                token = datos['nextPageToken']
+
+        return dict(completa=False, cambios=cambios)
+
+    def resolver(self, carpeta_id):
+        """Traduce el alias C(root) al ID real de Mi unidad guardado en el índice."""
+
+        if carpeta_id == 'root':
+            return self.estado('raiz') or carpeta_id
+        return carpeta_id
+
+    def buscar(self, nombres=None, extension=None, carpeta_id=None, tipo=None):
+        """Busca archivos en el índice y los retorna con los campos de la API (C(id), C(name), C(parents), ...).
+
+        C(tipo) puede ser C(archivo) (todo excepto carpetas), C(carpeta) o None para ambos.
+        """
+
+        condiciones = []
+        parametros = []
+        if extension:
+            sufijo = f".{extension.lstrip('.')}"
+            condiciones.append('substr(a.nombre, -?) = ?')
+            parametros += [len(sufijo), sufijo]
+        if carpeta_id:
+            condiciones.append('EXISTS (SELECT 1 FROM padres p WHERE p.id = a.id AND p.padre = ?)')
+            parametros.append(self.resolver(carpeta_id))
+        if tipo == 'carpeta':
+            condiciones.append('a.mime = ?')
+            parametros.append(TIPO_CARPETA)
+        elif tipo == 'archivo':
+            condiciones.append('a.mime IS NOT ?')
+            parametros.append(TIPO_CARPETA)
+
+        if nombres is None:
+            lotes = [None]
+        else:
+            nombres = list(dict.fromkeys(nombres))
+            lotes = [nombres[inicio:inicio + NOMBRES_POR_CONSULTA] for inicio in range(0, len(nombres), NOMBRES_POR_CONSULTA)]
+
+        encontrados = []
+        for lote in lotes:
+            filtro = condiciones + ([f"a.nombre IN ({', '.join('?' * len(lote))})"] if lote else [])
+            consulta = (
+                'SELECT a.id, a.nombre, a.mime, a.md5, a.tamano, a.modificado FROM archivos a'
+                + (f" WHERE {' AND '.join(filtro)}" if filtro else '')
+                + ' ORDER BY a.nombre, a.id'
+            )
+            encontrados += self.conexion.execute(consulta, parametros + (lote or [])).fetchall()
+
+        padres = {}
+        for inicio in range(0, len(encontrados), NOMBRES_POR_CONSULTA):
+            ids = [fila[0] for fila in encontrados[inicio:inicio + NOMBRES_POR_CONSULTA]]
+            for padre, archivo_id in self.conexion.execute(
+                f"SELECT padre, id FROM padres WHERE id IN ({', '.join('?' * len(ids))})", ids
+            ):
+                padres.setdefault(archivo_id, []).append(padre)
+
+        return [como_api(fila, padres.get(fila[0], [])) for fila in encontrados]
+
+def como_api(fila, padres):
+    """Convierte una fila del índice al formato de C(files.list)."""
+
+    archivo_id, nombre, mime, md5, tamano, modificado = fila
+    archivo = dict(id=archivo_id, name=nombre, parents=padres, mimeType=mime, modifiedTime=modificado)
+    if md5 is not None:
+        archivo['md5Checksum'] = md5
+    if tamano is not None:
+        archivo['size'] = str(tamano)
+    return archivo
+
+def abrir_indice(ruta, cliente):
+    """Abre el índice de C(ruta) y le aplica los cambios de Drive. Lanza ErrorDrive o uno de ERRORES_INDICE."""
+
+    indice = IndiceDrive(ruta)
+    try:
+        indice.actualizar(cliente)
+    except Exception:
+        indice.cerrar()
+        raise
+    return indice
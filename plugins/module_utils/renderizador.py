@@ -0,0 +1,482 @@
+# -*- coding: utf-8 -*-
+
+"""
+Renderizado compartido por los módulos graficos y html_pdf.
+
+Contiene la exportación de figuras de Plotly con Kaleido, la conversión de HTML a PDF
+con Pyppeteer y un servicio local opcional que mantiene ambos renderizadores en memoria.
+El servicio escucha en un socket Unix dentro de una carpeta privada del usuario, atiende
+un trabajo JSON por conexión y termina solo tras un periodo de inactividad. Si no está
+disponible, los módulos renderizan en su propio proceso.
+"""
+
+import asyncio
+import base64
+import fcntl
+import json
+import os
+import socket
+import stat
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+
+ARGUMENTOS_NAVEGADOR = ['--no-sandbox', '--disable-setuid-sandbox']
+ESPERAS_NAVEGACION = ['load', 'domcontentloaded', 'networkidle0', 'networkidle2']
+MODOS_RENDERIZADOR = ['ninguno', 'usar', 'iniciar']
+LIMITE_TRABAJO = 256 * 1024 * 1024
+TIMEOUT_TRABAJO = 1800
+CARPETA_CACHE = '~/.cache/xploit9999.utilidades'
+
+_kaleido_persistente = False
+
+class ErrorRenderizador(Exception):
+    pass
+
+def ruta_temporal(destino, prefijo='.graficos-'):
+    """Crea con mkstemp un archivo vacío junto a destino, con los permisos que tendría un archivo nuevo.
+
+    El archivo se conserva para que ningún otro proceso pueda ocupar el nombre: quien lo pide lo sobrescribe y lo
+    mueve con os.replace, o lo elimina si algo falla.
+    """
+
+    descriptor, temporal = tempfile.mkstemp(
+        dir=os.path.dirname(os.path.abspath(destino)), prefix=prefijo, suffix=os.path.splitext(destino)[1]
+    )
+    try:
+        mascara = os.umask(0)
+        os.umask(mascara)
+        os.fchmod(descriptor, 0o666 & ~mascara)
+    finally:
+        os.close(descriptor)
+    return temporal
+
+def eliminar_temporales(temporales):
+    for temporal in temporales:
+        try:
+            os.unlink(temporal)
+        except FileNotFoundError:
+            pass
+
+def carpeta_privada():
+    """Carpeta 0700 del usuario para el socket: C($XDG_RUNTIME_DIR) si existe, si no C(~/.cache/xploit9999.utilidades)."""
+
+    base = os.environ.get('XDG_RUNTIME_DIR')
+    if base and os.path.isdir(base):
+        carpeta = os.path.join(base, 'xploit9999.utilidades')
+    else:
+        carpeta = os.path.expanduser(CARPETA_CACHE)
+
+    os.makedirs(carpeta, mode=0o700, exist_ok=True)
+    estado = os.lstat(carpeta)
+    if not stat.S_ISDIR(estado.st_mode) or estado.st_uid != os.getuid():
+        raise PermissionError(f"{carpeta} no es un directorio del usuario {os.getuid()}")
+    if estado.st_mode & 0o077:
+        os.chmod(carpeta, 0o700)
+
+    return carpeta
+
+def ruta_socket_defecto():
+    return os.path.join(carpeta_privada(), 'renderizador.sock')
+
+def verificar_socket(ruta_socket):
+    """Evita enviar trabajos (y aceptar imágenes) a un socket que no pertenece al usuario actual."""
+
+    estado = os.lstat(ruta_socket)
+    if not stat.S_ISSOCK(estado.st_mode) or estado.st_uid != os.getuid():
+        raise PermissionError(f"{ruta_socket} no es un socket del usuario {os.getuid()}")
+
+# Gráficos (Plotly + Kaleido)
+
+def version_kaleido():
+    """Versión mayor de Kaleido instalada, 0 si no está disponible."""
+
+    from importlib.metadata import PackageNotFoundError, version
+
+    try:
+        return int(version('kaleido').split('.')[0])
+    except (PackageNotFoundError, ValueError):
+        return 0
+
+def kaleido_soporta_lotes():
+    import plotly.io as pio
+
+    return hasattr(pio, 'write_images') and version_kaleido() >= 1
+
+def iniciar_kaleido():
+    """Inicia el navegador de Kaleido >= 1 que reutilizan todas las exportaciones siguientes."""
+
+    if version_kaleido() < 1:
+        return False
+
+    import kaleido
+
+    if not hasattr(kaleido, 'start_sync_server'):
+        return False
+
+    kaleido.start_sync_server(silence_warnings=True)
+    return True
+
+def detener_kaleido():
+    import kaleido
+
+    kaleido.stop_sync_server(silence_warnings=True)
+
+@contextmanager
+def renderizador_kaleido():
+    """Mantiene un único navegador de Kaleido >= 1 para todas las exportaciones del bloque."""
+
+    iniciado = not _kaleido_persistente and iniciar_kaleido()
+
+    try:
+        yield
+    finally:
+        if iniciado:
+            detener_kaleido()
+
+def exportar_html(figura, ancho, alto):
+    import plotly.io as pio
+
+    return pio.to_html(figura, include_plotlyjs=True, full_html=True, default_width=ancho, default_height=alto)
+
+def exportar_imagenes(figuras, rutas, anchos, altos, formato='png'):
+    """Exporta todas las figuras a disco con un único renderizador de Kaleido.
+
+    Cada figura se escribe en un temporal que luego reemplaza a su ruta, nunca sobre el archivo existente:
+    éste puede ser un hard link a una entrada del cache de graficos.
+    """
+
+    if not figuras:
+        return
+
+    temporales = []
+    movidos = 0
+
+    try:
+        for ruta in rutas:
+            temporales.append(ruta_temporal(ruta))
+        escribir_imagenes(figuras, temporales, anchos, altos, formato)
+
+        for temporal, ruta in zip(temporales, rutas):
+            os.replace(temporal, ruta)
+            movidos += 1
+    except BaseException:
+        eliminar_temporales(temporales[movidos:])
+        raise
+
+def escribir_imagenes(figuras, rutas, anchos, altos, formato):
+    import plotly.io as pio
+
+    if formato == 'html':
+        for figura, ruta, ancho, alto in zip(figuras, rutas, anchos, altos):
+            with open(ruta, 'w', encoding='utf-8') as archivo:
+                archivo.write(exportar_html(figura, ancho, alto))
+        return
+
+    if kaleido_soporta_lotes():
+        pio.write_images(figuras, rutas, format=formato, width=anchos, height=altos)
+        return
+
+    # Kaleido < 1 mantiene vivo su subproceso entre llamadas dentro del mismo intérprete.
+    for figura, ruta, ancho, alto in zip(figuras, rutas, anchos, altos):
+        pio.write_image(figura, ruta, format=formato, width=ancho, height=alto)
+
+def renderizar_contenidos(figuras, anchos, altos, formato='png'):
+    """Retorna el contenido de cada figura en memoria, sin pasar por disco."""
+
+    if formato == 'html':
+        return [exportar_html(figura, ancho, alto).encode('utf-8') for figura, ancho, alto in zip(figuras, anchos, altos)]
+
+    import plotly.io as pio
+
+    with renderizador_kaleido():
+        return [
+            pio.to_image(figura, format=formato, width=ancho, height=alto)
+            for figura, ancho, alto in zip(figuras, anchos, altos)
+        ]
+
+# PDF (Pyppeteer)
+
+async def lanzar_navegador():
+    from pyppeteer import launch
+
+    return await launch(headless=True, args=ARGUMENTOS_NAVEGADOR)
+
+async def esperar_pagina(pagina, url_archivo, espera):
+    """Navega al archivo y espera a que la página esté lista según la estrategia configurada."""
+
+    timeout = int(espera['timeout'] * 1000)
+    estrategia = espera['estrategia']
+
+    if estrategia in ESPERAS_NAVEGACION:
+        await pagina.goto(url_archivo, waitUntil=estrategia, timeout=timeout)
+        return
+
+    await pagina.goto(url_archivo, waitUntil='load', timeout=timeout)
+
+    if estrategia == 'selector':
+        await pagina.waitForSelector(espera['selector'], {'timeout': timeout})
+    else:
+        await pagina.waitForFunction(espera['funcion'], {'timeout': timeout})
+
+async def convertir_en_pagina(pagina, ruta_html, ruta_pdf, formato_hoja, orientacion, espera):
+    url_archivo = 'file://' + os.path.abspath(ruta_html)
+    await esperar_pagina(pagina, url_archivo, espera)
+
+    await pagina.pdf({
+        'path': ruta_pdf,
+        'format': formato_hoja,
+        'landscape': orientacion == 'horizontal',
+        'printBackground': True,
+        'margin': {
+            'top': '20px',
+            'right': '20px',
+            'bottom': '20px',
+            'left': '20px'
+        }
+    })
+
+async def convertir_lote(conversiones, concurrencia, espera, navegador=None):
+    """Convierte todas las conversiones con un solo navegador y un grupo de páginas reutilizables.
+
+    Si se entrega un navegador ya iniciado, se reutiliza y queda abierto al terminar.
+    """
+
+    propio = navegador is None
+    if propio:
+        navegador = await lanzar_navegador()
+
+    abiertas = []
+
+    try:
+        paginas = asyncio.Queue()
+        for _ in range(max(1, min(concurrencia, len(conversiones)))):
+            pagina = await navegador.newPage()
+            await pagina.setViewport({'width': 1200, 'height': 800})
+            abiertas.append(pagina)
+            paginas.put_nowait(pagina)
+
+        async def convertir(conversion):
+            pagina = await paginas.get()
+            inicio = time.perf_counter()
+            resultado = {'origen': conversion['origen'], 'destino': conversion['destino']}
+
+            try:
+                await convertir_en_pagina(
+                    pagina,
+                    conversion['origen'],
+                    conversion['destino'],
+                    conversion['formato_hoja'],
+                    conversion['orientacion'],
+                    espera,
+                )
+                resultado['failed'] = False
+            except Exception as error:
+                resultado['failed'] = True
+                resultado['msg'] = str(error)
+            finally:
+                paginas.put_nowait(pagina)
+
+            resultado['segundos'] = round(time.perf_counter() - inicio, 3)
+            return resultado
+
+        return await asyncio.gather(*(convertir(conversion) for conversion in conversiones))
+    finally:
+        if propio:
+            await navegador.close()
+        else:
+            for pagina in abiertas:
+                await pagina.close()
+
+# Servicio
+
+class ServicioRenderizado:
+    """Mantiene Chromium y Kaleido en memoria y atiende trabajos a través de un socket Unix."""
+
+    def __init__(self, ruta_socket, inactividad):
+        self.ruta_socket = ruta_socket
+        self.inactividad = inactividad
+        self.ultima_actividad = time.monotonic()
+        self.activos = 0
+        self.navegador = None
+        self.kaleido = False
+        self.ejecutor = ThreadPoolExecutor(max_workers=1)
+
+    async def atender(self, lector, escritor):
+        self.activos += 1
+
+        try:
+            trabajo = json.loads(await lector.readline())
+            respuesta = await self.ejecutar(trabajo)
+        except Exception as error:
+            respuesta = {'failed': True, 'msg': str(error)}
+        finally:
+            self.activos -= 1
+            self.ultima_actividad = time.monotonic()
+
+        escritor.write(json.dumps(respuesta).encode('utf-8') + b'\n')
+        await escritor.drain()
+        escritor.close()
+
+    async def ejecutar(self, trabajo):
+        operacion = trabajo.get('operacion')
+
+        if operacion == 'ping':
+            return {'failed': False, 'pid': os.getpid()}
+
+        if operacion == 'pdf':
+            if self.navegador is None:
+                self.navegador = await lanzar_navegador()
+
+            try:
+                resultados = await convertir_lote(trabajo['conversiones'], trabajo['concurrencia'], trabajo['espera'], self.navegador)
+            except Exception:
+                await self.cerrar_navegador()
+                raise
+
+            return {'failed': False, 'resultados': resultados}
+
+        if operacion == 'graficos':
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(self.ejecutor, self.renderizar_graficos, trabajo)
+
+        raise ErrorRenderizador(f"Operación desconocida: {operacion}")
+
+    def renderizar_graficos(self, trabajo):
+        global _kaleido_persistente
+
+        if not self.kaleido:
+            self.kaleido = iniciar_kaleido()
+            _kaleido_persistente = self.kaleido
+
+        argumentos = (trabajo['figuras'], trabajo['anchos'], trabajo['altos'], trabajo['formato'])
+
+        if trabajo['en_memoria']:
+            contenidos = renderizar_contenidos(*argumentos)
+            return {'failed': False, 'contenidos': [base64.b64encode(contenido).decode('ascii') for contenido in contenidos]}
+
+        exportar_imagenes(trabajo['figuras'], trabajo['rutas'], trabajo['anchos'], trabajo['altos'], trabajo['formato'])
+        return {'failed': False}
+
+    async def cerrar_navegador(self):
+        navegador, self.navegador = self.navegador, None
+        if navegador is not None:
+            try:
+                await navegador.close()
+            except Exception:
+                pass
+
+    async def ejecutar_servicio(self):
+        if os.path.exists(self.ruta_socket):
+            os.unlink(self.ruta_socket)
+
+        servidor = await asyncio.start_unix_server(self.atender, path=self.ruta_socket, limit=LIMITE_TRABAJO)
+        os.chmod(self.ruta_socket, 0o600)
+
+        try:
+            while self.activos or time.monotonic() - self.ultima_actividad < self.inactividad:
+                await asyncio.sleep(1)
+        finally:
+            servidor.close()
+            await servidor.wait_closed()
+            await self.cerrar_navegador()
+            if self.kaleido:
+                await asyncio.get_running_loop().run_in_executor(self.ejecutor, detener_kaleido)
+            self.ejecutor.shutdown()
+            if os.path.exists(self.ruta_socket):
+                os.unlink(self.ruta_socket)
+
+def enviar_trabajo(trabajo, ruta_socket, timeout=TIMEOUT_TRABAJO):
+    verificar_socket(ruta_socket)
+
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as conexion:
+        conexion.settimeout(timeout)
+        conexion.connect(ruta_socket)
+        conexion.sendall(json.dumps(trabajo).encode('utf-8') + b'\n')
+
+        partes = []
+        while True:
+            parte = conexion.recv(65536)
+            if not parte:
+                break
+            partes.append(parte)
+
+    return json.loads(b''.join(partes))
+
+def servicio_disponible(ruta_socket):
+    try:
+        return not enviar_trabajo({'operacion': 'ping'}, ruta_socket, timeout=2).get('failed')
+    except (OSError, ValueError):
+        return False
+
+def iniciar_servicio(ruta_socket, inactividad, espera=10):
+    """Inicia el servicio como demonio si no está corriendo. Retorna si quedó disponible."""
+
+    descriptor = os.open(ruta_socket + '.lock', os.O_WRONLY | os.O_CREAT | os.O_NOFOLLOW, 0o600)
+
+    with os.fdopen(descriptor, 'w') as bloqueo:
+        fcntl.flock(bloqueo, fcntl.LOCK_EX)
+
+        if servicio_disponible(ruta_socket):
+            return True
+
+        # Un socket ajeno en la ruta no se reemplaza
+        if os.path.lexists(ruta_socket):
+            verificar_socket(ruta_socket)
+
+        pid = os.fork()
+        if pid == 0:
+            try:
+                os.setsid()
+                os.umask(0o077)
+                if os.fork() > 0:
+                    os._exit(0)
+
+                os.chdir('/')
+                nulo = os.open(os.devnull, os.O_RDWR)
+                for descriptor in (0, 1, 2):
+                    os.dup2(nulo, descriptor)
+                os.closerange(3, 1024)
+
+                asyncio.run(ServicioRenderizado(ruta_socket, inactividad).ejecutar_servicio())
+            finally:
+                os._exit(0)
+
+        os.waitpid(pid, 0)
+
+        limite = time.monotonic() + espera
+        while time.monotonic() < limite:
+            if servicio_disponible(ruta_socket):
+                return True
+            time.sleep(0.05)
+
+    return False
+
+def solicitar(trabajo, modo, ruta_socket=None, inactividad=300, timeout=TIMEOUT_TRABAJO):
+    """Envía el trabajo al servicio. Retorna None si debe renderizarse en el proceso del módulo.
+
+    Falla con ErrorRenderizador si el servicio no responde en C(timeout) segundos.
+    """
+
+    if modo == 'ninguno':
+        return None
+
+    try:
+        ruta_socket = ruta_socket or ruta_socket_defecto()
+
+        try:
+            respuesta = enviar_trabajo(trabajo, ruta_socket, timeout)
+        except (FileNotFoundError, ConnectionRefusedError):
+            if modo != 'iniciar' or not iniciar_servicio(ruta_socket, inactividad):
+                return None
+            respuesta = enviar_trabajo(trabajo, ruta_socket, timeout)
+    except socket.timeout:
+        raise ErrorRenderizador(f"El servicio de renderizado no respondió en {timeout} segundos")
+    except (OSError, ValueError):
+        return None
+
+    if respuesta.get('failed'):
+        raise ErrorRenderizador(respuesta.get('msg', 'Error desconocido en el servicio de renderizado'))
+
+    return respuesta
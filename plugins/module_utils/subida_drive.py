@@ -0,0 +1,157 @@
+# -*- coding: utf-8 -*-
+
+"""
+Subida reanudable de archivos a Google Drive por fragmentos, compartida por los módulos drive_*.
+
+El archivo se lee del disco por fragmentos de tamaño fijo, de modo que solo un fragmento por hilo se mantiene en
+memoria. Si un fragmento falla, se consulta a Drive cuántos bytes recibió y la subida continúa desde ese punto.
+"""
+
+import json
+import mimetypes
+import os
+import time
+from urllib.parse import quote
+
+from ansible_collections.xploit9999.utilidades.plugins.module_utils.drive import (
+    ERRORES_CONEXION,
+    ErrorDrive,
+    es_reintentable,
+    mensaje_error,
+)
+
+MIB = 1024 * 1024
+CAMPOS = 'id,name,parents,mimeType,size,md5Checksum,modifiedTime'
+TIPOS_COMPRESION = {
+    'gzip': 'application/gzip',
+    'bzip2': 'application/x-bzip2',
+    'xz': 'application/x-xz',
+    'compress': 'application/x-compress',
+    'br': 'application/x-brotli',
+}
+
+def tipo_mime(ruta):
+    """Deduce el tipo MIME por la extensión del archivo; los comprimidos (C(.tar.gz)) usan el tipo de su compresión."""
+
+    tipo, compresion = mimetypes.guess_type(ruta)
+    if compresion:
+        return TIPOS_COMPRESION.get(compresion, 'application/octet-stream')
+    return tipo or 'application/octet-stream'
+
+def fecha_rfc3339(segundos):
+    """Fecha en el formato de C(modifiedTime) de Drive (UTC, con milisegundos)."""
+
+    return time.strftime('%Y-%m-%dT%H:%M:%S', time.gmtime(segundos)) + f".{int(segundos * 1000) % 1000:03d}Z"
+
+def iniciar_sesion(cliente, nombre, mime, tamano, carpeta_id=None, archivo_id=None, modificado=None):
+    """Crea una sesión de subida reanudable y retorna su URL.
+
+    Con C(archivo_id) la sesión reemplaza el contenido de ese archivo (conservando su ID) en lugar de crear uno nuevo.
+    C(modificado) fija el C(modifiedTime) del archivo en Drive.
+    """
+
+    metadatos = {'name': nombre}
+    if carpeta_id and not archivo_id:
+        metadatos['parents'] = [carpeta_id]
+    if modificado:
+        metadatos['modifiedTime'] = modificado
+
+    ruta = f"/upload/drive/v3/files/{quote(archivo_id, safe='')}" if archivo_id else '/upload/drive/v3/files'
+    respuesta = cliente.solicitar(
+        'PATCH' if archivo_id else 'POST',
+        cliente.url(ruta, uploadType='resumable', fields=CAMPOS, supportsAllDrives='true'),
+        json.dumps(metadatos).encode('utf-8'),
+        {
+            'Content-Type': 'application/json; charset=UTF-8',
+            'X-Upload-Content-Type': mime,
+            'X-Upload-Content-Length': str(tamano),
+        },
+    )
+
+    sesion = respuesta.encabezados.get('location')
+    if not sesion:
+        raise ErrorDrive("Drive no retornó la URL de la sesión de subida.")
+    return sesion
+
+def bytes_recibidos(respuesta):
+    """Bytes confirmados por Drive en una respuesta 308 (encabezado C(Range: bytes=0-N))."""
+
+    rango = respuesta.encabezados.get('range')
+    return int(rango.rsplit('-', 1)[1]) + 1 if rango else 0
+
+def consultar_sesion(cliente, sesion, tamano):
+    """Pregunta a Drive por el avance de la sesión. Retorna (bytes recibidos, archivo si ya terminó)."""
+
+    respuesta = cliente.enviar('PUT', sesion, b'', {'Content-Range': f"bytes */{tamano}"})
+    if respuesta.estado in (200, 201):
+        return tamano, respuesta.json()
+    if respuesta.estado == 308:
+        return bytes_recibidos(respuesta), None
+
+    raise ErrorDrive(mensaje_error(respuesta.estado, respuesta.cuerpo), respuesta.estado)
+
+def subir_archivo(cliente, ruta, carpeta_id, tamano_fragmento, archivo_id=None, modificado=None):
+    """Sube un archivo por fragmentos, reanudando desde lo confirmado por Drive si un fragmento falla.
+
+    C(archivo_id) y C(modificado) se pasan a C(iniciar_sesion).
+    """
+
+    nombre = os.path.basename(ruta)
+    mime = tipo_mime(ruta)
+    tamano = os.path.getsize(ruta)
+
+    sesion = iniciar_sesion(cliente, nombre, mime, tamano, carpeta_id, archivo_id, modificado)
+    enviados = 0
+    fallos = 0
+    reintentos = 0
+    datos = None
+
+    with open(ruta, 'rb') as archivo:
+        while datos is None:
+            archivo.seek(enviados)
+            fragmento = archivo.read(tamano_fragmento)
+            rango = f"bytes {enviados}-{enviados + len(fragmento) - 1}/{tamano}" if fragmento else f"bytes */{tamano}"
+
+            try:
+                respuesta = cliente.enviar('PUT', sesion, fragmento, {'Content-Range': rango})
+            except ERRORES_CONEXION as error:
+                respuesta, motivo = None, str(error)
+            else:
+                if respuesta.estado in (200, 201):
+                    datos = respuesta.json()
+                    continue
+                if respuesta.estado == 308:
+                    enviados = bytes_recibidos(respuesta)
+                    fallos = 0
+                    continue
+                motivo = mensaje_error(respuesta.estado, respuesta.cuerpo)
+                if respuesta.estado != 404 and not es_reintentable(respuesta.estado, respuesta.cuerpo):
+                    raise ErrorDrive(motivo, respuesta.estado)
+
+            if fallos == cliente.reintentos:
+                raise ErrorDrive(f"Se agotaron los reintentos subiendo {nombre}: {motivo}")
+            cliente.esperar(fallos, respuesta.encabezados if respuesta else None)
+            fallos += 1
+            reintentos += 1
+
+            if respuesta is not None and respuesta.estado == 404:
+                # La sesión expiró: se crea otra y el archivo se envía desde el principio
+                sesion = iniciar_sesion(cliente, nombre, mime, tamano, carpeta_id, archivo_id, modificado)
+                enviados = 0
+                continue
+
+            try:
+                enviados, datos = consultar_sesion(cliente, sesion, tamano)
+            except (ErrorDrive, *ERRORES_CONEXION):
+                continue
+
+    return dict(
+        ruta=ruta,
+        id=datos.get('id'),
+        nombre=datos.get('name', nombre),
+        mime=mime,
+        tamano=tamano,
+        md5=datos.get('md5Checksum'),
+        reintentos=reintentos,
+        metadatos=datos,
+    )
@@ -120,7 +120,7 @@ function signature() {
             if [[ -f ${content} ]]; then
                 output false true "The 'content' parameter should contain a string, not a file path."
             else
-                exec=$(echo -n "${content}" | openssl ${signed_with} -${algorithm} -sign ${privatekey} | openssl base64 -e -A |  tr '+/' '-_' | tr -d '=' 2>/dev/null)
+                exec=$(echo -n "${content}" | openssl ${signed_with} -${algorithm} -sign "${privatekey}" ${OPENSSL_SIGN_PASSPHRASE:+-passin env:OPENSSL_SIGN_PASSPHRASE} | openssl base64 -e -A |  tr '+/' '-_' | tr -d '=' 2>/dev/null)
 
                 [[ $? -ne 0 ]] && { output false true "Error signing content with OpenSSL. Please check if algorithm is rigth and exists to use with openssl."; exit 1 ;}
               
@@ -130,7 +130,7 @@ function signature() {
             if [[ ! -f ${path} ]]; then
                 output false true "The specified file in 'path' does not exist."
             else
-                exec=$(openssl ${signed_with} -${algorithm} -sign ${privatekey} ${path} | openssl base64 -e -A 2>/dev/null)
+                exec=$(openssl ${signed_with} -${algorithm} -sign "${privatekey}" ${OPENSSL_SIGN_PASSPHRASE:+-passin env:OPENSSL_SIGN_PASSPHRASE} "${path}" | openssl base64 -e -A 2>/dev/null)
                 [[ $? -ne 0 ]] && { output false true "Error signing file with OpenSSL."; exit 1 ;}
                 output true false "${exec}"
             fi
@@ -144,7 +144,7 @@ function signature() {
             if [[ -f ${content} ]]; then
                 output false true "The 'content' parameter should contain a string, not a file path."
             else
-                exec=$(echo -n "${content}" | openssl ${signed_with} -sign ${privatekey} | openssl base64 -e -A 2>/dev/null)
+                exec=$(echo -n "${content}" | openssl dgst -${algorithm} -binary | openssl ${signed_with} -sign -inkey "${privatekey}" ${OPENSSL_SIGN_PASSPHRASE:+-passin env:OPENSSL_SIGN_PASSPHRASE} -pkeyopt digest:${algorithm} | openssl base64 -e -A 2>/dev/null)
                 [[ $? -ne 0 ]] && { output false true "Error signing content with OpenSSL pkeyutl."; exit 1 ;}
                 output true false "${exec}"
             fi
@@ -152,7 +152,7 @@ function signature() {
             if [[ ! -f ${path} ]]; then
                 output false true "The specified file in 'path' does not exist."
             else
-                exec=$(openssl ${signed_with} -sign ${privatekey} -in ${path} | openssl base64 -e -A 2>/dev/null)
+                exec=$(openssl dgst -${algorithm} -binary "${path}" | openssl ${signed_with} -sign -inkey "${privatekey}" ${OPENSSL_SIGN_PASSPHRASE:+-passin env:OPENSSL_SIGN_PASSPHRASE} -pkeyopt digest:${algorithm} | openssl base64 -e -A 2>/dev/null)
                 [[ $? -ne 0 ]] && { output false true "Error signing file with OpenSSL pkeyutl."; exit 1 ;}
                 output true false "${exec}"
             fi
@@ -174,4 +174,6 @@ function __main__() {
     }
 }
 
-source ${1};__main__
+set -o pipefail
+
+source "${1}";__main__
@@ -0,0 +1,424 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+
+DOCUMENTATION = r'''
+---
+module: drive_descargar
+short_description: Descarga en paralelo archivos de Google Drive, reanudando y verificando cada descarga.
+description:
+  - Busca los archivos a descargar con una consulta C(q) en el servidor, recorriendo todas las páginas de resultados.
+  - Descarga los archivos en paralelo escribiéndolos al disco por bloques, sin cargarlos en memoria.
+  - Cada descarga se escribe primero en un archivo C(.part); si se interrumpe, el siguiente intento (o la siguiente
+    ejecución) continúa desde el último byte recibido con una petición C(Range).
+  - Cada archivo descargado se verifica contra el C(md5Checksum) de Drive, y los archivos cuya copia local ya
+    coincide en tamaño y MD5 no se vuelven a descargar.
+  - Con C(indice), los archivos se buscan en el índice local de Drive en lugar de consultar a la API.
+options:
+  access_token:
+    description:
+      - Access token de Google con permisos sobre Drive (por ejemplo, el que retorna C(jwt_token)).
+    required: true
+    type: str
+  destino:
+    description:
+      - Directorio local donde se guardan los archivos. Se crea si no existe.
+    required: true
+    type: path
+  nombres:
+    description:
+      - Nombres exactos de los archivos a descargar.
+    required: false
+    type: list
+    elements: str
+  extension:
+    description:
+      - Descarga los archivos cuyo nombre termina en esta extensión (con o sin punto inicial).
+    required: false
+    type: str
+  carpeta_id:
+    description:
+      - Limita la búsqueda a los archivos que están directamente en esta carpeta.
+    required: false
+    type: str
+  consulta:
+    description:
+      - Condición adicional en la sintaxis C(q) de la API de Drive (por ejemplo, C(modifiedTime > '2024-01-01T00:00:00')).
+    required: false
+    type: str
+  verificar_md5:
+    description:
+      - Verifica cada descarga contra el C(md5Checksum) de Drive. Una descarga que no coincide se repite desde cero.
+    required: false
+    type: bool
+    default: true
+  hilos:
+    description:
+      - Número de archivos que se descargan en paralelo.
+    required: false
+    type: int
+    default: 4
+  reintentos:
+    description:
+      - Reintentos de cada petición o descarga ante errores transitorios, con espera exponencial entre intentos.
+    required: false
+    type: int
+    default: 5
+  url_api:
+    description:
+      - URL base de la API de Google. Útil para pasar por un proxy inverso.
+    required: false
+    type: str
+    default: https://www.googleapis.com
+  validate_certs:
+    description:
+      - Si es C(false) no se validan los certificados TLS de la API ni del proxy. Úselo solo con certificados propios
+        de confianza.
+    required: false
+    type: bool
+    default: true
+  indice:
+    description:
+      - Archivo SQLite del índice local de Drive (ver C(drive_indice)). Se actualiza con los cambios de Drive y la
+        búsqueda se resuelve en él. No se puede combinar con C(consulta).
+    required: false
+    type: path
+notes:
+  - Las peticiones pasan por el proxy de C(https_proxy) (o C(http_proxy)) salvo que C(no_proxy) excluya el host, igual que con C(uri).
+  - Se requiere al menos uno de C(nombres), C(extension), C(carpeta_id) o C(consulta).
+  - Los documentos nativos de Google (Docs, Sheets, ...) no tienen contenido binario descargable y se reportan en C(omitidos).
+  - En check mode se listan los archivos y se reporta cuáles se descargarían, sin descargarlos.
+author:
+  - John Freidman (@xploit9999)
+'''
+
+EXAMPLES = r'''
+- name: Descargar los PDF de una carpeta
+  xploit9999.utilidades.drive_descargar:
+    access_token: "{{ jwt.access_token }}"
+    carpeta_id: "1AbCdEfGhIjKlMnOp"
+    extension: pdf
+    destino: /srv/reportes
+
+- name: Descargar respaldos por nombre
+  xploit9999.utilidades.drive_descargar:
+    access_token: "{{ jwt.access_token }}"
+    nombres:
+      - base.sql.gz
+      - archivos.tar.gz
+    destino: /restaurar
+    hilos: 2
+  register: descarga
+'''
+
+RETURN = r'''
+encontrados:
+  description: Número de archivos de Drive que cumplen el filtro.
+  type: int
+  returned: always
+descargados:
+  description: Archivos descargados, con C(nombre), C(id), C(ruta), C(tamano) y C(reanudado) (si se continuó una descarga previa).
+  type: list
+  elements: dict
+  returned: always
+sin_cambios:
+  description: Nombres de los archivos cuya copia local ya coincidía con Drive.
+  type: list
+  elements: str
+  returned: always
+omitidos:
+  description: Archivos que no se pueden descargar (documentos nativos de Google o nombres repetidos), con el motivo.
+  type: list
+  elements: dict
+  returned: always
+errores:
+  description: Archivos cuya descarga falló, con el motivo.
+  type: list
+  elements: dict
+  returned: always
+rendimiento:
+  description: C(bytes) descargados, C(segundos), C(bytes_por_segundo) e C(hilos) utilizados.
+  type: dict
+  returned: always
+'''
+
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from ansible.module_utils.basic import AnsibleModule
+
+from ansible_collections.xploit9999.utilidades.plugins.module_utils.drive import (
+    ERRORES_CONEXION,
+    TIPO_CARPETA,
+    URL_API,
+    ClienteDrive,
+    ErrorDrive,
+    consulta_nombres,
+    es_reintentable,
+    escapar_q,
+    mensaje_error,
+)
+from ansible_collections.xploit9999.utilidades.plugins.module_utils.firmas import digest_archivo
+from ansible_collections.xploit9999.utilidades.plugins.module_utils.indice_drive import (
+    ERRORES_INDICE,
+    abrir_indice,
+)
+
+CAMPOS = 'id,name,mimeType,size,md5Checksum'
+TAMANO_BLOQUE = 1024 * 1024
+NOMBRES_POR_CONSULTA = 50
+PREFIJO_NATIVO = 'application/vnd.google-apps.'
+
+def consultas(modulo):
+    """Arma las consultas C(q); los nombres se reparten en varias consultas para no exceder el largo de la URL.
+
+    La extensión no se envía a Drive: C(name contains) compara por prefijos de palabras y omitiría nombres como
+    C(informe.final.pdf). Se filtra en C(buscar) sobre el listado paginado.
+    """
+
+    condiciones = ['trashed = false', f"mimeType != '{TIPO_CARPETA}'"]
+    if modulo.params['carpeta_id']:
+        condiciones.append(f"'{escapar_q(modulo.params['carpeta_id'])}' in parents")
+    if modulo.params['consulta']:
+        condiciones.append(f"({modulo.params['consulta']})")
+
+    base = ' and '.join(condiciones)
+    nombres = modulo.params['nombres']
+    if not nombres:
+        return [base]
+
+    return [
+        f"{base} and ({consulta_nombres(nombres[inicio:inicio + NOMBRES_POR_CONSULTA])})"
+        for inicio in range(0, len(nombres), NOMBRES_POR_CONSULTA)
+    ]
+
+def candidatos(cliente, modulo, indice):
+    """Archivos que cumplen el filtro, tomados del índice local si se indicó o con consultas C(q) a Drive."""
+
+    if indice is not None:
+        yield from indice.buscar(
+            nombres=modulo.params['nombres'],
+            extension=modulo.params['extension'],
+            carpeta_id=modulo.params['carpeta_id'],
+            tipo='archivo',
+        )
+        return
+
+    for q in consultas(modulo):
+        yield from cliente.listar(q, CAMPOS)
+
+def buscar(cliente, modulo, indice=None):
+    """Lista los archivos que cumplen el filtro. Retorna (archivos descargables, omitidos)."""
+
+    sufijo = f".{modulo.params['extension'].lstrip('.')}" if modulo.params['extension'] else None
+    archivos = {}
+    omitidos = []
+    vistos = set()
+
+    for archivo in candidatos(cliente, modulo, indice):
+        if archivo['id'] in vistos:
+            continue
+        vistos.add(archivo['id'])
+
+        if sufijo and not archivo['name'].endswith(sufijo):
+            continue
+        if archivo['mimeType'].startswith(PREFIJO_NATIVO) or 'md5Checksum' not in archivo:
+            omitidos.append(dict(nombre=archivo['name'], id=archivo['id'], motivo=f"Documento nativo de Google ({archivo['mimeType']}); debe exportarse."))
+        elif nombre_local(archivo['name']) in archivos:
+            omitidos.append(dict(nombre=archivo['name'], id=archivo['id'], motivo="Hay otro archivo con el mismo nombre en Drive."))
+        else:
+            archivos[nombre_local(archivo['name'])] = archivo
+
+    return list(archivos.values()), omitidos
+
+def nombre_local(nombre):
+    """Nombre seguro para el disco: Drive admite C(/) y nombres como C(..) que no deben salir de C(destino)."""
+
+    nombre = nombre.replace('/', '_').replace('\0', '_')
+    return f"_{nombre}" if nombre in ('', '.', '..') else nombre
+
+def coincide(ruta, archivo):
+    """Indica si la copia local tiene el mismo tamaño y MD5 que el archivo de Drive."""
+
+    if not os.path.isfile(ruta) or os.path.getsize(ruta) != int(archivo['size']):
+        return False
+    return digest_archivo(ruta, 'md5')[0].hex() == archivo['md5Checksum']
+
+def copiar_respuesta(respuesta, destino):
+    """Escribe el cuerpo de la respuesta en el archivo por bloques."""
+
+    for bloque in iter(lambda: respuesta.read(TAMANO_BLOQUE), b''):
+        destino.write(bloque)
+
+def descargar_archivo(cliente, archivo, directorio, verificar_md5):
+    """Descarga un archivo a C(.part) reanudando con Range y lo renombra una vez verificado.
+
+    Retorna (bytes transferidos, si se reanudó una descarga previa).
+    """
+
+    ruta = os.path.join(directorio, nombre_local(archivo['name']))
+    parcial = f"{ruta}.part"
+    tamano = int(archivo['size'])
+    url = cliente.url(f"/drive/v3/files/{archivo['id']}", alt='media', supportsAllDrives='true')
+
+    transferidos = 0
+    reanudado = False
+    fallos = 0
+
+    while True:
+        inicio = os.path.getsize(parcial) if os.path.exists(parcial) else 0
+        if inicio > tamano:
+            os.unlink(parcial)
+            inicio = 0
+        reanudado = reanudado or inicio > 0
+
+        motivo = None
+        if inicio < tamano or not os.path.exists(parcial):
+            encabezados = {'Range': f"bytes={inicio}-"} if inicio else {}
+            respuesta = None
+            try:
+                respuesta = cliente.abrir('GET', url, encabezados=encabezados)
+                if respuesta.status in (200, 206):
+                    # Un 200 indica que el servidor ignoró el Range y envía el archivo completo
+                    with open(parcial, 'ab' if respuesta.status == 206 else 'wb') as destino:
+                        try:
+                            copiar_respuesta(respuesta, destino)
+                        finally:
+                            transferidos += destino.tell() - (inicio if respuesta.status == 206 else 0)
+                else:
+                    cuerpo = respuesta.read()
+                    motivo = mensaje_error(respuesta.status, cuerpo)
+                    if not es_reintentable(respuesta.status, cuerpo):
+                        raise ErrorDrive(motivo, respuesta.status)
+            except ERRORES_CONEXION as error:
+                if respuesta is not None:
+                    respuesta.descartar()
+                motivo = str(error)
+
+        if motivo is None:
+            completo = os.path.getsize(parcial) == tamano
+            if completo and (not verificar_md5 or digest_archivo(parcial, 'md5')[0].hex() == archivo['md5Checksum']):
+                os.replace(parcial, ruta)
+                return transferidos, reanudado
+
+            motivo = "El archivo descargado no coincide con el md5Checksum de Drive." if completo else "Descarga incompleta."
+            if completo:
+                os.unlink(parcial)
+
+        if fallos == cliente.reintentos:
+            raise ErrorDrive(f"Se agotaron los reintentos descargando {archivo['name']}: {motivo}")
+        cliente.esperar(fallos)
+        fallos += 1
+
+def descargar(cliente, archivos, directorio, verificar_md5, hilos):
+    """Descarga los archivos en paralelo. Retorna (descargados, errores)."""
+
+    def descargar_uno(archivo):
+        try:
+            transferidos, reanudado = descargar_archivo(cliente, archivo, directorio, verificar_md5)
+            return dict(
+                nombre=archivo['name'],
+                id=archivo['id'],
+                ruta=os.path.join(directorio, nombre_local(archivo['name'])),
+                tamano=int(archivo['size']),
+                transferidos=transferidos,
+                reanudado=reanudado,
+            ), None
+        except (ErrorDrive, OSError) as error:
+            return None, dict(nombre=archivo['name'], id=archivo['id'], msg=str(error))
+
+    # Cada hilo reutiliza su conexión para todos sus archivos; se cierran al terminar el lote
+    with ThreadPoolExecutor(max_workers=hilos) as pool:
+        resultados = list(pool.map(descargar_uno, archivos))
+    cliente.cerrar()
+
+    return [descargado for descargado, _ in resultados if descargado], [error for _, error in resultados if error]
+
+def main():
+    modulo = AnsibleModule(
+        argument_spec=dict(
+            access_token=dict(type='str', required=True, no_log=True),
+            destino=dict(type='path', required=True),
+            nombres=dict(type='list', elements='str', required=False),
+            extension=dict(type='str', required=False),
+            carpeta_id=dict(type='str', required=False),
+            consulta=dict(type='str', required=False),
+            verificar_md5=dict(type='bool', required=False, default=True),
+            hilos=dict(type='int', required=False, default=4),
+            reintentos=dict(type='int', required=False, default=5),
+            url_api=dict(type='str', required=False, default=URL_API),
+            validate_certs=dict(type='bool', required=False, default=True),
+            indice=dict(type='path', required=False),
+        ),
+        required_one_of=[('nombres', 'extension', 'carpeta_id', 'consulta')],
+        mutually_exclusive=[('indice', 'consulta')],
+        supports_check_mode=True,
+    )
+
+    if modulo.params['hilos'] < 1:
+        modulo.fail_json(msg="'hilos' debe ser mayor o igual a 1.")
+
+    directorio = modulo.params['destino']
+    cliente = ClienteDrive(
+        modulo.params['access_token'], modulo.params['url_api'], modulo.params['reintentos'],
+        validate_certs=modulo.params['validate_certs'],
+    )
+
+    inicio = time.monotonic()
+    indice = None
+    if modulo.params['indice']:
+        try:
+            indice = abrir_indice(modulo.params['indice'], cliente)
+        except (ErrorDrive, *ERRORES_INDICE) as error:
+            modulo.fail_json(msg=f"No se pudo actualizar el índice {modulo.params['indice']}: {error}")
+
+    try:
+        archivos, omitidos = buscar(cliente, modulo, indice)
+    except ErrorDrive as error:
+        modulo.fail_json(msg=f"No se pudieron listar los archivos de Drive: {error}")
+    if indice is not None:
+        indice.cerrar()
+
+    pendientes = [archivo for archivo in archivos if not coincide(os.path.join(directorio, nombre_local(archivo['name'])), archivo)]
+    sin_cambios = sorted(set(archivo['name'] for archivo in archivos) - set(archivo['name'] for archivo in pendientes))
+
+    resultado = dict(
+        changed=bool(pendientes),
+        encontrados=len(archivos) + len(omitidos),
+        descargados=[],
+        sin_cambios=sin_cambios,
+        omitidos=omitidos,
+        errores=[],
+    )
+
+    if modulo.check_mode:
+        resultado['descargados'] = [
+            dict(nombre=archivo['name'], id=archivo['id'], tamano=int(archivo['size'])) for archivo in pendientes
+        ]
+    if modulo.check_mode or not pendientes:
+        modulo.exit_json(rendimiento={}, **resultado)
+
+    os.makedirs(directorio, exist_ok=True)
+    descargados, errores = descargar(cliente, pendientes, directorio, modulo.params['verificar_md5'], modulo.params['hilos'])
+    segundos = time.monotonic() - inicio
+
+    total = sum(descargado.pop('transferidos') for descargado in descargados)
+    resultado.update(
+        changed=bool(descargados),
+        descargados=descargados,
+        errores=errores,
+        rendimiento=dict(
+            bytes=total,
+            segundos=round(segundos, 3),
+            bytes_por_segundo=round(total / segundos, 1) if segundos else None,
+            hilos=min(modulo.params['hilos'], len(pendientes)),
+        ),
+    )
+
+    if errores:
+        modulo.fail_json(msg=f"No se pudieron descargar {len(errores)} de {len(pendientes)} archivos.", **resultado)
+
+    modulo.exit_json(**resultado)
+
+if __name__ == '__main__':
+    main()
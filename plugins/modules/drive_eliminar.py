@@ -0,0 +1,245 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+
+DOCUMENTATION = r'''
+---
+module: drive_eliminar
+short_description: Elimina archivos de Google Drive en lotes de hasta 100 por petición.
+description:
+  - Resuelve los nombres a IDs con consultas C(q) paginadas (o con el índice local de C(drive_indice)), escapando las
+    comillas de los nombres.
+  - Envía las eliminaciones al endpoint batch de la API, con hasta 100 eliminaciones por petición HTTP.
+  - Las eliminaciones rechazadas por límite de cuota (403 C(rateLimitExceeded) o C(userRateLimitExceeded), 429 o 5xx)
+    se reintentan en un nuevo lote con espera exponencial.
+  - Retorna en un solo resultado los archivos eliminados, los que no se pudieron eliminar por falta de permisos y los
+    que no se encontraron.
+options:
+  access_token:
+    description:
+      - Access token de Google con permisos sobre Drive (por ejemplo, el que retorna C(jwt_token)).
+    required: true
+    type: str
+  nombres:
+    description:
+      - Nombres exactos de los archivos a eliminar. Se eliminan todos los archivos que tengan cada nombre.
+    required: false
+    type: list
+    elements: str
+  ids:
+    description:
+      - IDs de los archivos a eliminar.
+    required: false
+    type: list
+    elements: str
+  carpeta_id:
+    description:
+      - Limita la búsqueda por C(nombres) a los archivos que están directamente en esta carpeta.
+    required: false
+    type: str
+  tamano_lote:
+    description:
+      - Eliminaciones enviadas en cada petición al endpoint batch. Drive admite como máximo 100.
+    required: false
+    type: int
+    default: 100
+  reintentos:
+    description:
+      - Reintentos de cada petición o eliminación ante errores transitorios, con espera exponencial entre intentos.
+    required: false
+    type: int
+    default: 5
+  url_api:
+    description:
+      - URL base de la API de Google. Útil para pasar por un proxy inverso.
+    required: false
+    type: str
+    default: https://www.googleapis.com
+  validate_certs:
+    description:
+      - Si es C(false) no se validan los certificados TLS de la API ni del proxy. Úselo solo con certificados propios
+        de confianza.
+    required: false
+    type: bool
+    default: true
+  indice:
+    description:
+      - Archivo SQLite del índice local de Drive (ver C(drive_indice)). Los nombres se resuelven en él y los archivos
+        eliminados se quitan del índice.
+    required: false
+    type: path
+notes:
+  - Las peticiones pasan por el proxy de C(https_proxy) (o C(http_proxy)) salvo que C(no_proxy) excluya el host, igual que con C(uri).
+  - Se requiere al menos uno de C(nombres) o C(ids).
+  - Eliminar una carpeta elimina también su contenido. Los archivos se eliminan de forma permanente, sin pasar por la
+    papelera.
+  - Los archivos sin permisos se reportan en C(prohibidos) sin que el módulo falle; el módulo solo falla si alguna
+    eliminación no se pudo completar por otros errores.
+  - En check mode se resuelven los nombres y se reporta en C(eliminados) lo que se eliminaría.
+author:
+  - John Freidman (@xploit9999)
+'''
+
+EXAMPLES = r'''
+- name: Eliminar respaldos antiguos
+  xploit9999.utilidades.drive_eliminar:
+    access_token: "{{ jwt.access_token }}"
+    nombres: "{{ respaldos_antiguos }}"
+  register: eliminacion
+
+- name: Fallar si algún archivo no se pudo eliminar por permisos
+  ansible.builtin.fail:
+    msg: "Sin permisos para eliminar: {{ eliminacion.prohibidos | map(attribute='nombre') | join(', ') }}"
+  when: eliminacion.prohibidos | length > 0
+
+- name: Eliminar por ID
+  xploit9999.utilidades.drive_eliminar:
+    access_token: "{{ jwt.access_token }}"
+    ids:
+      - 1AbCdEfGhIjKlMnOp
+'''
+
+RETURN = r'''
+eliminados:
+  description: Archivos eliminados, con C(id) y C(nombre) (C(nombre) es nulo si se indicó solo el ID).
+  type: list
+  elements: dict
+  returned: always
+prohibidos:
+  description: Archivos que no se pudieron eliminar por falta de permisos, con C(id), C(nombre) y C(msg).
+  type: list
+  elements: dict
+  returned: always
+no_encontrados:
+  description: Nombres sin archivos en Drive e IDs que ya no existían.
+  type: list
+  elements: str
+  returned: always
+errores:
+  description: Archivos cuya eliminación falló por otros motivos o agotó los reintentos, con C(id), C(nombre) y C(msg).
+  type: list
+  elements: dict
+  returned: always
+rendimiento:
+  description: C(peticiones) enviadas al endpoint batch, C(reintentos) de eliminaciones y C(segundos).
+  type: dict
+  returned: always
+'''
+
+import time
+
+from ansible.module_utils.basic import AnsibleModule
+
+from ansible_collections.xploit9999.utilidades.plugins.module_utils.drive import (
+    MAXIMO_LOTE,
+    URL_API,
+    ClienteDrive,
+    ErrorDrive,
+    consulta_nombres,
+    eliminar_por_lotes,
+    escapar_q,
+)
+from ansible_collections.xploit9999.utilidades.plugins.module_utils.indice_drive import (
+    ERRORES_INDICE,
+    abrir_indice,
+)
+
+NOMBRES_POR_CONSULTA = 50
+
+def resolver(cliente, nombres, carpeta_id, indice):
+    """Busca los archivos con esos nombres. Retorna ({id: nombre}, nombres sin archivos)."""
+
+    if indice is not None:
+        encontrados = indice.buscar(nombres=nombres, carpeta_id=carpeta_id)
+    else:
+        condiciones = 'trashed = false' + (f" and '{escapar_q(carpeta_id)}' in parents" if carpeta_id else '')
+        encontrados = []
+        for inicio in range(0, len(nombres), NOMBRES_POR_CONSULTA):
+            q = f"{condiciones} and ({consulta_nombres(nombres[inicio:inicio + NOMBRES_POR_CONSULTA])})"
+            encontrados += cliente.listar(q, 'id,name')
+
+    archivos = {archivo['id']: archivo['name'] for archivo in encontrados}
+    con_archivos = set(archivos.values())
+    return archivos, [nombre for nombre in dict.fromkeys(nombres) if nombre not in con_archivos]
+
+def main():
+    modulo = AnsibleModule(
+        argument_spec=dict(
+            access_token=dict(type='str', required=True, no_log=True),
+            nombres=dict(type='list', elements='str', required=False),
+            ids=dict(type='list', elements='str', required=False),
+            carpeta_id=dict(type='str', required=False),
+            tamano_lote=dict(type='int', required=False, default=MAXIMO_LOTE),
+            reintentos=dict(type='int', required=False, default=5),
+            url_api=dict(type='str', required=False, default=URL_API),
+            validate_certs=dict(type='bool', required=False, default=True),
+            indice=dict(type='path', required=False),
+        ),
+        required_one_of=[('nombres', 'ids')],
+        supports_check_mode=True,
+    )
+
+    if not 1 <= modulo.params['tamano_lote'] <= MAXIMO_LOTE:
+        modulo.fail_json(msg=f"'tamano_lote' debe estar entre 1 y {MAXIMO_LOTE}.")
+
+    cliente = ClienteDrive(
+        modulo.params['access_token'], modulo.params['url_api'], modulo.params['reintentos'],
+        validate_certs=modulo.params['validate_certs'],
+    )
+    inicio = time.monotonic()
+
+    indice = None
+    if modulo.params['indice']:
+        try:
+            indice = abrir_indice(modulo.params['indice'], cliente)
+        except (ErrorDrive, *ERRORES_INDICE) as error:
+            modulo.fail_json(msg=f"No se pudo actualizar el índice {modulo.params['indice']}: {error}")
+
+    archivos = dict.fromkeys(modulo.params['ids'] or [])
+    sin_archivos = []
+    if modulo.params['nombres']:
+        try:
+            encontrados, sin_archivos = resolver(cliente, modulo.params['nombres'], modulo.params['carpeta_id'], indice)
+        except ErrorDrive as error:
+            modulo.fail_json(msg=f"No se pudieron buscar los archivos en Drive: {error}")
+        archivos.update(encontrados)
+
+    if modulo.check_mode or not archivos:
+        modulo.exit_json(
+            changed=bool(archivos),
+            eliminados=[dict(id=archivo_id, nombre=nombre) for archivo_id, nombre in archivos.items()],
+            prohibidos=[],
+            no_encontrados=sin_archivos,
+            errores=[],
+            rendimiento={},
+        )
+
+    try:
+        resultado, peticiones, reintentos = eliminar_por_lotes(cliente, archivos, modulo.params['tamano_lote'])
+    except ErrorDrive as error:
+        modulo.fail_json(msg=f"No se pudieron enviar las eliminaciones a Drive: {error}")
+    finally:
+        cliente.cerrar()
+
+    if indice is not None:
+        try:
+            with indice.conexion:
+                for archivo_id in [archivo['id'] for archivo in resultado['eliminados']] + resultado['no_encontrados']:
+                    indice.quitar(archivo_id)
+        except ERRORES_INDICE as error:
+            modulo.warn(f"No se pudieron quitar los archivos eliminados del índice {modulo.params['indice']}: {error}")
+        indice.cerrar()
+
+    resultado['no_encontrados'] = sin_archivos + resultado['no_encontrados']
+    resultado['rendimiento'] = dict(peticiones=peticiones, reintentos=reintentos, segundos=round(time.monotonic() - inicio, 3))
+
+    if resultado['errores']:
+        modulo.fail_json(
+            msg=f"No se pudieron eliminar {len(resultado['errores'])} de {len(archivos)} archivos.",
+            changed=bool(resultado['eliminados']),
+            **resultado,
+        )
+
+    modulo.exit_json(changed=bool(resultado['eliminados']), **resultado)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,252 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+
+DOCUMENTATION = r'''
+---
+module: drive_indice
+short_description: Mantiene un índice local en SQLite de los archivos de Google Drive y busca en él.
+description:
+  - Guarda en SQLite el ID, nombre, carpetas padre, tipo MIME, MD5, tamaño y fecha de modificación de los archivos
+    de la cuenta.
+  - La primera ejecución llena el índice recorriendo todos los archivos. Las siguientes solo piden a la API de cambios
+    de Drive lo que cambió desde el page token guardado, por lo que sin cambios cuestan dos peticiones HTTP (la
+    identidad de la cuenta y los cambios).
+  - Las búsquedas por nombre, extensión o carpeta se resuelven con una consulta local, sin consultas C(q) a Drive.
+  - Los módulos C(drive_subir) y C(drive_descargar) aceptan el mismo índice con su opción C(indice).
+options:
+  access_token:
+    description:
+      - Access token de Google con permisos sobre Drive (por ejemplo, el que retorna C(jwt_token)).
+      - Requerido cuando C(actualizar=true).
+    required: false
+    type: str
+  indice:
+    description:
+      - Archivo SQLite del índice. Se crea si no existe. Use un archivo distinto por cada cuenta de Drive.
+    required: false
+    type: path
+    default: ~/.cache/xploit9999.utilidades/drive_indice.sqlite
+  actualizar:
+    description:
+      - Aplica los cambios de Drive antes de buscar. Si es C(false) la búsqueda usa el índice tal como está, sin
+        peticiones HTTP.
+    required: false
+    type: bool
+    default: true
+  reconstruir:
+    description:
+      - Descarta el índice y lo vuelve a llenar recorriendo todos los archivos de la cuenta.
+    required: false
+    type: bool
+    default: false
+  nombres:
+    description:
+      - Nombres exactos a buscar.
+    required: false
+    type: list
+    elements: str
+  extension:
+    description:
+      - Busca los archivos cuyo nombre termina en esta extensión (con o sin punto inicial).
+    required: false
+    type: str
+  carpeta_id:
+    description:
+      - Limita la búsqueda a lo que está directamente en esta carpeta. Acepta C(root) para la raíz de Mi unidad.
+    required: false
+    type: str
+  tipo:
+    description:
+      - Restringe la búsqueda a archivos (todo excepto carpetas) o a carpetas.
+    required: false
+    type: str
+    choices: ['todos', 'archivo', 'carpeta']
+    default: todos
+  reintentos:
+    description:
+      - Reintentos de cada petición ante errores transitorios, con espera exponencial entre intentos.
+    required: false
+    type: int
+    default: 5
+  url_api:
+    description:
+      - URL base de la API de Google. Útil para pasar por un proxy inverso.
+    required: false
+    type: str
+    default: https://www.googleapis.com
+  validate_certs:
+    description:
+      - Si es C(false) no se validan los certificados TLS de la API ni del proxy. Úselo solo con certificados propios
+        de confianza.
+    required: false
+    type: bool
+    default: true
+notes:
+  - Las peticiones pasan por el proxy de C(https_proxy) (o C(http_proxy)) salvo que C(no_proxy) excluya el host, igual que con C(uri).
+  - Si no se indica ningún criterio de búsqueda solo se actualiza el índice y C(archivos) se retorna vacío.
+  - El índice se guarda en el equipo donde se ejecuta el módulo; al usar el rol google_drive contra C(localhost)
+    queda en el controlador.
+  - Si el page token guardado vence, o el access token es de otra cuenta que la que llenó el índice, el índice se
+    reconstruye automáticamente.
+author:
+  - John Freidman (@xploit9999)
+'''
+
+EXAMPLES = r'''
+- name: Actualizar el índice y buscar archivos por nombre
+  xploit9999.utilidades.drive_indice:
+    access_token: "{{ jwt.access_token }}"
+    nombres:
+      - base.sql.gz
+      - archivos.tar.gz
+  register: indice
+
+- name: Verificar si ya existe la carpeta respaldos en la raíz de Mi unidad
+  xploit9999.utilidades.drive_indice:
+    access_token: "{{ jwt.access_token }}"
+    nombres: [respaldos]
+    carpeta_id: root
+    tipo: carpeta
+  register: carpeta
+
+- name: Buscar los PDF del índice sin consultar a Drive
+  xploit9999.utilidades.drive_indice:
+    actualizar: false
+    extension: pdf
+  register: pdfs
+'''
+
+RETURN = r'''
+archivos:
+  description: Archivos del índice que cumplen la búsqueda.
+  type: list
+  elements: dict
+  returned: always
+  contains:
+    id:
+      description: ID del archivo en Drive.
+      type: str
+    nombre:
+      description: Nombre del archivo.
+      type: str
+    padres:
+      description: IDs de las carpetas que lo contienen.
+      type: list
+      elements: str
+    mime:
+      description: Tipo MIME.
+      type: str
+    md5:
+      description: C(md5Checksum) de Drive; no existe en carpetas ni documentos nativos de Google.
+      type: str
+    tamano:
+      description: Tamaño en bytes.
+      type: int
+    modificado:
+      description: Fecha de la última modificación (RFC 3339).
+      type: str
+actualizacion:
+  description: Resultado de la actualización del índice.
+  type: dict
+  returned: always
+  contains:
+    completa:
+      description: Si el índice se llenó desde cero en lugar de aplicar solo los cambios.
+      type: bool
+    cambios:
+      description: Cambios aplicados, o archivos indexados si la actualización fue completa.
+      type: int
+    total:
+      description: Archivos en el índice.
+      type: int
+    segundos:
+      description: Duración de la actualización.
+      type: float
+'''
+
+import time
+
+from ansible.module_utils.basic import AnsibleModule
+
+from ansible_collections.xploit9999.utilidades.plugins.module_utils.drive import (
+    URL_API,
+    ClienteDrive,
+    ErrorDrive,
+)
+from ansible_collections.xploit9999.utilidades.plugins.module_utils.indice_drive import (
+    ERRORES_INDICE,
+    RUTA_INDICE,
+    IndiceDrive,
+)
+
+def como_resultado(archivo):
+    return dict(
+        id=archivo['id'],
+        nombre=archivo['name'],
+        padres=archivo['parents'],
+        mime=archivo['mimeType'],
+        md5=archivo.get('md5Checksum'),
+        tamano=int(archivo['size']) if 'size' in archivo else None,
+        modificado=archivo['modifiedTime'],
+    )
+
+def main():
+    modulo = AnsibleModule(
+        argument_spec=dict(
+            access_token=dict(type='str', required=False, no_log=True),
+            indice=dict(type='path', required=False, default=RUTA_INDICE),
+            actualizar=dict(type='bool', required=False, default=True),
+            reconstruir=dict(type='bool', required=False, default=False),
+            nombres=dict(type='list', elements='str', required=False),
+            extension=dict(type='str', required=False),
+            carpeta_id=dict(type='str', required=False),
+            tipo=dict(type='str', required=False, default='todos', choices=['todos', 'archivo', 'carpeta']),
+            reintentos=dict(type='int', required=False, default=5),
+            url_api=dict(type='str', required=False, default=URL_API),
+            validate_certs=dict(type='bool', required=False, default=True),
+        ),
+        required_if=[
+            ('actualizar', True, ('access_token',)),
+            ('reconstruir', True, ('access_token',)),
+        ],
+        supports_check_mode=True,
+    )
+
+    try:
+        indice = IndiceDrive(modulo.params['indice'])
+    except ERRORES_INDICE as error:
+        modulo.fail_json(msg=f"No se pudo abrir el índice {modulo.params['indice']}: {error}")
+
+    actualizacion = dict(completa=False, cambios=0)
+    inicio = time.monotonic()
+    if modulo.params['actualizar'] or modulo.params['reconstruir']:
+        cliente = ClienteDrive(
+            modulo.params['access_token'], modulo.params['url_api'], modulo.params['reintentos'],
+            validate_certs=modulo.params['validate_certs'],
+        )
+        try:
+            actualizacion = indice.actualizar(cliente, modulo.params['reconstruir'])
+        except (ErrorDrive, *ERRORES_INDICE) as error:
+            modulo.fail_json(msg=f"No se pudo actualizar el índice de Drive: {error}")
+        finally:
+            cliente.cerrar()
+
+    criterios = (modulo.params['nombres'], modulo.params['extension'], modulo.params['carpeta_id'])
+    archivos = []
+    try:
+        actualizacion.update(total=indice.total(), segundos=round(time.monotonic() - inicio, 3))
+        if any(criterio is not None for criterio in criterios) or modulo.params['tipo'] != 'todos':
+            archivos = indice.buscar(
+                nombres=modulo.params['nombres'],
+                extension=modulo.params['extension'],
+                carpeta_id=modulo.params['carpeta_id'],
+                tipo=None if modulo.params['tipo'] == 'todos' else modulo.params['tipo'],
+            )
+    except ERRORES_INDICE as error:
+        modulo.fail_json(msg=f"No se pudo consultar el índice {modulo.params['indice']}: {error}")
+    indice.cerrar()
+
+    modulo.exit_json(changed=False, archivos=[como_resultado(archivo) for archivo in archivos], actualizacion=actualizacion)
+
+if __name__ == '__main__':
+    main()
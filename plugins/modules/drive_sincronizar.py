@@ -0,0 +1,586 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+
+DOCUMENTATION = r'''
+---
+module: drive_sincronizar
+short_description: Sincroniza un directorio local con una carpeta de Google Drive, subiendo solo lo que cambió.
+description:
+  - Recorre el directorio de forma recursiva y recrea su jerarquía de carpetas en Drive, reutilizando las carpetas que
+    ya existen.
+  - Compara cada archivo con el de Drive del mismo nombre. Si coinciden el tamaño y la fecha de modificación se
+    considera sin cambios; si solo coincide el tamaño se compara el MD5 local con el C(md5Checksum) de Drive.
+  - Sube en paralelo los archivos nuevos y reemplaza el contenido de los modificados conservando su ID, con el
+    protocolo de subida reanudable.
+  - Opcionalmente elimina de Drive los archivos y carpetas que ya no existen en el directorio local, en lotes.
+  - Reporta cuántos archivos y bytes se transfirieron y cuántos se omitieron por no tener cambios.
+options:
+  access_token:
+    description:
+      - Access token de Google con permisos sobre Drive (por ejemplo, el que retorna C(jwt_token)).
+    required: true
+    type: str
+  origen:
+    description:
+      - Directorio local a sincronizar.
+    required: true
+    type: path
+  carpeta_id:
+    description:
+      - ID de la carpeta de Drive donde se crea (o se reutiliza) la carpeta sincronizada. C(root) es la raíz de
+        Mi unidad.
+    required: false
+    type: str
+    default: root
+  nombre:
+    description:
+      - Nombre de la carpeta sincronizada en Drive. Por defecto el nombre del directorio C(origen).
+    required: false
+    type: str
+  eliminar_huerfanos:
+    description:
+      - Elimina de la carpeta sincronizada los archivos y carpetas que no existen en C(origen).
+    required: false
+    type: bool
+    default: false
+  comparar_md5:
+    description:
+      - Compara siempre el MD5 de los archivos, aunque coincidan el tamaño y la fecha de modificación.
+    required: false
+    type: bool
+    default: false
+  excluir:
+    description:
+      - Patrones (estilo C(fnmatch)) de archivos y directorios a ignorar. Se comparan con el nombre y con la ruta
+        relativa a C(origen).
+    required: false
+    type: list
+    elements: str
+    default: []
+  tamano_fragmento:
+    description:
+      - Tamaño en MiB de cada fragmento enviado. Un fragmento de cada hilo se mantiene en memoria.
+    required: false
+    type: int
+    default: 8
+  hilos:
+    description:
+      - Número de archivos que se suben en paralelo.
+    required: false
+    type: int
+    default: 4
+  reintentos:
+    description:
+      - Reintentos de cada petición o fragmento ante errores transitorios, con espera exponencial entre intentos.
+    required: false
+    type: int
+    default: 5
+  url_api:
+    description:
+      - URL base de la API de Google. Útil para pasar por un proxy inverso.
+    required: false
+    type: str
+    default: https://www.googleapis.com
+  validate_certs:
+    description:
+      - Si es C(false) no se validan los certificados TLS de la API ni del proxy. Úselo solo con certificados propios
+        de confianza.
+    required: false
+    type: bool
+    default: true
+  indice:
+    description:
+      - Archivo SQLite del índice local de Drive (ver C(drive_indice)). El contenido de las carpetas se lee del índice
+        en lugar de consultar a la API por cada carpeta.
+    required: false
+    type: path
+notes:
+  - Las peticiones pasan por el proxy de C(https_proxy) (o C(http_proxy)) salvo que C(no_proxy) excluya el host, igual que con C(uri).
+  - La fecha de modificación local se guarda como C(modifiedTime) de los archivos subidos. Si un archivo tiene el mismo
+    MD5 pero otra fecha, solo se actualiza su C(modifiedTime) para que las siguientes ejecuciones no calculen el MD5.
+  - Los documentos nativos de Google (Docs, Sheets, ...) nunca se consideran iguales a un archivo local.
+  - No se siguen los enlaces simbólicos a directorios; los enlaces a archivos se suben con el contenido del archivo
+    apuntado. Los enlaces a directorios, los archivos especiales (FIFOs, sockets, dispositivos, enlaces rotos) y las
+    rutas que no se pueden leer se omiten, y su copia en Drive no se considera huérfana ni se elimina.
+  - En check mode no se crean carpetas ni se transfieren archivos; se reporta lo que se haría.
+author:
+  - John Freidman (@xploit9999)
+'''
+
+EXAMPLES = r'''
+- name: Espejar los reportes en Drive, eliminando lo que ya no existe localmente
+  xploit9999.utilidades.drive_sincronizar:
+    access_token: "{{ jwt.access_token }}"
+    origen: /srv/reportes
+    eliminar_huerfanos: true
+    excluir:
+      - "*.tmp"
+      - .cache
+  register: sincronizacion
+
+- name: Mostrar lo transferido
+  ansible.builtin.debug:
+    msg: >-
+      {{ sincronizacion.resumen.subidos + sincronizacion.resumen.actualizados }} archivos,
+      {{ sincronizacion.resumen.bytes_transferidos | filesizeformat }} transferidos,
+      {{ sincronizacion.resumen.bytes_omitidos | filesizeformat }} sin cambios
+'''
+
+RETURN = r'''
+carpeta_id:
+  description: ID de la carpeta de Drive sincronizada (nulo en check mode si aún no existe).
+  type: str
+  returned: always
+carpetas_creadas:
+  description: Rutas relativas de las carpetas creadas en Drive.
+  type: list
+  elements: str
+  returned: always
+subidos:
+  description: Archivos nuevos subidos, con C(ruta), C(id) y C(tamano).
+  type: list
+  elements: dict
+  returned: always
+actualizados:
+  description: Archivos modificados cuyo contenido se reemplazó en Drive, con C(ruta), C(id) y C(tamano).
+  type: list
+  elements: dict
+  returned: always
+fechas_actualizadas:
+  description: Archivos sin cambios de contenido a los que solo se les actualizó C(modifiedTime) en Drive, con C(ruta) e C(id).
+  type: list
+  elements: dict
+  returned: always
+eliminados:
+  description: Archivos y carpetas huérfanos eliminados de Drive, con C(id) y C(nombre) (ruta relativa).
+  type: list
+  elements: dict
+  returned: always
+errores:
+  description: Archivos o carpetas que no se pudieron sincronizar, con el motivo.
+  type: list
+  elements: dict
+  returned: always
+resumen:
+  description: Conteos y bytes de la sincronización.
+  type: dict
+  returned: always
+  contains:
+    archivos:
+      description: Archivos locales considerados.
+      type: int
+    subidos:
+      description: Archivos nuevos subidos.
+      type: int
+    actualizados:
+      description: Archivos modificados reemplazados.
+      type: int
+    sin_cambios:
+      description: Archivos que ya estaban al día.
+      type: int
+    fechas_actualizadas:
+      description: Archivos sin cambios a los que solo se les actualizó la fecha de modificación.
+      type: int
+    omitidos:
+      description: Enlaces simbólicos a directorios, archivos especiales y rutas ilegibles que no se sincronizaron.
+      type: int
+    eliminados:
+      description: Huérfanos eliminados.
+      type: int
+    carpetas_creadas:
+      description: Carpetas creadas.
+      type: int
+    bytes_transferidos:
+      description: Bytes subidos.
+      type: int
+    bytes_omitidos:
+      description: Bytes de los archivos sin cambios, que no se subieron.
+      type: int
+    segundos:
+      description: Duración de la sincronización.
+      type: float
+    bytes_por_segundo:
+      description: Velocidad promedio de subida.
+      type: float
+    hilos:
+      description: Archivos subidos en paralelo.
+      type: int
+'''
+
+import fnmatch
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import quote
+
+from ansible.module_utils.basic import AnsibleModule
+
+from ansible_collections.xploit9999.utilidades.plugins.module_utils.drive import (
+    TIPO_CARPETA,
+    URL_API,
+    ClienteDrive,
+    ErrorDrive,
+    eliminar_por_lotes,
+    escapar_q,
+)
+from ansible_collections.xploit9999.utilidades.plugins.module_utils.firmas import digest_archivo
+from ansible_collections.xploit9999.utilidades.plugins.module_utils.indice_drive import (
+    ERRORES_INDICE,
+    abrir_indice,
+)
+from ansible_collections.xploit9999.utilidades.plugins.module_utils.subida_drive import (
+    CAMPOS,
+    MIB,
+    fecha_rfc3339,
+    subir_archivo,
+)
+
+PREFIJO_NATIVO = 'application/vnd.google-apps.'
+
+def contenido(cliente, indice, carpeta_id):
+    """Contenido directo de una carpeta de Drive, leído del índice local o con una consulta a la API."""
+
+    if indice is not None:
+        return indice.buscar(carpeta_id=carpeta_id)
+    return list(cliente.listar(f"'{escapar_q(carpeta_id)}' in parents and trashed = false", CAMPOS))
+
+def separar(elementos):
+    """Separa el contenido de una carpeta en ({nombre: carpeta}, {nombre: archivo}, sobrantes).
+
+    Si hay nombres repetidos se usa el primero; los demás y los documentos nativos de Google quedan en sobrantes.
+    """
+
+    carpetas = {}
+    archivos = {}
+    sobrantes = []
+    for elemento in elementos:
+        if elemento['mimeType'] == TIPO_CARPETA:
+            destino = carpetas
+        elif elemento['mimeType'].startswith(PREFIJO_NATIVO):
+            sobrantes.append(elemento)
+            continue
+        else:
+            destino = archivos
+
+        if elemento['name'] in destino:
+            sobrantes.append(elemento)
+        else:
+            destino[elemento['name']] = elemento
+
+    return carpetas, archivos, sobrantes
+
+def excluido(relativo, patrones):
+    nombre = os.path.basename(relativo)
+    return any(fnmatch.fnmatch(nombre, patron) or fnmatch.fnmatch(relativo, patron) for patron in patrones)
+
+def comparar(ruta, estado, remoto, comparar_md5):
+    """Compara un archivo local con el de Drive. Retorna C(igual), C(fecha) (mismo contenido, otra fecha) o C(distinto)."""
+
+    if int(remoto.get('size', -1)) != estado.st_size or 'md5Checksum' not in remoto:
+        return 'distinto'
+    misma_fecha = remoto.get('modifiedTime') == fecha_rfc3339(estado.st_mtime)
+    if misma_fecha and not comparar_md5:
+        return 'igual'
+    if digest_archivo(ruta, 'md5')[0].hex() != remoto['md5Checksum']:
+        return 'distinto'
+    return 'igual' if misma_fecha else 'fecha'
+
+def crear_carpeta(cliente, nombre, padre):
+    return cliente.api(
+        'POST', '/drive/v3/files', {'fields': CAMPOS, 'supportsAllDrives': 'true'},
+        {'name': nombre, 'mimeType': TIPO_CARPETA, 'parents': [padre]},
+    )
+
+def planificar(cliente, indice, modulo, carpeta_raiz):
+    """Recorre C(origen) creando las carpetas que faltan y clasifica cada archivo local frente a Drive.
+
+    Retorna un diccionario con las tareas de subida, los huérfanos, las carpetas creadas (rutas en C(carpetas_creadas)
+    y metadatos de Drive en C(carpetas)) y los errores.
+    """
+
+    origen = modulo.params['origen']
+    patrones = modulo.params['excluir']
+    plan = dict(
+        tareas=[], sin_cambios=0, bytes_omitidos=0, archivos=0, omitidos=0, huerfanos={}, carpetas_creadas=[], carpetas=[],
+        errores=[],
+    )
+    carpetas = {'.': carpeta_raiz}
+
+    def error_recorrido(error):
+        plan['errores'].append(dict(ruta=error.filename, msg=error.strerror))
+
+    for directorio, subdirectorios, nombres in os.walk(origen, onerror=error_recorrido):
+        relativo = os.path.relpath(directorio, origen)
+        carpeta_id = carpetas.get(relativo)
+        prefijo = '' if relativo == '.' else f"{relativo}/"
+
+        try:
+            remotas, remotos, sobrantes = separar(contenido(cliente, indice, carpeta_id)) if carpeta_id else ({}, {}, [])
+        except ErrorDrive as error:
+            plan['errores'].append(dict(ruta=directorio, msg=f"No se pudo listar la carpeta en Drive: {error}"))
+            subdirectorios[:] = []
+            continue
+
+        def omitir(nombre):
+            # Lo que existe localmente pero no se sincroniza tampoco es huérfano en Drive
+            plan['omitidos'] += 1
+            remotas.pop(nombre, None)
+            remotos.pop(nombre, None)
+
+        locales = []
+        for nombre in sorted(subdirectorios):
+            if excluido(prefijo + nombre, patrones):
+                continue
+            if os.path.islink(os.path.join(directorio, nombre)):
+                omitir(nombre)
+                continue
+            locales.append(nombre)
+        subdirectorios[:] = locales
+
+        for nombre in list(subdirectorios):
+            existente = remotas.pop(nombre, None)
+            if existente is not None:
+                carpetas[prefijo + nombre] = existente['id']
+                continue
+
+            plan['carpetas_creadas'].append(prefijo + nombre)
+            if modulo.check_mode or carpeta_id is None:
+                continue
+            try:
+                creada = crear_carpeta(cliente, nombre, carpeta_id)
+            except ErrorDrive as error:
+                plan['errores'].append(dict(ruta=os.path.join(directorio, nombre), msg=f"No se pudo crear la carpeta: {error}"))
+                subdirectorios.remove(nombre)
+                continue
+            carpetas[prefijo + nombre] = creada['id']
+            plan['carpetas'].append(creada)
+
+        for nombre in sorted(nombres):
+            ruta = os.path.join(directorio, nombre)
+            if excluido(prefijo + nombre, patrones):
+                continue
+            if not os.path.isfile(ruta):
+                omitir(nombre)
+                continue
+            remoto = remotos.pop(nombre, None)
+            try:
+                estado = os.stat(ruta)
+                resultado = comparar(ruta, estado, remoto, modulo.params['comparar_md5']) if remoto else 'nuevo'
+            except OSError as error:
+                plan['errores'].append(dict(ruta=ruta, msg=error.strerror))
+                plan['omitidos'] += 1
+                remotas.pop(nombre, None)
+                continue
+
+            plan['archivos'] += 1
+            if resultado in ('igual', 'fecha'):
+                plan['sin_cambios'] += 1
+                plan['bytes_omitidos'] += estado.st_size
+            tarea = dict(
+                ruta=ruta,
+                carpeta_id=carpeta_id,
+                archivo_id=remoto['id'] if remoto else None,
+                tamano=estado.st_size,
+                modificado=fecha_rfc3339(estado.st_mtime),
+                tipo=resultado,
+            )
+            if resultado != 'igual':
+                plan['tareas'].append(tarea)
+
+        # Lo excluido localmente tampoco se considera huérfano en Drive
+        for elemento in list(remotas.values()) + list(remotos.values()) + sobrantes:
+            if not excluido(prefijo + elemento['name'], patrones):
+                plan['huerfanos'][elemento['id']] = prefijo + elemento['name']
+
+    return plan
+
+def ejecutar(cliente, tarea, tamano_fragmento):
+    """Sube un archivo nuevo, reemplaza el contenido de uno modificado o actualiza solo su fecha de modificación."""
+
+    if tarea['tipo'] == 'fecha':
+        return cliente.api(
+            'PATCH', f"/drive/v3/files/{quote(tarea['archivo_id'], safe='')}", {'fields': CAMPOS, 'supportsAllDrives': 'true'},
+            {'modifiedTime': tarea['modificado']},
+        )
+
+    subido = subir_archivo(
+        cliente, tarea['ruta'], tarea['carpeta_id'], tamano_fragmento, tarea['archivo_id'], tarea['modificado']
+    )
+    return subido['metadatos']
+
+def transferir(cliente, tareas, tamano_fragmento, hilos):
+    """Ejecuta las tareas en paralelo. Retorna [(tarea, metadatos de Drive o None, error o None)].
+
+    Cada hilo reutiliza su conexión para todas sus tareas; C(main) cierra las conexiones al terminar.
+    """
+
+    def ejecutar_una(tarea):
+        try:
+            return tarea, ejecutar(cliente, tarea, tamano_fragmento), None
+        except (ErrorDrive, OSError) as error:
+            return tarea, None, str(error)
+
+    with ThreadPoolExecutor(max_workers=hilos) as pool:
+        return list(pool.map(ejecutar_una, tareas))
+
+def main():
+    modulo = AnsibleModule(
+        argument_spec=dict(
+            access_token=dict(type='str', required=True, no_log=True),
+            origen=dict(type='path', required=True),
+            carpeta_id=dict(type='str', required=False, default='root'),
+            nombre=dict(type='str', required=False),
+            eliminar_huerfanos=dict(type='bool', required=False, default=False),
+            comparar_md5=dict(type='bool', required=False, default=False),
+            excluir=dict(type='list', elements='str', required=False, default=[]),
+            tamano_fragmento=dict(type='int', required=False, default=8),
+            hilos=dict(type='int', required=False, default=4),
+            reintentos=dict(type='int', required=False, default=5),
+            url_api=dict(type='str', required=False, default=URL_API),
+            validate_certs=dict(type='bool', required=False, default=True),
+            indice=dict(type='path', required=False),
+        ),
+        supports_check_mode=True,
+    )
+
+    origen = modulo.params['origen'].rstrip('/') or '/'
+    modulo.params['origen'] = origen
+    if not os.path.isdir(origen):
+        modulo.fail_json(msg=f"No se encontró el directorio {origen}")
+    if modulo.params['tamano_fragmento'] < 1:
+        modulo.fail_json(msg="'tamano_fragmento' debe ser de al menos 1 MiB.")
+    if modulo.params['hilos'] < 1:
+        modulo.fail_json(msg="'hilos' debe ser mayor o igual a 1.")
+
+    nombre = modulo.params['nombre'] or os.path.basename(origen)
+    cliente = ClienteDrive(
+        modulo.params['access_token'], modulo.params['url_api'], modulo.params['reintentos'],
+        validate_certs=modulo.params['validate_certs'],
+    )
+    inicio = time.monotonic()
+
+    indice = None
+    if modulo.params['indice']:
+        try:
+            indice = abrir_indice(modulo.params['indice'], cliente)
+        except (ErrorDrive, *ERRORES_INDICE) as error:
+            modulo.fail_json(msg=f"No se pudo actualizar el índice {modulo.params['indice']}: {error}")
+
+    carpetas_creadas = []
+    try:
+        existente = separar(contenido(cliente, indice, modulo.params['carpeta_id']))[0].get(nombre)
+        if existente is not None:
+            carpeta_raiz = existente['id']
+        elif modulo.check_mode:
+            carpeta_raiz = None
+        else:
+            carpeta_raiz = crear_carpeta(cliente, nombre, modulo.params['carpeta_id'])['id']
+        if existente is None:
+            carpetas_creadas.append('.')
+    except ErrorDrive as error:
+        modulo.fail_json(msg=f"No se pudo obtener la carpeta {nombre} en Drive: {error}")
+
+    plan = planificar(cliente, indice, modulo, carpeta_raiz)
+    carpetas_creadas += plan['carpetas_creadas']
+    huerfanos = plan['huerfanos'] if modulo.params['eliminar_huerfanos'] else {}
+    transferencias = [tarea for tarea in plan['tareas'] if tarea['tipo'] != 'fecha']
+
+    resultado = dict(
+        carpeta_id=carpeta_raiz,
+        carpetas_creadas=carpetas_creadas,
+        subidos=[],
+        actualizados=[],
+        fechas_actualizadas=[],
+        eliminados=[],
+        errores=plan['errores'],
+    )
+    resumen = dict(
+        archivos=plan['archivos'],
+        sin_cambios=plan['sin_cambios'],
+        omitidos=plan['omitidos'],
+        carpetas_creadas=len(carpetas_creadas),
+        bytes_omitidos=plan['bytes_omitidos'],
+        hilos=min(modulo.params['hilos'], len(plan['tareas'])),
+    )
+
+    if modulo.check_mode:
+        resultado.update(
+            subidos=[
+                dict(ruta=tarea['ruta'], id=None, tamano=tarea['tamano'])
+                for tarea in transferencias if tarea['tipo'] == 'nuevo'
+            ],
+            actualizados=[
+                dict(ruta=tarea['ruta'], id=tarea['archivo_id'], tamano=tarea['tamano'])
+                for tarea in transferencias if tarea['tipo'] == 'distinto'
+            ],
+            fechas_actualizadas=[
+                dict(ruta=tarea['ruta'], id=tarea['archivo_id']) for tarea in plan['tareas'] if tarea['tipo'] == 'fecha'
+            ],
+            eliminados=[dict(id=archivo_id, nombre=ruta) for archivo_id, ruta in huerfanos.items()],
+        )
+        resumen.update(bytes_transferidos=sum(tarea['tamano'] for tarea in transferencias), segundos=0, bytes_por_segundo=None)
+    else:
+        metadatos = list(plan['carpetas'])
+        tamano_fragmento = modulo.params['tamano_fragmento'] * MIB
+        for tarea, archivo, error in transferir(cliente, plan['tareas'], tamano_fragmento, modulo.params['hilos']):
+            if error is not None:
+                resultado['errores'].append(dict(ruta=tarea['ruta'], msg=error))
+                continue
+            metadatos.append(archivo)
+            if tarea['tipo'] == 'nuevo':
+                resultado['subidos'].append(dict(ruta=tarea['ruta'], id=archivo['id'], tamano=tarea['tamano']))
+            elif tarea['tipo'] == 'distinto':
+                resultado['actualizados'].append(dict(ruta=tarea['ruta'], id=archivo['id'], tamano=tarea['tamano']))
+            else:
+                resultado['fechas_actualizadas'].append(dict(ruta=tarea['ruta'], id=archivo['id']))
+
+        if huerfanos:
+            try:
+                eliminacion = eliminar_por_lotes(cliente, huerfanos)[0]
+                resultado['eliminados'] = eliminacion['eliminados']
+                resultado['errores'] += [
+                    dict(nombre=fallido['nombre'], msg=fallido['msg']) for fallido in eliminacion['prohibidos'] + eliminacion['errores']
+                ]
+            except ErrorDrive as error:
+                resultado['errores'].append(dict(msg=f"No se pudieron eliminar los huérfanos: {error}"))
+        cliente.cerrar()
+
+        segundos = time.monotonic() - inicio
+        transferidos = sum(archivo['tamano'] for archivo in resultado['subidos'] + resultado['actualizados'])
+        resumen.update(
+            bytes_transferidos=transferidos,
+            segundos=round(segundos, 3),
+            bytes_por_segundo=round(transferidos / segundos, 1) if segundos else None,
+        )
+
+        if indice is not None:
+            try:
+                with indice.conexion:
+                    for archivo in metadatos:
+                        indice.guardar(archivo)
+                    for eliminado in resultado['eliminados']:
+                        indice.quitar(eliminado['id'])
+            except ERRORES_INDICE as error:
+                modulo.warn(f"No se pudo actualizar el índice {modulo.params['indice']}: {error}")
+
+    if indice is not None:
+        indice.cerrar()
+
+    resumen.update(
+        subidos=len(resultado['subidos']),
+        actualizados=len(resultado['actualizados']),
+        fechas_actualizadas=len(resultado['fechas_actualizadas']),
+        eliminados=len(resultado['eliminados']),
+    )
+    resultado['resumen'] = resumen
+    cambios = any(
+        resultado[clave] for clave in ('carpetas_creadas', 'subidos', 'actualizados', 'fechas_actualizadas', 'eliminados')
+    )
+
+    if resultado['errores']:
+        modulo.fail_json(msg=f"No se pudieron sincronizar {len(resultado['errores'])} elementos.", changed=cambios, **resultado)
+
+    modulo.exit_json(changed=cambios, **resultado)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,284 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+
+DOCUMENTATION = r'''
+---
+module: drive_subir
+short_description: Sube archivos a Google Drive con el protocolo de subida reanudable.
+description:
+  - Sube archivos a Google Drive leyéndolos del disco por fragmentos de tamaño fijo con el protocolo de subida
+    reanudable de la API v3, por lo que el tamaño de los archivos no está limitado por la memoria.
+  - Los archivos se suben en paralelo; cada hilo reutiliza su conexión HTTP entre fragmentos y archivos.
+  - Un fragmento que falla se reintenta consultando a Drive cuántos bytes recibió, sin volver a empezar el archivo.
+  - El tipo MIME se deduce de la extensión del archivo, sin ejecutar procesos externos.
+  - Con C(indice), los archivos que ya existen en la carpeta de destino con el mismo nombre, tamaño y MD5 no se
+    vuelven a subir, y los subidos se agregan al índice.
+options:
+  access_token:
+    description:
+      - Access token de Google con permisos sobre Drive (por ejemplo, el que retorna C(jwt_token)).
+    required: true
+    type: str
+  archivos:
+    description:
+      - Rutas de los archivos a subir.
+    required: true
+    type: list
+    elements: path
+  carpeta_id:
+    description:
+      - ID de la carpeta de Drive donde se crean los archivos. Si se omite se suben a la raíz de Mi unidad.
+    required: false
+    type: str
+  tamano_fragmento:
+    description:
+      - Tamaño en MiB de cada fragmento enviado. Un fragmento de cada hilo se mantiene en memoria.
+    required: false
+    type: int
+    default: 8
+  hilos:
+    description:
+      - Número de archivos que se suben en paralelo.
+    required: false
+    type: int
+    default: 4
+  reintentos:
+    description:
+      - Reintentos de cada petición o fragmento ante errores transitorios (429, 5xx o conexiones cortadas),
+        con espera exponencial entre intentos.
+    required: false
+    type: int
+    default: 5
+  url_api:
+    description:
+      - URL base de la API de Google. Útil para pasar por un proxy inverso.
+    required: false
+    type: str
+    default: https://www.googleapis.com
+  validate_certs:
+    description:
+      - Si es C(false) no se validan los certificados TLS de la API ni del proxy. Úselo solo con certificados propios
+        de confianza.
+    required: false
+    type: bool
+    default: true
+  indice:
+    description:
+      - Archivo SQLite del índice local de Drive (ver C(drive_indice)). Se actualiza antes de subir y se usa para
+        omitir los archivos que ya están en Drive.
+    required: false
+    type: path
+notes:
+  - Las peticiones pasan por el proxy de C(https_proxy) (o C(http_proxy)) salvo que C(no_proxy) excluya el host, igual que con C(uri).
+author:
+  - John Freidman (@xploit9999)
+'''
+
+EXAMPLES = r'''
+- name: Subir respaldos a una carpeta de Drive
+  xploit9999.utilidades.drive_subir:
+    access_token: "{{ jwt.access_token }}"
+    archivos:
+      - /backups/base.sql.gz
+      - /backups/archivos.tar.gz
+    carpeta_id: "1AbCdEfGhIjKlMnOp"
+    tamano_fragmento: 32
+  register: subida
+
+- name: Mostrar velocidad de subida
+  ansible.builtin.debug:
+    msg: "{{ subida.rendimiento.bytes_por_segundo | filesizeformat }}/s"
+'''
+
+RETURN = r'''
+subidos:
+  description: Archivos subidos.
+  type: list
+  elements: dict
+  returned: always
+  contains:
+    ruta:
+      description: Ruta local del archivo.
+      type: str
+    id:
+      description: ID del archivo creado en Drive.
+      type: str
+    nombre:
+      description: Nombre del archivo en Drive.
+      type: str
+    mime:
+      description: Tipo MIME con el que se subió.
+      type: str
+    tamano:
+      description: Tamaño en bytes.
+      type: int
+    md5:
+      description: C(md5Checksum) calculado por Drive.
+      type: str
+    reintentos:
+      description: Fragmentos o peticiones que debieron reintentarse.
+      type: int
+sin_cambios:
+  description: Rutas de los archivos omitidos porque ya estaban en Drive (solo con C(indice)).
+  type: list
+  elements: str
+  returned: always
+errores:
+  description: Archivos que no se pudieron subir, con el motivo.
+  type: list
+  elements: dict
+  returned: always
+rendimiento:
+  description: Métricas de la subida.
+  type: dict
+  returned: always
+  contains:
+    bytes:
+      description: Bytes subidos.
+      type: int
+    segundos:
+      description: Duración de la subida.
+      type: float
+    bytes_por_segundo:
+      description: Velocidad promedio.
+      type: float
+    hilos:
+      description: Archivos subidos en paralelo.
+      type: int
+'''
+
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from ansible.module_utils.basic import AnsibleModule
+
+from ansible_collections.xploit9999.utilidades.plugins.module_utils.drive import (
+    URL_API,
+    ClienteDrive,
+    ErrorDrive,
+)
+from ansible_collections.xploit9999.utilidades.plugins.module_utils.firmas import digest_archivo
+from ansible_collections.xploit9999.utilidades.plugins.module_utils.indice_drive import (
+    ERRORES_INDICE,
+    abrir_indice,
+)
+from ansible_collections.xploit9999.utilidades.plugins.module_utils.subida_drive import (
+    MIB,
+    subir_archivo,
+)
+
+def ya_subido(indice, ruta, carpeta_id):
+    """Indica si el índice tiene en la carpeta de destino un archivo con el mismo nombre, tamaño y MD5."""
+
+    tamano = str(os.path.getsize(ruta))
+    existentes = indice.buscar(nombres=[os.path.basename(ruta)], carpeta_id=carpeta_id or 'root', tipo='archivo')
+    candidatos = [archivo for archivo in existentes if archivo.get('size') == tamano and 'md5Checksum' in archivo]
+    if not candidatos:
+        return False
+
+    md5 = digest_archivo(ruta, 'md5')[0].hex()
+    return any(archivo['md5Checksum'] == md5 for archivo in candidatos)
+
+def subir(cliente, archivos, carpeta_id, tamano_fragmento, hilos):
+    """Sube los archivos en paralelo. Retorna (subidos, errores)."""
+
+    def subir_uno(ruta):
+        try:
+            return subir_archivo(cliente, ruta, carpeta_id, tamano_fragmento), None
+        except (ErrorDrive, OSError) as error:
+            return None, dict(ruta=ruta, msg=str(error))
+
+    # Cada hilo reutiliza su conexión para todos sus archivos; se cierran al terminar el lote
+    with ThreadPoolExecutor(max_workers=hilos) as pool:
+        resultados = list(pool.map(subir_uno, archivos))
+    cliente.cerrar()
+
+    subidos = [subido for subido, _ in resultados if subido]
+    errores = [error for _, error in resultados if error]
+    return subidos, errores
+
+def main():
+    modulo = AnsibleModule(
+        argument_spec=dict(
+            access_token=dict(type='str', required=True, no_log=True),
+            archivos=dict(type='list', elements='path', required=True),
+            carpeta_id=dict(type='str', required=False),
+            tamano_fragmento=dict(type='int', required=False, default=8),
+            hilos=dict(type='int', required=False, default=4),
+            reintentos=dict(type='int', required=False, default=5),
+            url_api=dict(type='str', required=False, default=URL_API),
+            validate_certs=dict(type='bool', required=False, default=True),
+            indice=dict(type='path', required=False),
+        ),
+        supports_check_mode=True,
+    )
+
+    archivos = modulo.params['archivos']
+    if modulo.params['tamano_fragmento'] < 1:
+        modulo.fail_json(msg="'tamano_fragmento' debe ser de al menos 1 MiB.")
+    if modulo.params['hilos'] < 1:
+        modulo.fail_json(msg="'hilos' debe ser mayor o igual a 1.")
+
+    no_encontrados = [ruta for ruta in archivos if not os.path.isfile(ruta)]
+    if no_encontrados:
+        modulo.fail_json(msg=f"No se encontraron los archivos: {', '.join(no_encontrados)}")
+
+    cliente = ClienteDrive(
+        modulo.params['access_token'], modulo.params['url_api'], modulo.params['reintentos'],
+        validate_certs=modulo.params['validate_certs'],
+    )
+    carpeta_id = modulo.params['carpeta_id']
+
+    indice = None
+    pendientes = archivos
+    sin_cambios = []
+    if modulo.params['indice']:
+        try:
+            indice = abrir_indice(modulo.params['indice'], cliente)
+            existentes = {ruta for ruta in archivos if ya_subido(indice, ruta, carpeta_id)}
+        except (ErrorDrive, *ERRORES_INDICE) as error:
+            modulo.fail_json(msg=f"No se pudo usar el índice {modulo.params['indice']}: {error}")
+        finally:
+            cliente.cerrar()
+        sin_cambios = [ruta for ruta in archivos if ruta in existentes]
+        pendientes = [ruta for ruta in archivos if ruta not in existentes]
+
+    if modulo.check_mode or not pendientes:
+        modulo.exit_json(changed=bool(pendientes), subidos=[], sin_cambios=sin_cambios, errores=[], rendimiento={})
+
+    inicio = time.monotonic()
+    subidos, errores = subir(cliente, pendientes, carpeta_id, modulo.params['tamano_fragmento'] * MIB, modulo.params['hilos'])
+    segundos = time.monotonic() - inicio
+
+    metadatos = [subido.pop('metadatos') for subido in subidos]
+    if indice is not None:
+        try:
+            with indice.conexion:
+                for archivo in metadatos:
+                    indice.guardar(archivo)
+        except ERRORES_INDICE as error:
+            modulo.warn(f"No se pudieron agregar los archivos subidos al índice {modulo.params['indice']}: {error}")
+        indice.cerrar()
+
+    total = sum(subido['tamano'] for subido in subidos)
+    resultado = dict(
+        changed=bool(subidos),
+        subidos=subidos,
+        sin_cambios=sin_cambios,
+        errores=errores,
+        rendimiento=dict(
+            bytes=total,
+            segundos=round(segundos, 3),
+            bytes_por_segundo=round(total / segundos, 1) if segundos else None,
+            hilos=min(modulo.params['hilos'], len(pendientes)),
+        ),
+    )
+
+    if errores:
+        modulo.fail_json(msg=f"No se pudieron subir {len(errores)} de {len(pendientes)} archivos.", **resultado)
+
+    modulo.exit_json(**resultado)
+
+if __name__ == '__main__':
+    main()
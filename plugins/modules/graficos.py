@@ -15,7 +15,8 @@ options:
       - Diccionario de datos para el gráfico de torta.
       - Cada clave representa una categoría.
       - El valor puede ser un número (cantidad) o un diccionario con 'cantidad' y 'color'.
-    required: true
+      - No se puede usar junto con C(lote).
+    required: false
     type: dict
   titulo_torta:
     description:
@@ -48,16 +49,142 @@ options:
     required: false
     type: bool
     default: false
+  lote:
+    description:
+      - Lista de gráficos a generar en una sola ejecución del módulo.
+      - Todos los gráficos se exportan reutilizando el mismo proceso de Kaleido, evitando el arranque del renderizador por cada imagen.
+      - No se puede usar junto con C(distribucion).
+    required: false
+    type: list
+    elements: dict
+    suboptions:
+      tipo:
+        description:
+          - Tipo de gráfico a generar.
+        required: true
+        type: str
+        choices: ['torta', 'barras']
+      datos:
+        description:
+          - Diccionario de datos del gráfico, con el mismo formato que C(distribucion) o C(recurrencias).
+        required: true
+        type: dict
+      titulo:
+        description:
+          - Título del gráfico.
+        required: false
+        type: str
+      nombre:
+        description:
+          - Nombre del archivo de salida dentro de C(carpeta_salida).
+        required: true
+        type: str
+      ancho:
+        description:
+          - Ancho de la imagen en pixeles. Por defecto 400 para torta y 600 para barras.
+        required: false
+        type: int
+      alto:
+        description:
+          - Alto de la imagen en pixeles. Por defecto 400 para torta y dinámico según la cantidad de barras.
+        required: false
+        type: int
+      max_categorias:
+        description:
+          - Sobrescribe C(max_categorias) para este gráfico.
+        required: false
+        type: int
+  max_categorias:
+    description:
+      - Cantidad máxima de categorías a graficar. Se conservan las de mayor cantidad y el resto se suma en una categoría C(etiqueta_otros).
+      - Si no se define, se grafican todas las categorías.
+    required: false
+    type: int
+  etiqueta_otros:
+    description:
+      - Nombre de la categoría que agrupa el resto cuando se usa C(max_categorias).
+    required: false
+    type: str
+    default: "Otros"
+  formato:
+    description:
+      - Formato de salida de los gráficos.
+      - C(svg) y C(html) no requieren rasterizar la imagen, por lo que son más rápidos de generar.
+      - C(html) genera un documento interactivo autocontenido sin usar Kaleido.
+    required: false
+    type: str
+    choices: ['png', 'svg', 'webp', 'html']
+    default: "png"
+  guardar_archivo:
+    description:
+      - Si es falso, los gráficos no se escriben en C(carpeta_salida) y solo se retornan en base64.
+      - Requiere C(incluir_base64).
+    required: false
+    type: bool
+    default: true
+  servicio:
+    description:
+      - Uso del servicio local de renderizado, que mantiene Kaleido iniciado entre ejecuciones y atiende trabajos por un socket Unix.
+      - C(ninguno) renderiza siempre en el proceso del módulo.
+      - C(usar) envía los gráficos al servicio si está corriendo y si no renderiza en el proceso del módulo.
+      - C(iniciar) además inicia el servicio en el host si no está corriendo.
+      - El servicio es compartido con el módulo C(html_pdf) y termina solo tras C(servicio_inactividad) segundos sin trabajos.
+    required: false
+    type: str
+    choices: ['ninguno', 'usar', 'iniciar']
+    default: "ninguno"
+  servicio_socket:
+    description:
+      - Ruta del socket Unix del servicio de renderizado. Por defecto C(renderizador.sock) en la carpeta privada (0700)
+        C($XDG_RUNTIME_DIR/xploit9999.utilidades) o, si no existe C($XDG_RUNTIME_DIR), C(~/.cache/xploit9999.utilidades).
+      - Solo se usa si el socket pertenece al usuario que ejecuta el módulo.
+    required: false
+    type: path
+  servicio_inactividad:
+    description:
+      - Segundos sin trabajos tras los cuales termina el servicio iniciado con C(servicio=iniciar).
+    required: false
+    type: int
+    default: 300
+  servicio_timeout:
+    description:
+      - Segundos máximos de espera de la respuesta del servicio. Si se superan, el módulo falla.
+    required: false
+    type: int
+    default: 1800
+  carpeta_cache:
+    description:
+      - Carpeta para el cache de imágenes. Si se define, cada gráfico se identifica por un hash de sus datos normalizados
+        (etiquetas, cantidades, colores, título y dimensiones).
+      - Si la imagen ya existe en el cache se enlaza o copia en C(carpeta_salida) sin cargar Plotly ni Kaleido.
+      - Si no se define, no se usa cache.
+    required: false
+    type: path
+  cache_max_mb:
+    description:
+      - Tamaño máximo del cache en megabytes. Al superarlo se eliminan primero las imágenes usadas hace más tiempo.
+    required: false
+    type: int
+    default: 256
+  cache_max_dias:
+    description:
+      - Días sin uso tras los cuales una imagen se elimina del cache.
+    required: false
+    type: int
+    default: 30
 author:
   - John (@Xploit9999)
 requirements:
   - plotly
   - kaleido
-  - numpy
-  - pandas
 notes:
-  - Requiere tener instalado plotly, kaleido, numpy y pandas para la generación y exportación de gráficos.
+  - Requiere tener instalado plotly y kaleido para la generación y exportación de gráficos.
+  - El alto dinámico del gráfico de barras (40 pixeles por barra) se limita a 4000 pixeles; para muchas categorías se recomienda C(max_categorias).
   - La carpeta de salida debe existir o el módulo fallará.
+  - Con C(incluir_base64) las imágenes se codifican directamente desde memoria, sin releer el archivo escrito.
+  - Plotly solo se importa cuando hay gráficos por renderizar; la validación de argumentos, el check mode y los aciertos de cache no lo cargan.
+  - En check mode no se escribe ningún archivo; C(changed) indica si la ejecución real crearía o reemplazaría alguna imagen.
+  - Con C(carpeta_cache), el módulo solo reporta C(changed) cuando alguna imagen de C(carpeta_salida) fue creada o reemplazada.
 '''
 
 EXAMPLES = r'''
@@ -84,18 +211,54 @@ EXAMPLES = r'''
       Tarea2: 8
     incluir_base64: true
     carpeta_salida: "/tmp"
+
+# Obtener gráficos SVG solo en memoria para incrustarlos en un HTML
+- name: Generar gráficos en SVG sin escribir en disco
+  graficos:
+    distribucion:
+      exitos: 80
+      fallos: 20
+    formato: svg
+    guardar_archivo: false
+    incluir_base64: true
+
+# Generar muchos gráficos en una sola ejecución
+- name: Generar reporte por equipo
+  graficos:
+    carpeta_salida: "/tmp/reporte"
+    lote:
+      - tipo: torta
+        nombre: equipo_a_torta.png
+        titulo: "Equipo A"
+        datos:
+          exitos: 80
+          fallos: 20
+      - tipo: barras
+        nombre: equipo_a_barras.png
+        titulo: "Equipo A - Tareas"
+        datos:
+          Tarea1: 5
+          Tarea2: 8
 '''
 
 
 RETURN = r'''
 changed:
-  description: Indica si el módulo generó nuevos gráficos.
+  description: Indica si el módulo generó o reemplazó algún gráfico en C(carpeta_salida).
   type: bool
   returned: always
 grafico_torta:
-  description: Ruta del archivo generado para el gráfico de torta.
+  description: Ruta del archivo generado para el gráfico de torta (o null si C(guardar_archivo) es falso).
   type: str
   returned: always
+grafico_torta_bytes:
+  description: Tamaño en bytes del gráfico de torta generado.
+  type: int
+  returned: always
+grafico_barras_bytes:
+  description: Tamaño en bytes del gráfico de barras generado (o null si no aplica).
+  type: int
+  returned: always
 grafico_barras:
   description: Ruta del archivo generado para el gráfico de barras (o null si no aplica).
   type: str
@@ -113,49 +276,439 @@ grafico_barras_base64:
   description: Contenido del gráfico de barras codificado en base64 (solo si incluir_base64 es true y se genera gráfico de barras).
   type: str
   returned: when incluir_base64 == true and recurrencias se proveen
+graficos:
+  description: Resultado por cada gráfico generado en modo C(lote).
+  type: list
+  elements: dict
+  returned: when lote se provee
+  sample: [{"nombre": "equipo_a_torta.png", "tipo": "torta", "ruta": "/tmp/reporte/equipo_a_torta.png", "formato": "png", "bytes": 18211, "cache": false, "changed": true}]
+tiempos:
+  description:
+    - Desglose en segundos de la ejecución; C(arranque) (carga del módulo y validación de argumentos), C(importacion) (carga de Plotly),
+      C(preparacion), C(renderizado) y C(total).
+    - C(renderizador) indica si los gráficos se renderizaron en el C(servicio) o en el proceso del módulo (C(local)).
+    - En check mode solo se reportan C(arranque), C(importacion) y C(total).
+  type: dict
+  returned: always
+  sample: {"arranque": 0.041, "importacion": 1.208, "preparacion": 0.012, "renderizado": 1.734, "total": 2.954, "renderizador": "local"}
 '''
 
-from ansible.module_utils.basic import AnsibleModule
-import plotly.express as px
+import time
+
+INICIO = time.perf_counter()
+
+from ansible.module_utils.basic import AnsibleModule, missing_required_lib
 import base64
+import filecmp
+import hashlib
+import json
 import os
+import shutil
+
+from ansible_collections.xploit9999.utilidades.plugins.module_utils.renderizador import (
+    MODOS_RENDERIZADOR,
+    eliminar_temporales,
+    exportar_imagenes,
+    renderizar_contenidos,
+    ruta_temporal,
+    solicitar,
+)
+
+ANCHO_TORTA = 400
+ALTO_TORTA = 400
+ANCHO_BARRAS = 600
+ALTO_MAXIMO_BARRAS = 4000
+COLOR_BARRAS = '#C9190B'
+FORMATOS = ['png', 'svg', 'webp', 'html']
 
 def codificar_base64(ruta):
     with open(ruta, 'rb') as imagen:
         return base64.b64encode(imagen.read()).decode('utf-8')
 
 def procesar_datos(datos):
-    etiquetas = []
-    cantidades = []
-    colores = []
-
-    for etiqueta, info in datos.items():
-        if isinstance(info, dict):
-            cantidad = info.get('cantidad', 0)
-            color = info.get('color')
-        else:
-            cantidad = info
-            color = None
+    """Convierte el diccionario de entrada en columnas; las cantidades quedan como int si todas lo son y si no como float."""
 
-        etiquetas.append(etiqueta)
-        cantidades.append(cantidad)
-        colores.append(color)
+    valores = list(datos.values())
+    etiquetas = list(datos)
+    cantidades = [info.get('cantidad', 0) if isinstance(info, dict) else info for info in valores]
+    colores = [info.get('color') if isinstance(info, dict) else None for info in valores]
+
+    if not all(isinstance(cantidad, int) and not isinstance(cantidad, bool) for cantidad in cantidades):
+        cantidades = [float(cantidad) for cantidad in cantidades]
 
     return etiquetas, cantidades, colores
 
+def normalizar_grafico(tipo, datos, titulo, ancho=None, alto=None, max_categorias=None, etiqueta_otros='Otros'):
+    """Reduce la especificación de un gráfico a los valores que determinan la imagen.
+
+    Se calcula también en check mode y en los aciertos de cache (para la clave y la leyenda), por lo que solo usa
+    Python puro.
+    """
+
+    etiquetas, cantidades, colores = procesar_datos(datos)
+    truncar = bool(max_categorias) and len(etiquetas) > max_categorias
+
+    if tipo == 'barras' or truncar:
+        # sorted es estable: a igual cantidad se conserva el orden de entrada
+        orden = sorted(range(len(cantidades)), key=lambda indice: -cantidades[indice])
+        resto = None
+
+        if truncar:
+            resto = sum(cantidades[indice] for indice in orden[max_categorias:])
+            orden = orden[:max_categorias]
+
+        etiquetas = [etiquetas[indice] for indice in orden]
+        colores = [colores[indice] for indice in orden]
+        cantidades = [cantidades[indice] for indice in orden]
+
+        if resto is not None:
+            etiquetas.append(etiqueta_otros)
+            cantidades.append(resto)
+            colores.append(None)
+
+    if tipo == 'torta':
+        ancho = ancho or ANCHO_TORTA
+        alto = alto or ALTO_TORTA
+    else:
+        ancho = ancho or ANCHO_BARRAS
+        alto = alto or min(ALTO_MAXIMO_BARRAS, max(400, len(etiquetas) * 40))
+
+    return {
+        'tipo': tipo,
+        'etiquetas': etiquetas,
+        'cantidades': cantidades,
+        'colores': colores,
+        'titulo': titulo,
+        'ancho': ancho,
+        'alto': alto,
+    }
+
+def clave_grafico(normalizado):
+    contenido = json.dumps(normalizado, sort_keys=True, separators=(',', ':'), default=str)
+    return hashlib.sha256(contenido.encode('utf-8')).hexdigest()
+
+def crear_grafico_torta(normalizado):
+    """Figura de Plotly (como diccionario) del gráfico de torta."""
+
+    colores_torta = normalizado['colores']
+    etiquetas_con_valores = [f"{etiqueta} ({cantidad})" for etiqueta, cantidad in zip(normalizado['etiquetas'], normalizado['cantidades'])]
+
+    traza = {
+        'type': 'pie',
+        'labels': etiquetas_con_valores,
+        'values': normalizado['cantidades'],
+        'textposition': 'inside',
+        'textinfo': 'percent+label',
+    }
+
+    if any(colores_torta):
+        traza['marker'] = {'colors': colores_torta}
+
+    return {'data': [traza], 'layout': {'title': {'text': normalizado['titulo']}}}
+
+def crear_grafico_barras(normalizado):
+    """Figura de Plotly (como diccionario) del gráfico de barras horizontales."""
+
+    cantidades_barras = normalizado['cantidades']
+
+    traza = {
+        'type': 'bar',
+        'x': cantidades_barras,
+        'y': normalizado['etiquetas'],
+        'orientation': 'h',
+        'marker': {'color': [color if color else COLOR_BARRAS for color in normalizado['colores']]},
+        'text': cantidades_barras,
+        'textposition': 'outside',
+    }
+
+    layout = {
+        'title': {'text': normalizado['titulo']},
+        'xaxis': {'title': {'text': 'Cantidad'}},
+        'yaxis': {'title': {'text': 'Tarea'}, 'autorange': 'reversed'},
+    }
+
+    return {'data': [traza], 'layout': layout}
+
+def leyenda_barras(normalizado):
+    return [
+        {"tarea": etiqueta, "cantidad": cantidad}
+        for etiqueta, cantidad in zip(normalizado['etiquetas'], normalizado['cantidades'])
+    ]
+
+class CacheGraficos:
+    """Cache en disco de imágenes direccionado por el contenido normalizado del gráfico."""
+
+    def __init__(self, carpeta, max_mb, max_dias):
+        self.carpeta = carpeta
+        self.max_bytes = max_mb * 1024 * 1024
+        self.max_segundos = max_dias * 86400
+
+    def ruta(self, clave, formato):
+        return os.path.join(self.carpeta, f"{clave}.{formato}")
+
+    def obtener(self, clave, formato):
+        ruta = self.ruta(clave, formato)
+        if not os.path.isfile(ruta):
+            return None
+        os.utime(ruta)
+        return ruta
+
+    def guardar(self, clave, formato, ruta_imagen):
+        os.makedirs(self.carpeta, exist_ok=True)
+        enlazar_o_copiar(ruta_imagen, self.ruta(clave, formato))
+
+    def guardar_contenido(self, clave, formato, contenido):
+        os.makedirs(self.carpeta, exist_ok=True)
+        escribir_atomico(self.ruta(clave, formato), contenido)
+
+    def depurar(self):
+        """Elimina entradas vencidas y, si se supera el tamaño máximo, las menos usadas."""
+
+        ahora = time.time()
+        entradas = []
+
+        for nombre in os.listdir(self.carpeta):
+            ruta = os.path.join(self.carpeta, nombre)
+            try:
+                estado = os.stat(ruta)
+            except OSError:
+                continue
+
+            if ahora - estado.st_mtime > self.max_segundos:
+                os.unlink(ruta)
+                continue
+
+            entradas.append((estado.st_mtime, estado.st_size, ruta))
+
+        total = sum(tamano for _, tamano, _ in entradas)
+
+        for _, tamano, ruta in sorted(entradas):
+            if total <= self.max_bytes:
+                break
+            os.unlink(ruta)
+            total -= tamano
+
+def mismo_contenido(origen, destino):
+    """Si destino ya tiene el contenido de origen, sea el mismo archivo o una copia en otro sistema de archivos."""
+
+    if not os.path.isfile(destino):
+        return False
+    return os.path.samefile(origen, destino) or filecmp.cmp(origen, destino, shallow=False)
+
+def enlazar_o_copiar(origen, destino):
+    """Instala origen en destino de forma atómica, con hard link si es posible. Retorna si hubo cambio."""
+
+    if mismo_contenido(origen, destino):
+        return False
+
+    temporal = ruta_temporal(destino)
+
+    try:
+        # os.link no sigue enlaces ni sobrescribe: si otro proceso ocupó el nombre liberado, falla y se copia
+        os.unlink(temporal)
+        os.link(origen, temporal)
+    except OSError:
+        temporal = ruta_temporal(destino)
+        try:
+            shutil.copy2(origen, temporal)
+        except BaseException:
+            eliminar_temporales([temporal])
+            raise
+
+    os.replace(temporal, destino)
+    return True
+
+def escribir_atomico(destino, contenido):
+    temporal = ruta_temporal(destino)
+
+    try:
+        with open(temporal, 'wb') as archivo:
+            archivo.write(contenido)
+        os.replace(temporal, destino)
+    except BaseException:
+        eliminar_temporales([temporal])
+        raise
+
+def importar_plotly():
+    """Importa Plotly bajo demanda y retorna los segundos que tomó la importación."""
+
+    inicio = time.perf_counter()
+    import plotly.io  # noqa: F401
+    return round(time.perf_counter() - inicio, 3)
+
+def generar_graficos(especificaciones, carpeta_salida, incluir_base64, cache=None, check_mode=False,
+                     max_categorias=None, etiqueta_otros='Otros', formato='png', guardar_archivo=True, servicio=None):
+    inicio = time.perf_counter()
+
+    # Con base64 o sin escritura en disco el contenido se obtiene en memoria y no se relee el archivo.
+    en_memoria = incluir_base64 or not guardar_archivo
+
+    pendientes = []
+    resultados = []
+
+    for especificacion in especificaciones:
+        normalizado = normalizar_grafico(
+            especificacion['tipo'],
+            especificacion['datos'],
+            especificacion.get('titulo'),
+            especificacion.get('ancho'),
+            especificacion.get('alto'),
+            especificacion.get('max_categorias') or max_categorias,
+            etiqueta_otros,
+        )
+        normalizado['formato'] = formato
+
+        ruta = os.path.join(carpeta_salida, especificacion['nombre']) if guardar_archivo else None
+        resultado = {'nombre': especificacion['nombre'], 'tipo': normalizado['tipo'], 'ruta': ruta, 'formato': formato, 'cache': False}
+
+        if normalizado['tipo'] == 'barras':
+            resultado['leyenda'] = leyenda_barras(normalizado)
+
+        clave = clave_grafico(normalizado)
+        ruta_cache = cache.obtener(clave, formato) if cache else None
+
+        if ruta_cache:
+            resultado['cache'] = True
+            resultado['bytes'] = os.path.getsize(ruta_cache)
+
+            if not guardar_archivo:
+                resultado['changed'] = False
+            elif check_mode:
+                resultado['changed'] = not mismo_contenido(ruta_cache, ruta)
+            else:
+                resultado['changed'] = enlazar_o_copiar(ruta_cache, ruta)
+
+            if incluir_base64 and not check_mode:
+                resultado['base64'] = codificar_base64(ruta_cache)
+        else:
+            resultado['changed'] = guardar_archivo
+            pendientes.append((normalizado, clave, resultado))
+
+        resultados.append(resultado)
+
+    tiempos = {'importacion': 0.0}
+
+    if check_mode:
+        tiempos['total'] = round(time.perf_counter() - inicio, 3)
+        return resultados, tiempos
+
+    figuras = []
+    for normalizado, _, _ in pendientes:
+        if normalizado['tipo'] == 'torta':
+            figuras.append(crear_grafico_torta(normalizado))
+        else:
+            figuras.append(crear_grafico_barras(normalizado))
+
+    anchos = [normalizado['ancho'] for normalizado, _, _ in pendientes]
+    altos = [normalizado['alto'] for normalizado, _, _ in pendientes]
+
+    rutas = [resultado['ruta'] for _, _, resultado in pendientes]
+
+    preparado = time.perf_counter()
+    respuesta = None
+
+    if figuras and servicio:
+        respuesta = solicitar(
+            {
+                'operacion': 'graficos',
+                'figuras': figuras,
+                'rutas': [os.path.abspath(ruta) for ruta in rutas] if not en_memoria else None,
+                'anchos': anchos,
+                'altos': altos,
+                'formato': formato,
+                'en_memoria': en_memoria,
+            },
+            **servicio
+        )
+
+    if respuesta is not None:
+        tiempos['renderizador'] = 'servicio'
+        contenidos = [base64.b64decode(contenido) for contenido in respuesta.get('contenidos', [])]
+    else:
+        tiempos['renderizador'] = 'local'
+
+        if figuras:
+            tiempos['importacion'] = importar_plotly()
+
+        if en_memoria:
+            contenidos = renderizar_contenidos(figuras, anchos, altos, formato) if figuras else []
+        else:
+            exportar_imagenes(figuras, rutas, anchos, altos, formato)
+
+    renderizado = time.perf_counter()
+
+    for indice, (_, clave, resultado) in enumerate(pendientes):
+        if en_memoria:
+            contenido = contenidos[indice]
+            resultado['bytes'] = len(contenido)
+
+            if incluir_base64:
+                resultado['base64'] = base64.b64encode(contenido).decode('utf-8')
+            if guardar_archivo:
+                escribir_atomico(resultado['ruta'], contenido)
+
+            if cache and guardar_archivo:
+                cache.guardar(clave, formato, resultado['ruta'])
+            elif cache:
+                cache.guardar_contenido(clave, formato, contenido)
+        else:
+            resultado['bytes'] = os.path.getsize(resultado['ruta'])
+
+            if cache:
+                cache.guardar(clave, formato, resultado['ruta'])
+
+    if cache and pendientes:
+        cache.depurar()
+
+    fin = time.perf_counter()
+
+    tiempos['preparacion'] = round(preparado - inicio, 3)
+    tiempos['renderizado'] = round(renderizado - preparado - tiempos['importacion'], 3)
+    tiempos['total'] = round(fin - inicio, 3)
+
+    return resultados, tiempos
+
+def cache_graficos(modulo):
+    if not modulo.params['carpeta_cache']:
+        return None
+    return CacheGraficos(modulo.params['carpeta_cache'], modulo.params['cache_max_mb'], modulo.params['cache_max_dias'])
+
 def main():
 
     modulo = AnsibleModule(
         argument_spec=dict(
-            distribucion=dict(type='dict', required=True),
+            distribucion=dict(type='dict', required=False),
             titulo_torta=dict(type='str', required=False, default='Gráfico de Distribución'),
             recurrencias=dict(type='dict', required=False, default={}),
             titulo_barras=dict(type='str', required=False, default='Gráfico de Medición'),
             carpeta_salida=dict(type='str', required=False, default='.'),
             incluir_base64=dict(type='bool', required=False, default=False),
+            lote=dict(type='list', elements='dict', required=False, options=dict(
+                tipo=dict(type='str', required=True, choices=['torta', 'barras']),
+                datos=dict(type='dict', required=True),
+                titulo=dict(type='str', required=False),
+                nombre=dict(type='str', required=True),
+                ancho=dict(type='int', required=False),
+                alto=dict(type='int', required=False),
+                max_categorias=dict(type='int', required=False),
+            )),
+            max_categorias=dict(type='int', required=False, default=None),
+            etiqueta_otros=dict(type='str', required=False, default='Otros'),
+            carpeta_cache=dict(type='path', required=False, default=None),
+            cache_max_mb=dict(type='int', required=False, default=256),
+            cache_max_dias=dict(type='int', required=False, default=30),
+            formato=dict(type='str', required=False, choices=FORMATOS, default='png'),
+            guardar_archivo=dict(type='bool', required=False, default=True),
+            servicio=dict(type='str', required=False, choices=MODOS_RENDERIZADOR, default='ninguno'),
+            servicio_socket=dict(type='path', required=False, default=None),
+            servicio_inactividad=dict(type='int', required=False, default=300),
+            servicio_timeout=dict(type='int', required=False, default=1800),
         ),
-        supports_check_mode=False
+        required_one_of=[['distribucion', 'lote']],
+        mutually_exclusive=[['distribucion', 'lote']],
+        supports_check_mode=True
     )
+    arranque = round(time.perf_counter() - INICIO, 3)
 
     distribucion = modulo.params['distribucion']
     titulo_torta = modulo.params['titulo_torta']
@@ -163,79 +716,72 @@ def main():
     titulo_barras = modulo.params['titulo_barras']
     carpeta_salida = modulo.params['carpeta_salida']
     incluir_base64 = modulo.params['incluir_base64']
+    lote = modulo.params['lote']
+    max_categorias = modulo.params['max_categorias']
+    etiqueta_otros = modulo.params['etiqueta_otros']
+    formato = modulo.params['formato']
+    guardar_archivo = modulo.params['guardar_archivo']
+    check_mode = modulo.check_mode
 
-    try:
-        etiquetas_torta, cantidades_torta, colores_torta = procesar_datos(distribucion)
-        etiquetas_con_valores = [f"{etiqueta} ({cantidad})" for etiqueta, cantidad in zip(etiquetas_torta, cantidades_torta)]
-
-        datos_pie = {
-            'Etiqueta': etiquetas_con_valores,
-            'Cantidad': cantidades_torta
-        }
-
-        figura_pie = px.pie(
-            datos_pie,
-            names='Etiqueta',
-            values='Cantidad',
-            title=titulo_torta,
-        )
-
-        if any(colores_torta):
-            color_map = {label: color for label, color in zip(etiquetas_con_valores, colores_torta) if color}
-            figura_pie.update_traces(marker=dict(colors=[color_map.get(lbl) for lbl in etiquetas_con_valores]))
-
-        figura_pie.update_traces(textposition='inside', textinfo='percent+label')
-        ruta_pie = os.path.join(carpeta_salida, "grafico_torta.png")
-        figura_pie.write_image(ruta_pie, width=400, height=400)
+    if not guardar_archivo and not incluir_base64:
+        modulo.fail_json(msg="Si 'guardar_archivo' es falso se debe activar 'incluir_base64'.")
 
-        leyenda_barras = []
+    incluir_base64 = incluir_base64 and not check_mode
+    opciones = dict(
+        cache=cache_graficos(modulo),
+        check_mode=check_mode,
+        max_categorias=max_categorias,
+        etiqueta_otros=etiqueta_otros,
+        formato=formato,
+        guardar_archivo=guardar_archivo,
+        servicio=dict(
+            modo=modulo.params['servicio'],
+            ruta_socket=modulo.params['servicio_socket'],
+            inactividad=modulo.params['servicio_inactividad'],
+            timeout=modulo.params['servicio_timeout'],
+        ),
+    )
 
-        if recurrencias:
-            etiquetas_barras, cantidades_barras, colores_barras = procesar_datos(recurrencias)
-
-            datos_barras = list(zip(etiquetas_barras, cantidades_barras, colores_barras))
-            datos_barras.sort(key=lambda x: x[1], reverse=True)
-            etiquetas_barras, cantidades_barras, colores_barras = zip(*datos_barras)
-
-            figura_barras = px.bar(
-                x=cantidades_barras,
-                y=etiquetas_barras,
-                title=titulo_barras,
-                labels={'x': 'Cantidad', 'y': 'Tarea'},
-                orientation='h'
+    try:
+        if lote:
+            graficos, tiempos = generar_graficos(lote, carpeta_salida, incluir_base64, **opciones)
+            tiempos['arranque'] = arranque
+            modulo.exit_json(
+                changed=any(grafico['changed'] for grafico in graficos),
+                graficos=graficos,
+                tiempos=tiempos,
+                msg=f"{len(graficos)} gráficos generados correctamente"
             )
-            figura_barras.update_layout(yaxis=dict(autorange="reversed"))
-
-            figura_barras.update_traces(marker_color=[
-                color if color else '#C9190B' for color in colores_barras
-            ], text=cantidades_barras, textposition='outside')
 
-            alto = max(400, len(etiquetas_barras) * 40)
-            ruta_barras = os.path.join(carpeta_salida, "grafico_barras.png")
-            figura_barras.write_image(ruta_barras, width=600, height=alto)
+        especificaciones = [{'tipo': 'torta', 'datos': distribucion, 'titulo': titulo_torta, 'nombre': f"grafico_torta.{formato}"}]
+        if recurrencias:
+            especificaciones.append({'tipo': 'barras', 'datos': recurrencias, 'titulo': titulo_barras, 'nombre': f"grafico_barras.{formato}"})
 
-            leyenda_barras = [
-                {"tarea": etiqueta, "cantidad": cantidad}
-                for etiqueta, cantidad in zip(etiquetas_barras, cantidades_barras)
-            ]
-        else:
-            ruta_barras = None
+        graficos, tiempos = generar_graficos(especificaciones, carpeta_salida, incluir_base64, **opciones)
+        tiempos['arranque'] = arranque
+        torta = graficos[0]
+        barras = graficos[1] if recurrencias else None
 
         resultado = {
-            'changed': True,
-            'grafico_torta': ruta_pie,
-            'grafico_barras': ruta_barras,
-            'leyenda_barras': leyenda_barras,
+            'changed': any(grafico['changed'] for grafico in graficos),
+            'grafico_torta': torta['ruta'],
+            'grafico_barras': barras['ruta'] if barras else None,
+            'leyenda_barras': barras['leyenda'] if barras else [],
+            'grafico_torta_bytes': torta.get('bytes'),
+            'grafico_barras_bytes': barras.get('bytes') if barras else None,
+            'tiempos': tiempos,
             'msg': "Gráficos generados correctamente"
         }
 
         if incluir_base64:
-            resultado['grafico_torta_base64'] = codificar_base64(ruta_pie)
-            if ruta_barras:
-                resultado['grafico_barras_base64'] = codificar_base64(ruta_barras)
+            resultado['grafico_torta_base64'] = torta['base64']
+            if barras:
+                resultado['grafico_barras_base64'] = barras['base64']
 
         modulo.exit_json(**resultado)
 
+    except ImportError as e:
+        modulo.fail_json(msg=missing_required_lib('plotly'), exception=str(e))
     except Exception as e:
         modulo.fail_json(msg=f"Error generando gráficos: {e}")
 
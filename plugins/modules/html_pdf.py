@@ -12,13 +12,15 @@ options:
   origen:
     description:
       - Ruta del archivo HTML de entrada que se desea convertir.
-    required: true
-    type: str
+      - Requerido si no se usa C(conversiones).
+    required: false
+    type: path
   destino:
     description:
       - Ruta donde se guardará el archivo PDF generado.
-    required: true
-    type: str
+      - Requerido junto con C(origen).
+    required: false
+    type: path
   formato_hoja:
     description:
       - Formato del papel para el PDF.
@@ -36,6 +38,112 @@ options:
       - vertical
       - horizontal
     default: "vertical"
+  conversiones:
+    description:
+      - Lista de archivos a convertir en una sola ejecución, usando un único navegador Chromium.
+      - No se puede usar junto con C(origen).
+    required: false
+    type: list
+    elements: dict
+    suboptions:
+      origen:
+        description:
+          - Ruta del archivo HTML de entrada.
+        required: true
+        type: path
+      destino:
+        description:
+          - Ruta donde se guardará el archivo PDF generado.
+        required: true
+        type: path
+      formato_hoja:
+        description:
+          - Sobrescribe C(formato_hoja) para esta conversión.
+        required: false
+        type: str
+      orientacion:
+        description:
+          - Sobrescribe C(orientacion) para esta conversión.
+        required: false
+        type: str
+        choices:
+          - vertical
+          - horizontal
+  concurrencia:
+    description:
+      - Cantidad de páginas del navegador que convierten en paralelo cuando se usa C(conversiones).
+    required: false
+    type: int
+    default: 4
+  esperar:
+    description:
+      - Estrategia para determinar cuándo la página está lista para imprimirse.
+      - C(load), C(domcontentloaded), C(networkidle0) y C(networkidle2) esperan el evento de navegación correspondiente.
+      - C(selector) espera a que exista el elemento indicado en C(selector).
+      - C(funcion) espera a que la expresión JavaScript de C(funcion) sea verdadera, por ejemplo C(window.reportReady === true).
+    required: false
+    type: str
+    choices: ['load', 'domcontentloaded', 'networkidle0', 'networkidle2', 'selector', 'funcion']
+    default: "load"
+  selector:
+    description:
+      - Selector CSS a esperar. Requerido si C(esperar) es C(selector).
+    required: false
+    type: str
+  funcion:
+    description:
+      - Expresión JavaScript a esperar. Requerido si C(esperar) es C(funcion).
+    required: false
+    type: str
+  timeout:
+    description:
+      - Segundos máximos de espera por cada página. Si se supera, la conversión falla.
+      - C(0) espera indefinidamente.
+    required: false
+    type: float
+    default: 30
+  comparar:
+    description:
+      - Criterio para omitir la conversión cuando el PDF ya está actualizado.
+      - C(mtime) compara fecha de modificación y tamaño; C(hash) compara el SHA-256 del contenido.
+      - Se consideran el HTML de C(origen) y los archivos locales que referencia (CSS, imágenes, fuentes, scripts),
+        incluidos los referenciados desde hojas de estilo.
+      - El resultado de la comparación se guarda en un manifiesto junto al PDF (C(<destino>.manifest.json)).
+      - C(ninguno) siempre regenera el PDF.
+    required: false
+    type: str
+    choices: ['ninguno', 'mtime', 'hash']
+    default: "ninguno"
+  servicio:
+    description:
+      - Uso del servicio local de renderizado, que mantiene Chromium iniciado entre ejecuciones y atiende trabajos por un socket Unix.
+      - C(ninguno) convierte siempre en el proceso del módulo.
+      - C(usar) envía las conversiones al servicio si está corriendo y si no convierte en el proceso del módulo.
+      - C(iniciar) además inicia el servicio en el host si no está corriendo.
+      - El servicio es compartido con el módulo C(graficos) y termina solo tras C(servicio_inactividad) segundos sin trabajos.
+    required: false
+    type: str
+    choices: ['ninguno', 'usar', 'iniciar']
+    default: "ninguno"
+  servicio_socket:
+    description:
+      - Ruta del socket Unix del servicio de renderizado. Por defecto C(renderizador.sock) en la carpeta privada (0700)
+        C($XDG_RUNTIME_DIR/xploit9999.utilidades) o, si no existe C($XDG_RUNTIME_DIR), C(~/.cache/xploit9999.utilidades).
+      - Solo se usa si el socket pertenece al usuario que ejecuta el módulo.
+    required: false
+    type: path
+  servicio_inactividad:
+    description:
+      - Segundos sin trabajos tras los cuales termina el servicio iniciado con C(servicio=iniciar).
+    required: false
+    type: int
+    default: 300
+  servicio_timeout:
+    description:
+      - Segundos máximos de espera de la respuesta del servicio. Si se superan, el módulo falla.
+    required: false
+    type: int
+    default: 1800
 author:
   - John (@Xploit9999)
 requirements:
@@ -44,6 +152,8 @@ requirements:
 notes:
   - Se requiere que pyppeteer y sus dependencias estén instaladas en el entorno Python.
   - Este módulo usa un navegador Chromium sin interfaz gráfica para la conversión.
+  - La conversión no agrega pausas fijas; para páginas que se completan con JavaScript usar C(esperar) con C(selector) o C(funcion).
+  - Pyppeteer solo se importa al convertir; la validación de argumentos y el check mode no lo cargan.
 '''
 
 EXAMPLES = r'''
@@ -60,11 +170,38 @@ EXAMPLES = r'''
     destino: "/var/www/index.pdf"
     formato_hoja: "Letter"
     orientacion: "horizontal"
+
+# Regenerar el PDF solo si cambió el HTML o alguno de sus recursos locales
+- name: Convertir HTML a PDF solo si hay cambios
+  html_pdf:
+    origen: "/tmp/reporte.html"
+    destino: "/tmp/reporte.pdf"
+    comparar: hash
+
+# Esperar a que el reporte indique que terminó de dibujarse
+- name: Convertir reporte dinámico
+  html_pdf:
+    origen: "/tmp/reporte.html"
+    destino: "/tmp/reporte.pdf"
+    esperar: funcion
+    funcion: "window.reportReady === true"
+    timeout: 10
+
+# Convertir varios archivos con un solo navegador y 8 páginas en paralelo
+- name: Convertir facturas a PDF
+  html_pdf:
+    conversiones:
+      - origen: "/tmp/facturas/0001.html"
+        destino: "/tmp/facturas/0001.pdf"
+      - origen: "/tmp/facturas/0002.html"
+        destino: "/tmp/facturas/0002.pdf"
+        orientacion: "horizontal"
+    concurrencia: 8
 '''
 
 RETURN = r'''
 changed:
-  description: Indica si el PDF fue generado correctamente.
+  description: Indica si se generó algún PDF; es falso si con C(comparar) todos los PDF ya estaban actualizados.
   type: bool
   returned: always
 msg:
@@ -74,63 +211,359 @@ msg:
 destino:
   description: Ruta absoluta del archivo PDF generado.
   type: str
-  returned: always
+  returned: when origen se provee
+conversiones:
+  description: Resultado de cada conversión con su latencia en segundos.
+  type: list
+  elements: dict
+  returned: when conversiones se provee
+  sample: [{"origen": "/tmp/f1.html", "destino": "/tmp/f1.pdf", "failed": false, "changed": true, "segundos": 1.214}]
+rendimiento:
+  description: Cantidad de PDF generados y omitidos por estar actualizados, segundos de conversión y archivos por segundo.
+  type: dict
+  returned: when conversiones se provee
+  sample: {"archivos": 200, "omitidos": 1800, "segundos": 41.7, "archivos_por_segundo": 4.796}
+tiempos:
+  description:
+    - Desglose en segundos de la ejecución; C(arranque) (carga del módulo y validación de argumentos), C(importacion) (carga de Pyppeteer),
+      C(conversion) y C(total).
+    - C(renderizador) indica si la conversión se hizo en el C(servicio) o en el proceso del módulo (C(local)).
+  type: dict
+  returned: success
+  sample: {"arranque": 0.038, "importacion": 0.412, "conversion": 1.873, "total": 2.323, "renderizador": "local"}
 '''
 
-from ansible.module_utils.basic import AnsibleModule
+import time
+
+INICIO = time.perf_counter()
+
+from ansible.module_utils.basic import AnsibleModule, missing_required_lib
+from html.parser import HTMLParser
+from urllib.parse import unquote, urlsplit
 import asyncio
+import hashlib
+import json
 import os
-from pyppeteer import launch
+import re
+
+from ansible_collections.xploit9999.utilidades.plugins.module_utils.renderizador import (
+    ESPERAS_NAVEGACION,
+    MODOS_RENDERIZADOR,
+    ErrorRenderizador,
+    convertir_lote,
+    solicitar,
+)
+
+def importar_pyppeteer():
+    """Importa Pyppeteer bajo demanda y retorna los segundos que tomó la importación."""
+
+    inicio = time.perf_counter()
+    import pyppeteer  # noqa: F401
+    return round(time.perf_counter() - inicio, 3)
+
+PATRON_URL_CSS = re.compile(r"""(?:url\(\s*|@import\s+)(['"]?)([^'")\s;]+)\1""")
+
+class ExtractorRecursos(HTMLParser):
+    """Reúne las referencias a recursos (CSS, imágenes, fuentes, scripts) de un documento HTML."""
 
-async def convertir_html_a_pdf(ruta_html, ruta_pdf, formato_hoja, orientacion):
+    ATRIBUTOS = ('src', 'href', 'poster', 'data')
 
-    navegador = await launch(headless=True, args=['--no-sandbox', '--disable-setuid-sandbox'])
-    pagina = await navegador.newPage()
-    await pagina.setViewport({'width': 1200, 'height': 800})
+    def __init__(self):
+        super().__init__()
+        self.referencias = []
+        self.en_estilo = False
 
-    url_archivo = 'file://' + os.path.abspath(ruta_html)
-    await pagina.goto(url_archivo, waitUntil='load', timeout=0)
-    await asyncio.sleep(1) 
+    def handle_starttag(self, etiqueta, atributos):
+        for nombre, valor in atributos:
+            if not valor:
+                continue
+            if nombre in self.ATRIBUTOS and not (etiqueta == 'a' and nombre == 'href'):
+                self.referencias.append(valor)
+            elif nombre == 'srcset':
+                self.referencias.extend(candidato.split()[0] for candidato in valor.split(',') if candidato.strip())
+            elif nombre == 'style':
+                self.referencias.extend(urls_css(valor))
+        self.en_estilo = etiqueta == 'style'
 
-    await pagina.pdf({
-        'path': ruta_pdf,
-        'format': formato_hoja,
-        'landscape': orientacion == 'horizontal',
-        'printBackground': True,
-        'margin': {
-            'top': '20px',
-            'right': '20px',
-            'bottom': '20px',
-            'left': '20px'
-        }
-    })
+    def handle_endtag(self, etiqueta):
+        if etiqueta == 'style':
+            self.en_estilo = False
 
-    await navegador.close()
+    def handle_data(self, datos):
+        if self.en_estilo:
+            self.referencias.extend(urls_css(datos))
+
+def urls_css(contenido):
+    return [coincidencia.group(2) for coincidencia in PATRON_URL_CSS.finditer(contenido)]
+
+def resolver_local(referencia, carpeta_base):
+    """Retorna la ruta local de una referencia o None si es remota, embebida o no existe."""
+
+    referencia = referencia.strip()
+    esquema = urlsplit(referencia).scheme
+
+    if esquema == 'file':
+        ruta = unquote(urlsplit(referencia).path)
+    elif esquema or referencia.startswith(('#', '//')):
+        return None
+    else:
+        ruta = os.path.join(carpeta_base, unquote(urlsplit(referencia).path))
+
+    ruta = os.path.normpath(ruta)
+    return ruta if os.path.isfile(ruta) else None
+
+def recursos_locales(ruta_html):
+    """El HTML y todos los archivos locales que referencia, incluyendo los referenciados desde CSS."""
+
+    recursos = [ruta_html]
+    visitados = {ruta_html}
+
+    with open(ruta_html, encoding='utf-8', errors='replace') as archivo:
+        extractor = ExtractorRecursos()
+        extractor.feed(archivo.read())
+
+    pendientes = [(referencia, os.path.dirname(ruta_html)) for referencia in extractor.referencias]
+
+    while pendientes:
+        referencia, carpeta_base = pendientes.pop()
+        ruta = resolver_local(referencia, carpeta_base)
+
+        if not ruta or ruta in visitados:
+            continue
+
+        visitados.add(ruta)
+        recursos.append(ruta)
+
+        if ruta.endswith('.css'):
+            with open(ruta, encoding='utf-8', errors='replace') as archivo:
+                pendientes.extend((url, os.path.dirname(ruta)) for url in urls_css(archivo.read()))
+
+    return recursos
+
+def huella_archivo(ruta, comparar):
+    if comparar == 'hash':
+        resumen = hashlib.sha256()
+        with open(ruta, 'rb') as archivo:
+            for bloque in iter(lambda: archivo.read(1024 * 1024), b''):
+                resumen.update(bloque)
+        return resumen.hexdigest()
+
+    estado = os.stat(ruta)
+    return [estado.st_mtime_ns, estado.st_size]
+
+def huella_conversion(conversion, comparar, espera):
+    """Huella de lo que determina el PDF. El C(timeout) no cambia el resultado, por eso no se incluye."""
+
+    return {
+        'comparar': comparar,
+        'opciones': {
+            'formato_hoja': conversion['formato_hoja'],
+            'orientacion': conversion['orientacion'],
+            'espera': {clave: valor for clave, valor in espera.items() if clave != 'timeout'},
+        },
+        'recursos': {ruta: huella_archivo(ruta, comparar) for ruta in recursos_locales(conversion['origen'])},
+    }
+
+def ruta_manifiesto(ruta_pdf):
+    return ruta_pdf + '.manifest.json'
+
+def esta_actualizado(conversion, huella):
+    """Indica si el PDF existente fue generado a partir de los mismos recursos y opciones."""
+
+    try:
+        with open(ruta_manifiesto(conversion['destino']), encoding='utf-8') as archivo:
+            manifiesto = json.load(archivo)
+        estado_pdf = os.stat(conversion['destino'])
+    except (OSError, ValueError):
+        return False
+
+    if manifiesto.get('pdf') != [estado_pdf.st_mtime_ns, estado_pdf.st_size]:
+        return False
+
+    return all(manifiesto.get(clave) == valor for clave, valor in huella.items())
+
+def guardar_manifiesto(conversion, huella):
+    estado_pdf = os.stat(conversion['destino'])
+    manifiesto = dict(huella, pdf=[estado_pdf.st_mtime_ns, estado_pdf.st_size])
+
+    with open(ruta_manifiesto(conversion['destino']), 'w', encoding='utf-8') as archivo:
+        json.dump(manifiesto, archivo, indent=2, sort_keys=True)
 
 def main():
 
     modulo = AnsibleModule(
         argument_spec=dict(
-            origen=dict(type='path', required=True),
-            destino=dict(type='path', required=True),
+            origen=dict(type='path', required=False),
+            destino=dict(type='path', required=False),
             formato_hoja=dict(type='str', required=False, default='A4'),
-            orientacion=dict(type='str', required=False, choices=['vertical', 'horizontal'], default='vertical')
-        )
+            orientacion=dict(type='str', required=False, choices=['vertical', 'horizontal'], default='vertical'),
+            conversiones=dict(type='list', elements='dict', required=False, options=dict(
+                origen=dict(type='path', required=True),
+                destino=dict(type='path', required=True),
+                formato_hoja=dict(type='str', required=False),
+                orientacion=dict(type='str', required=False, choices=['vertical', 'horizontal']),
+            )),
+            concurrencia=dict(type='int', required=False, default=4),
+            esperar=dict(type='str', required=False, choices=ESPERAS_NAVEGACION + ['selector', 'funcion'], default='load'),
+            selector=dict(type='str', required=False),
+            funcion=dict(type='str', required=False),
+            timeout=dict(type='float', required=False, default=30),
+            comparar=dict(type='str', required=False, choices=['ninguno', 'mtime', 'hash'], default='ninguno'),
+            servicio=dict(type='str', required=False, choices=MODOS_RENDERIZADOR, default='ninguno'),
+            servicio_socket=dict(type='path', required=False, default=None),
+            servicio_inactividad=dict(type='int', required=False, default=300),
+            servicio_timeout=dict(type='int', required=False, default=1800),
+        ),
+        required_one_of=[['origen', 'conversiones']],
+        mutually_exclusive=[['origen', 'conversiones']],
+        required_together=[['origen', 'destino']],
+        required_if=[('esperar', 'selector', ['selector']), ('esperar', 'funcion', ['funcion'])],
+        supports_check_mode=True
     )
+    arranque = round(time.perf_counter() - INICIO, 3)
 
-    ruta_html = os.path.abspath(modulo.params['origen'])
-    ruta_pdf = os.path.abspath(modulo.params['destino'])
     formato_hoja = modulo.params['formato_hoja']
     orientacion = modulo.params['orientacion']
+    comparar = modulo.params['comparar']
+    lote = modulo.params['conversiones'] is not None
+    espera = {
+        'estrategia': modulo.params['esperar'],
+        'selector': modulo.params['selector'],
+        'funcion': modulo.params['funcion'],
+        'timeout': modulo.params['timeout'],
+    }
+
+    if lote:
+        conversiones = [
+            {
+                'origen': os.path.abspath(conversion['origen']),
+                'destino': os.path.abspath(conversion['destino']),
+                'formato_hoja': conversion['formato_hoja'] or formato_hoja,
+                'orientacion': conversion['orientacion'] or orientacion,
+            }
+            for conversion in modulo.params['conversiones']
+        ]
+    else:
+        conversiones = [{
+            'origen': os.path.abspath(modulo.params['origen']),
+            'destino': os.path.abspath(modulo.params['destino']),
+            'formato_hoja': formato_hoja,
+            'orientacion': orientacion,
+        }]
+
+    for conversion in conversiones:
+        if not os.path.exists(conversion['origen']):
+            modulo.fail_json(msg=f"El archivo HTML no existe en la ruta: {conversion['origen']}")
+
+    actualizados = []
+    pendientes = []
+    huellas = {}
+
+    for conversion in conversiones:
+        if comparar != 'ninguno':
+            huellas[conversion['destino']] = huella_conversion(conversion, comparar, espera)
+            if esta_actualizado(conversion, huellas[conversion['destino']]):
+                actualizados.append(conversion)
+                continue
+        pendientes.append(conversion)
+
+    omitidos = [
+        {'origen': conversion['origen'], 'destino': conversion['destino'], 'failed': False, 'changed': False, 'segundos': 0.0}
+        for conversion in actualizados
+    ]
+
+    if modulo.check_mode:
+        if lote:
+            modulo.exit_json(
+                changed=bool(pendientes),
+                msg=f"{len(pendientes)} PDF serían generados (check mode)",
+                conversiones=[dict(conversion, changed=True) for conversion in pendientes] + omitidos,
+            )
+        modulo.exit_json(changed=bool(pendientes), msg="El PDF sería generado (check mode)", destino=conversiones[0]['destino'])
 
-    if not os.path.exists(ruta_html):
-        modulo.fail_json(msg=f"El archivo HTML no existe en la ruta: {ruta_html}")
+    importacion = 0.0
+    renderizador = 'local'
+    resultados = []
+    inicio = time.perf_counter()
+
+    if pendientes:
+        try:
+            respuesta = solicitar(
+                {'operacion': 'pdf', 'conversiones': pendientes, 'concurrencia': modulo.params['concurrencia'], 'espera': espera},
+                modulo.params['servicio'],
+                modulo.params['servicio_socket'],
+                modulo.params['servicio_inactividad'],
+                modulo.params['servicio_timeout'],
+            )
+        except ErrorRenderizador as error:
+            modulo.fail_json(msg=f"Error al generar el PDF: {str(error)}")
+
+        if respuesta is not None:
+            renderizador = 'servicio'
+            resultados = respuesta['resultados']
+        else:
+            try:
+                importacion = importar_pyppeteer()
+            except ImportError as error:
+                modulo.fail_json(msg=missing_required_lib('pyppeteer'), exception=str(error))
+
+            try:
+                inicio = time.perf_counter()
+                resultados = asyncio.run(convertir_lote(pendientes, modulo.params['concurrencia'], espera))
+            except Exception as error:
+                modulo.fail_json(msg=f"Error al generar el PDF: {str(error)}")
+
+    conversion = round(time.perf_counter() - inicio, 3)
 
     try:
-        asyncio.run(convertir_html_a_pdf(ruta_html, ruta_pdf, formato_hoja, orientacion))
-        modulo.exit_json(changed=True, msg="PDF generado correctamente", destino=ruta_pdf)
-    except Exception as error:
-        modulo.fail_json(msg=f"Error al generar el PDF: {str(error)}")
+        for resultado in resultados:
+            resultado['changed'] = not resultado['failed']
+            if comparar != 'ninguno' and not resultado['failed']:
+                guardar_manifiesto(resultado, huellas[resultado['destino']])
+    except OSError as error:
+        modulo.fail_json(msg=f"Error al guardar el manifiesto del PDF: {str(error)}")
+
+    tiempos = {
+        'arranque': arranque,
+        'importacion': importacion,
+        'conversion': conversion,
+        'total': round(time.perf_counter() - INICIO, 3),
+        'renderizador': renderizador,
+    }
+    fallidos = [resultado for resultado in resultados if resultado['failed']]
+
+    if not lote:
+        if fallidos:
+            modulo.fail_json(msg=f"Error al generar el PDF: {fallidos[0]['msg']}")
+        if omitidos:
+            modulo.exit_json(changed=False, msg="El PDF ya está actualizado", destino=omitidos[0]['destino'], tiempos=tiempos)
+        modulo.exit_json(changed=True, msg="PDF generado correctamente", destino=resultados[0]['destino'], tiempos=tiempos)
+
+    rendimiento = {
+        'archivos': len(resultados) - len(fallidos),
+        'omitidos': len(omitidos),
+        'segundos': conversion,
+        'archivos_por_segundo': round((len(resultados) - len(fallidos)) / conversion, 3) if conversion else 0.0,
+    }
+    orden = {conversion['destino']: indice for indice, conversion in enumerate(conversiones)}
+    resultados = sorted(resultados + omitidos, key=lambda resultado: orden[resultado['destino']])
+
+    if fallidos:
+        modulo.fail_json(
+            msg=f"No se pudieron generar {len(fallidos)} de {len(resultados)} PDF",
+            changed=len(fallidos) < len(resultados) - len(omitidos),
+            conversiones=resultados,
+            rendimiento=rendimiento,
+            tiempos=tiempos,
+        )
+
+    modulo.exit_json(
+        changed=rendimiento['archivos'] > 0,
+        msg=f"{rendimiento['archivos']} PDF generados correctamente, {len(omitidos)} ya estaban actualizados",
+        conversiones=resultados,
+        rendimiento=rendimiento,
+        tiempos=tiempos,
+    )
 
 if __name__ == '__main__':
     main()
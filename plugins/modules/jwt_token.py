@@ -0,0 +1,316 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+
+DOCUMENTATION = r'''
+---
+module: jwt_token
+short_description: Obtiene un access token de Google con el JWT firmado de una cuenta de servicio.
+description:
+  - Lee el JSON de la cuenta de servicio, construye y firma en proceso la aserción JWT (RS256) y la intercambia por
+    un access token en el endpoint de tokens de Google.
+  - El token se guarda en un caché en disco junto con su vencimiento, de modo que las siguientes ejecuciones lo
+    reutilizan sin firmar ni hacer peticiones HTTP hasta poco antes de que expire.
+  - Reemplaza la secuencia de tareas C(setup), C(slurp), C(set_fact), C(openssl_sign) y C(uri) del rol google_drive
+    por una sola tarea.
+options:
+  cuenta_servicio:
+    description:
+      - Ruta al JSON de la cuenta de servicio descargado desde la consola de Google Cloud.
+      - Debe contener C(client_email) y, si no se indica C(llave_privada), C(private_key).
+    required: true
+    type: path
+  llave_privada:
+    description:
+      - Ruta a una llave privada PEM que reemplaza la C(private_key) del JSON.
+    required: false
+    type: path
+  alcance:
+    description:
+      - Alcances (scopes) solicitados para el token.
+    required: false
+    type: list
+    elements: str
+    default: ['https://www.googleapis.com/auth/drive']
+  token_url:
+    description:
+      - Endpoint donde se intercambia el JWT por el access token.
+      - Por defecto el C(token_uri) del JSON o C(https://oauth2.googleapis.com/token).
+    required: false
+    type: str
+  sujeto:
+    description:
+      - Usuario a suplantar con delegación de dominio (claim C(sub)).
+    required: false
+    type: str
+  expiracion:
+    description:
+      - Segundos de validez de la aserción JWT. Google acepta como máximo 3600.
+    required: false
+    type: int
+    default: 3600
+  cache:
+    description:
+      - Archivo donde se guardan los tokens obtenidos y su vencimiento. Se crea con permisos 0600.
+    required: false
+    type: path
+    default: ~/.cache/xploit9999.utilidades/jwt_token.json
+  usar_cache:
+    description:
+      - Si es C(false) siempre se solicita un token nuevo y no se lee ni se escribe el caché.
+    required: false
+    type: bool
+    default: true
+  margen:
+    description:
+      - Segundos antes del vencimiento a partir de los cuales el token del caché ya no se reutiliza.
+    required: false
+    type: int
+    default: 300
+notes:
+  - El token retornado es una credencial; registre el resultado en tareas con C(no_log: true).
+requirements:
+  - cryptography
+author:
+  - John Freidman (@xploit9999)
+'''
+
+EXAMPLES = r'''
+- name: Obtener access token para Google Drive
+  xploit9999.utilidades.jwt_token:
+    cuenta_servicio: "/ruta/a/cuenta_servicio.json"
+  register: jwt
+  no_log: true
+
+- name: Usar el token
+  ansible.builtin.uri:
+    url: "https://www.googleapis.com/drive/v3/files"
+    headers:
+      Authorization: "Bearer {{ jwt.access_token }}"
+
+- name: Token con otro alcance, suplantando a un usuario del dominio
+  xploit9999.utilidades.jwt_token:
+    cuenta_servicio: "/ruta/a/cuenta_servicio.json"
+    alcance:
+      - "https://www.googleapis.com/auth/drive.readonly"
+    sujeto: "reportes@midominio.com"
+  register: jwt
+  no_log: true
+'''
+
+RETURN = r'''
+access_token:
+  description: Access token obtenido o reutilizado del caché.
+  type: str
+  returned: success
+token_type:
+  description: Tipo de token, normalmente C(Bearer).
+  type: str
+  returned: success
+expira:
+  description: Momento de vencimiento del token en segundos desde epoch.
+  type: int
+  returned: success
+expira_en:
+  description: Segundos de validez que le quedan al token.
+  type: int
+  returned: success
+desde_cache:
+  description: Si el token se reutilizó del caché sin hacer peticiones HTTP.
+  type: bool
+  returned: success
+'''
+
+import hashlib
+import json
+import os
+import tempfile
+import time
+from urllib.parse import urlencode
+
+from ansible.module_utils.basic import AnsibleModule, missing_required_lib
+from ansible.module_utils.urls import fetch_url
+
+from ansible_collections.xploit9999.utilidades.plugins.module_utils.firmas import (
+    ErrorFirma,
+    b64url,
+    firmar,
+    interpretar_llave,
+)
+
+TOKEN_URL = 'https://oauth2.googleapis.com/token'
+TIPO_CONCESION = 'urn:ietf:params:oauth:grant-type:jwt-bearer'
+
+def leer_json(modulo, ruta, descripcion):
+    """Lee un archivo JSON y falla con un mensaje claro si no se puede interpretar."""
+
+    try:
+        with open(ruta, encoding='utf-8') as archivo:
+            return json.load(archivo)
+    except OSError as error:
+        modulo.fail_json(msg=f"No se pudo leer {descripcion} {ruta}: {error.strerror}")
+    except ValueError as error:
+        modulo.fail_json(msg=f"{descripcion.capitalize()} {ruta} no es un JSON válido: {error}")
+
+def clave_cache(cuenta, alcance, token_url, sujeto):
+    """Identifica un token por cuenta, alcance, endpoint y usuario suplantado."""
+
+    return hashlib.sha256('\n'.join([cuenta, alcance, token_url, sujeto or '']).encode('utf-8')).hexdigest()
+
+def leer_cache(ruta):
+    """Retorna el contenido del caché o un diccionario vacío si no existe o está dañado."""
+
+    try:
+        with open(ruta, encoding='utf-8') as archivo:
+            cache = json.load(archivo)
+    except (OSError, ValueError):
+        return {}
+
+    return cache if isinstance(cache, dict) else {}
+
+def guardar_cache(ruta, cache, ahora):
+    """Guarda el caché de forma atómica con permisos 0600, descartando los tokens vencidos."""
+
+    directorio = os.path.dirname(ruta) or '.'
+    os.makedirs(directorio, mode=0o700, exist_ok=True)
+
+    vigentes = {clave: entrada for clave, entrada in cache.items() if entrada.get('expira', 0) > ahora}
+
+    # mkstemp crea el archivo con permisos 0600, que se conservan al reemplazar el caché
+    descriptor, temporal = tempfile.mkstemp(dir=directorio, prefix='.jwt_token.')
+    try:
+        with os.fdopen(descriptor, 'w', encoding='utf-8') as archivo:
+            json.dump(vigentes, archivo)
+        os.replace(temporal, ruta)
+    except OSError:
+        if os.path.exists(temporal):
+            os.unlink(temporal)
+        raise
+
+def construir_assertion(llave, cuenta, alcance, token_url, sujeto, expiracion, ahora):
+    """Construye y firma (RS256) la aserción JWT de la cuenta de servicio."""
+
+    encabezado = {'alg': 'RS256', 'typ': 'JWT'}
+    if cuenta.get('private_key_id'):
+        encabezado['kid'] = cuenta['private_key_id']
+
+    reclamos = {
+        'iss': cuenta['client_email'],
+        'scope': alcance,
+        'aud': token_url,
+        'iat': ahora,
+        'exp': ahora + expiracion,
+    }
+    if sujeto:
+        reclamos['sub'] = sujeto
+
+    firmado = '.'.join(
+        b64url(json.dumps(parte, separators=(',', ':')).encode('utf-8')) for parte in (encabezado, reclamos)
+    )
+
+    return f"{firmado}.{b64url(firmar(llave, firmado.encode('ascii'), 'sha256'))}"
+
+def solicitar_token(modulo, token_url, assertion):
+    """Intercambia la aserción JWT por un access token."""
+
+    respuesta, info = fetch_url(
+        modulo,
+        token_url,
+        data=urlencode({'grant_type': TIPO_CONCESION, 'assertion': assertion}),
+        headers={'Content-Type': 'application/x-www-form-urlencoded'},
+        method='POST',
+    )
+
+    if info['status'] != 200:
+        cuerpo = info.get('body') or b''
+        modulo.fail_json(
+            msg=f"No se pudo obtener el access token desde {token_url}: {info.get('msg')}",
+            status=info['status'],
+            respuesta=cuerpo.decode('utf-8', 'replace') if isinstance(cuerpo, bytes) else cuerpo,
+        )
+
+    try:
+        datos = json.loads(respuesta.read())
+        return datos['access_token'], datos.get('token_type', 'Bearer'), int(datos.get('expires_in', 3600))
+    except (ValueError, KeyError, TypeError):
+        modulo.fail_json(msg=f"La respuesta de {token_url} no contiene un access token.")
+
+def obtener_token(modulo):
+    cuenta = leer_json(modulo, modulo.params['cuenta_servicio'], 'la cuenta de servicio')
+
+    if not cuenta.get('client_email'):
+        modulo.fail_json(msg="La cuenta de servicio no contiene 'client_email'.")
+
+    alcance = ' '.join(modulo.params['alcance'])
+    token_url = modulo.params['token_url'] or cuenta.get('token_uri') or TOKEN_URL
+    sujeto = modulo.params['sujeto']
+    ruta_cache = modulo.params['cache']
+    usar_cache = modulo.params['usar_cache']
+    ahora = int(time.time())
+
+    clave = clave_cache(cuenta['client_email'], alcance, token_url, sujeto)
+    cache = leer_cache(ruta_cache) if usar_cache else {}
+
+    entrada = cache.get(clave)
+    if entrada and entrada.get('expira', 0) - modulo.params['margen'] > ahora:
+        return dict(
+            access_token=entrada['access_token'],
+            token_type=entrada.get('token_type', 'Bearer'),
+            expira=entrada['expira'],
+            expira_en=entrada['expira'] - ahora,
+            desde_cache=True,
+        )
+
+    if modulo.params['llave_privada']:
+        try:
+            with open(modulo.params['llave_privada'], 'rb') as archivo:
+                pem = archivo.read()
+        except OSError as error:
+            modulo.fail_json(msg=f"No se pudo leer la llave privada {modulo.params['llave_privada']}: {error.strerror}")
+    elif cuenta.get('private_key'):
+        pem = cuenta['private_key']
+    else:
+        modulo.fail_json(msg="La cuenta de servicio no contiene 'private_key' y no se indicó 'llave_privada'.")
+
+    try:
+        llave = interpretar_llave(pem, origen='la llave privada de la cuenta de servicio')
+        assertion = construir_assertion(llave, cuenta, alcance, token_url, sujeto, modulo.params['expiracion'], ahora)
+    except ImportError as error:
+        modulo.fail_json(msg=missing_required_lib('cryptography'), exception=str(error))
+    except ErrorFirma as error:
+        modulo.fail_json(msg=str(error))
+
+    access_token, token_type, expira_en = solicitar_token(modulo, token_url, assertion)
+    expira = ahora + expira_en
+
+    if usar_cache:
+        cache[clave] = dict(access_token=access_token, token_type=token_type, expira=expira)
+        try:
+            guardar_cache(ruta_cache, cache, ahora)
+        except OSError as error:
+            modulo.warn(f"No se pudo guardar el caché de tokens en {ruta_cache}: {error.strerror}")
+
+    return dict(access_token=access_token, token_type=token_type, expira=expira, expira_en=expira_en, desde_cache=False)
+
+def main():
+    modulo = AnsibleModule(
+        argument_spec=dict(
+            cuenta_servicio=dict(type='path', required=True),
+            llave_privada=dict(type='path', required=False, no_log=False),
+            alcance=dict(type='list', elements='str', required=False, default=['https://www.googleapis.com/auth/drive']),
+            token_url=dict(type='str', required=False),
+            sujeto=dict(type='str', required=False),
+            expiracion=dict(type='int', required=False, default=3600),
+            cache=dict(type='path', required=False, default='~/.cache/xploit9999.utilidades/jwt_token.json'),
+            usar_cache=dict(type='bool', required=False, default=True),
+            margen=dict(type='int', required=False, default=300),
+        ),
+        supports_check_mode=True,
+    )
+
+    if not 0 < modulo.params['expiracion'] <= 3600:
+        modulo.fail_json(msg="'expiracion' debe estar entre 1 y 3600 segundos.")
+
+    modulo.exit_json(changed=False, **obtener_token(modulo))
+
+if __name__ == '__main__':
+    main()
@@ -19,12 +19,14 @@ options:
   hoja:
     description:
       - Nombre de la hoja desde donde se leerán los datos.
-    required: true
+      - Si se omite se usa la hoja indicada en C(rango) o la hoja activa.
+    required: false
     type: str
   celda_inicial:
     description:
-      - Celda inicial para comenzar la lectura (por ejemplo, A34).
-    required: true
+      - Celda inicial para comenzar la lectura en notación A1 (por ejemplo, A34, AB34 o $AB$34).
+      - Requerido si no se usa C(rango) ni C(consultas).
+    required: false
     type: str
   num_columnas:
     description:
@@ -43,10 +45,117 @@ options:
   delimitador:
     description:
       - Cadena usada como marcador para detener la lectura cuando se encuentra en alguna celda.
+      - Si no se encuentra, la lectura continúa hasta la última fila de la hoja.
+      - Con C(tipos=nativos) solo se compara con celdas de texto.
       - No se puede usar junto con C(celda_final).
     required: false
     type: str
     default: null
+  rango:
+    description:
+      - Rango a leer en lugar de C(celda_inicial) y C(celda_final); una dirección A1 (C(A1:J40)), una dirección con hoja
+        (C(Datos!A1:J40), C('Hoja con espacios'!$A$1:$J$40)) o un rango con nombre definido en el libro.
+      - No se puede usar junto con C(celda_inicial), C(celda_final) ni C(delimitador).
+    required: false
+    type: str
+  consultas:
+    description:
+      - Lista de rangos a leer del mismo libro en una sola ejecución, posiblemente de distintas hojas.
+      - El libro se abre una sola vez y cada hoja se recorre una sola vez; las consultas de una misma hoja se atienden
+        en orden de fila durante el mismo recorrido.
+      - Cada consulta acepta las mismas reglas que la lectura simple; C(delimitador) o C(celda_final), y C(num_columnas)
+        cuando no se usa C(celda_final).
+      - No se puede usar junto con C(hoja) y C(celda_inicial).
+    required: false
+    type: list
+    elements: dict
+    suboptions:
+      nombre:
+        description: Nombre de la consulta, usado como clave en C(resultados). Debe ser único.
+        required: true
+        type: str
+      hoja:
+        description: Nombre de la hoja a leer. Si se omite se usa la hoja indicada en C(rango) o la hoja activa.
+        required: false
+        type: str
+      celda_inicial:
+        description: Celda inicial de la consulta. Requerida si no se usa C(rango).
+        required: false
+        type: str
+      rango:
+        description: Rango de la consulta (dirección A1, dirección con hoja o rango con nombre), en lugar de las celdas.
+        required: false
+        type: str
+      num_columnas:
+        description: Número de columnas a leer desde la celda inicial.
+        required: false
+        type: int
+      celda_final:
+        description: Celda final de la consulta.
+        required: false
+        type: str
+      delimitador:
+        description: Cadena que detiene la lectura de la consulta al encontrarse en alguna de sus celdas.
+        required: false
+        type: str
+  motor:
+    description:
+      - Forma de abrir el libro.
+      - C(streaming) abre el libro en modo solo lectura, recorre las filas sin cargar la hoja completa en memoria
+        y cierra el archivo apenas encuentra el C(delimitador) o llega a C(celda_final). La memoria se mantiene
+        constante sin importar el tamaño del libro.
+      - C(completo) carga todas las celdas de todas las hojas en memoria antes de leer el rango, como en versiones
+        anteriores del módulo.
+    required: false
+    type: str
+    choices: ['streaming', 'completo']
+    default: "streaming"
+  tipos:
+    description:
+      - Tipo de los valores retornados.
+      - C(texto) convierte cada celda a texto sin espacios en los extremos y las celdas vacías a C("").
+      - C(nativos) conserva los tipos de Excel (números, fechas, booleanos) y las celdas vacías como C(null), sin convertir
+        celda por celda. Las fechas se serializan en formato ISO 8601.
+    required: false
+    type: str
+    choices: ['texto', 'nativos']
+    default: "texto"
+  estructura:
+    description:
+      - Forma de C(datos) y de cada entrada de C(resultados).
+      - C(filas) retorna una lista por fila; C(columnas) retorna una lista por columna.
+    required: false
+    type: str
+    choices: ['filas', 'columnas']
+    default: "filas"
+  encabezado:
+    description:
+      - Usa la primera fila del rango como nombres de columna.
+      - Con C(estructura=columnas) los datos se retornan como un diccionario por nombre de columna y en Parquet define
+        los nombres de las columnas. Las celdas de encabezado vacías toman la letra de la columna.
+    required: false
+    type: bool
+    default: false
+  destino:
+    description:
+      - Ruta en el host donde se escribe el rango leído, en lugar de retornarlo en C(datos).
+      - Evita transferir y serializar listas grandes en el resultado del módulo. En CSV las filas se escriben a medida
+        que se recorre la hoja, sin acumularse en memoria.
+      - El archivo solo se reemplaza si su contenido cambió.
+      - No se puede usar junto con C(consultas).
+    required: false
+    type: path
+  formato_destino:
+    description:
+      - Formato del archivo C(destino). Por defecto se deduce de la extensión; C(.parquet) genera Parquet y cualquier otra CSV.
+      - C(parquet) requiere C(pyarrow) y que cada columna tenga un solo tipo (usa C(encabezado) si la primera fila
+        contiene los títulos).
+    required: false
+    type: str
+    choices: ['csv', 'parquet']
+requirements:
+  - openpyxl
+  - pyarrow (solo para C(formato_destino=parquet))
 author:
   - John (@Xploit9999)
 '''
@@ -68,66 +177,411 @@ EXAMPLES = r'''
     hoja: "Datos"
     celda_inicial: "A34"
     celda_final: "J40"
+
+# Leer varios bloques del mismo libro con una sola apertura
+- name: Leer varias consultas
+  leer_excel:
+    ruta: "/ruta/al/archivo.xlsx"
+    consultas:
+      - nombre: encabezado
+        hoja: "Datos"
+        celda_inicial: "A1"
+        celda_final: "D3"
+      - nombre: detalle
+        hoja: "Datos"
+        celda_inicial: "A34"
+        num_columnas: 10
+        delimitador: "*/"
+      - nombre: totales
+        hoja: "Resumen"
+        celda_inicial: "B2"
+        celda_final: "C10"
+  register: excel
+
+# Leer un rango con nombre o una dirección con hoja
+- name: Leer rango con nombre
+  leer_excel:
+    ruta: "/ruta/al/archivo.xlsx"
+    rango: "Totales"
+
+- name: Leer columnas después de la Z
+  leer_excel:
+    ruta: "/ruta/al/archivo.xlsx"
+    rango: "'Datos 2024'!$A$1:$BZ$500"
+
+# Conservar los tipos de Excel y retornar una lista por columna
+- name: Leer datos tipados por columna
+  leer_excel:
+    ruta: "/ruta/al/archivo.xlsx"
+    hoja: "Datos"
+    celda_inicial: "A1"
+    num_columnas: 5
+    delimitador: "*/"
+    tipos: nativos
+    estructura: columnas
+    encabezado: true
+
+# Escribir un rango grande directamente en CSV en el host
+- name: Exportar a CSV
+  leer_excel:
+    ruta: "/ruta/al/archivo.xlsx"
+    hoja: "Datos"
+    celda_inicial: "A1"
+    num_columnas: 20
+    delimitador: "*/"
+    tipos: nativos
+    destino: "/ruta/al/archivo.csv"
+
+# Cargar el libro completo en memoria
+- name: Leer con el motor completo
+  leer_excel:
+    ruta: "/ruta/al/archivo.xlsx"
+    hoja: "Datos"
+    celda_inicial: "A34"
+    celda_final: "J40"
+    motor: completo
 '''
 
 RETURN = r'''
 datos:
-  description: Lista de filas leídas desde la hoja de Excel.
-  type: list
-  elements: list
-  returned: success
+  description:
+    - Lista de filas leídas desde la hoja de Excel.
+    - Con C(estructura=columnas) es una lista por columna, o un diccionario por nombre de columna si se usa C(encabezado).
+  type: raw
+  returned: cuando no se usa C(consultas) ni C(destino)
   sample: [["dato1", "dato2"], ["dato3", "dato4"]]
+destino:
+  description: Ruta del archivo escrito.
+  type: str
+  returned: cuando se usa C(destino)
+  sample: "/ruta/al/archivo.csv"
+filas_exportadas:
+  description: Cantidad de filas de datos escritas en C(destino), sin contar el encabezado en Parquet.
+  type: int
+  returned: cuando se usa C(destino)
+  sample: 200000
+resultados:
+  description: Filas leídas por cada consulta, con el nombre de la consulta como clave.
+  type: dict
+  returned: cuando se usa C(consultas)
+  sample: {"encabezado": [["Cliente", "Fecha"]], "detalle": [["dato1", "dato2"], ["dato3", "dato4"]]}
+rendimiento:
+  description:
+    - Métricas de la lectura; C(motor) utilizado, C(filas_recorridas) (incluida la fila del delimitador),
+      C(memoria_pico_mb) (memoria residente máxima del proceso) y C(segundos).
+    - Con C(consultas), C(filas_recorridas) es el total de filas recorridas en todas las hojas.
+  type: dict
+  returned: success
+  sample: {"motor": "streaming", "filas_recorridas": 1250, "memoria_pico_mb": 41.3, "segundos": 0.184}
 changed:
-  description: Siempre es False porque no se modifica ningún archivo.
+  description: Solo es True cuando se escribió o modificó el archivo C(destino).
   type: bool
   returned: always
 '''
 
+import csv
+import filecmp
+import os
+import resource
+import sys
+import tempfile
+import time
+
 import openpyxl
-from ansible.module_utils.basic import AnsibleModule
+from ansible.module_utils.basic import AnsibleModule, missing_required_lib
+
+from ansible_collections.xploit9999.utilidades.plugins.module_utils.celdas import (
+    letra_columna,
+    parsear_celda,
+    resolver_rango,
+)
+
+MOTORES = ['streaming', 'completo']
+TIPOS = ['texto', 'nativos']
+ESTRUCTURAS = ['filas', 'columnas']
+FORMATOS_DESTINO = ['csv', 'parquet']
+
+class EscritorCsv:
+    """Escribe cada fila recibida directamente en el CSV, sin acumularlas en memoria."""
+
+    def __init__(self, archivo):
+        self.escritor = csv.writer(archivo)
+        self.filas = 0
+
+    def append(self, fila):
+        self.escritor.writerow(fila)
+        self.filas += 1
+
+def memoria_pico_mb():
+    """Memoria residente máxima (RSS) alcanzada por el proceso, en MB."""
+
+    pico = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    if sys.platform == 'darwin':
+        pico /= 1024
+    return round(pico / 1024, 1)
+
+def rango_consulta(celda_inicial, num_columnas, delimitador=None, celda_final=None):
+    """Valida una consulta y retorna sus límites de filas y columnas.
 
-def leer_excel(ruta, hoja_nombre, celda_inicial, num_columnas, delimitador=None, celda_final=None):
+    Con C(delimitador) la fila final queda abierta (None) y la lectura sigue hasta encontrarlo o hasta el fin de la hoja.
+    """
 
     if delimitador and celda_final:
         raise ValueError("No se puede usar 'delimitador' y 'celda_final' juntos.")
     if not delimitador and not celda_final:
         raise ValueError("Debe especificarse 'delimitador' o 'celda_final'.")
 
-    columna_inicial = ord(celda_inicial[0].upper()) - ord('A') + 1
-    fila_inicial = int(celda_inicial[1:])
+    fila_inicial, columna_inicial = parsear_celda(celda_inicial)
 
     if celda_final:
-        columna_final = ord(celda_final[0].upper()) - ord('A') + 1
-        fila_final = int(celda_final[1:])
-        max_col = columna_final  
+        fila_final, max_col = parsear_celda(celda_final)
     elif num_columnas is not None:
         max_col = columna_inicial + num_columnas - 1
-        fila_final = fila_inicial + 1000  
+        fila_final = None
     else:
         raise ValueError("Debe especificarse 'num_columnas' cuando no se usa 'celda_final'.")
 
-    wb = openpyxl.load_workbook(ruta, data_only=True)
-    hoja = wb[hoja_nombre]
-    datos = []
+    return {
+        'fila_inicial': fila_inicial,
+        'fila_final': fila_final,
+        'columna_inicial': columna_inicial,
+        'columna_final': max_col,
+        'delimitador': delimitador.strip() if delimitador else None,
+    }
 
-    for fila in hoja.iter_rows(min_row=fila_inicial, max_row=fila_final, min_col=columna_inicial, max_col=max_col):
-        datos_fila = [str(celda.value).strip() if celda.value is not None else "" for celda in fila]
+def resolver_consulta(libro, consulta):
+    """Límites y hoja de una consulta, indicada por C(rango) (dirección o rango con nombre) o por celdas.
 
-        if delimitador and any(delimitador.strip() == valor for valor in datos_fila):  
-            break  
+    Si la consulta no indica hoja se usa la hoja activa.
+    """
 
-        datos.append(datos_fila)
+    if consulta.get('rango'):
+        rango = resolver_rango(libro, consulta['rango'], consulta.get('hoja'))
+        rango['delimitador'] = None
+    else:
+        rango = rango_consulta(
+            consulta['celda_inicial'],
+            consulta.get('num_columnas'),
+            consulta.get('delimitador'),
+            consulta.get('celda_final'),
+        )
+        rango['hoja'] = consulta.get('hoja')
+
+    rango['hoja'] = rango['hoja'] or libro.active.title
+    rango['nombre'] = consulta['nombre']
+    return rango
+
+def leer_hoja(hoja, rangos, resultados, tipos='texto'):
+    """Recorre una sola vez las filas que cubren todos los rangos de la hoja, ordenados por fila inicial.
+
+    Cada fila se reparte entre las consultas activas y el recorrido termina cuando todas finalizaron.
+    Con C(tipos=nativos) los valores se entregan tal como los retorna openpyxl, sin convertir cada celda a texto.
+    Retorna la cantidad de filas recorridas.
+    """
+
+    min_col = min(rango['columna_inicial'] for rango in rangos)
+    max_col = max(rango['columna_final'] for rango in rangos)
+    fila_inicial = rangos[0]['fila_inicial']
+    finales = [rango['fila_final'] for rango in rangos]
+    fila_final = None if None in finales else max(finales)
+
+    activas = []
+    siguiente = 0
+    filas_recorridas = 0
+
+    filas = hoja.iter_rows(min_row=fila_inicial, max_row=fila_final, min_col=min_col, max_col=max_col, values_only=True)
+
+    for numero, fila in enumerate(filas, start=fila_inicial):
+        filas_recorridas += 1
+
+        while siguiente < len(rangos) and rangos[siguiente]['fila_inicial'] <= numero:
+            if rangos[siguiente]['fila_final'] is None or rangos[siguiente]['fila_final'] >= numero:
+                activas.append(rangos[siguiente])
+            siguiente += 1
+
+        continuan = []
+        for rango in activas:
+            valores = fila[rango['columna_inicial'] - min_col:rango['columna_final'] - min_col + 1]
+
+            if tipos == 'texto':
+                datos_fila = [str(valor).strip() if valor is not None else "" for valor in valores]
+            else:
+                datos_fila = list(valores)
+
+            if rango['delimitador'] and any(isinstance(valor, str) and valor.strip() == rango['delimitador'] for valor in datos_fila):
+                continue
+
+            resultados[rango['nombre']].append(datos_fila)
+            if rango['fila_final'] is None or numero < rango['fila_final']:
+                continuan.append(rango)
+
+        activas = continuan
+
+        if not activas and siguiente == len(rangos):
+            break
+
+    return filas_recorridas
+
+def leer_consultas(ruta, consultas, motor='streaming', tipos='texto', colectores=None):
+    """Responde todas las consultas abriendo el libro una sola vez y recorriendo cada hoja una sola vez.
+
+    Las filas de cada consulta se agregan a su colector en C(colectores) (cualquier objeto con C(append)) o a una lista.
+    Retorna un diccionario con las filas de cada consulta por nombre, la cantidad de filas recorridas
+    y los límites resueltos de cada consulta por nombre.
+    """
+
+    colectores = colectores or {}
+    resultados = {consulta['nombre']: colectores.get(consulta['nombre'], []) for consulta in consultas}
+    filas_recorridas = 0
+
+    wb = openpyxl.load_workbook(ruta, read_only=motor == 'streaming', data_only=True)
+
+    try:
+        resueltos = {consulta['nombre']: resolver_consulta(wb, consulta) for consulta in consultas}
+
+        por_hoja = {}
+        for rango in resueltos.values():
+            por_hoja.setdefault(rango['hoja'], []).append(rango)
+
+        for hoja_nombre, rangos in por_hoja.items():
+            hoja = wb[hoja_nombre]
+            if motor == 'streaming':
+                # Las dimensiones declaradas en el archivo pueden estar desactualizadas; se lee hasta la última fila real.
+                hoja.reset_dimensions()
+
+            rangos.sort(key=lambda rango: rango['fila_inicial'])
+            filas_recorridas += leer_hoja(hoja, rangos, resultados, tipos)
+    finally:
+        wb.close()
+
+    return resultados, filas_recorridas, resueltos
+
+def leer_excel(ruta, hoja_nombre, celda_inicial, num_columnas, delimitador=None, celda_final=None, motor='streaming', tipos='texto'):
+    consulta = {
+        'nombre': 'datos',
+        'hoja': hoja_nombre,
+        'celda_inicial': celda_inicial,
+        'num_columnas': num_columnas,
+        'delimitador': delimitador,
+        'celda_final': celda_final,
+    }
+
+    resultados, filas_recorridas, _ = leer_consultas(ruta, [consulta], motor, tipos)
+    return resultados['datos'], filas_recorridas
+
+def nombres_columnas(encabezados, columna_inicial):
+    """Nombres únicos de columna a partir del encabezado; las celdas vacías toman la letra de la columna."""
+
+    nombres = []
+    for indice, valor in enumerate(encabezados):
+        nombre = str(valor).strip() if valor is not None else ""
+        nombre = nombre or letra_columna(columna_inicial + indice)
 
-    return datos
+        base, repeticion = nombre, 2
+        while nombre in nombres:
+            nombre = f"{base}_{repeticion}"
+            repeticion += 1
+        nombres.append(nombre)
+
+    return nombres
+
+def a_columnas(filas, encabezado, columna_inicial):
+    """Convierte las filas en una lista por columna, o en un diccionario por nombre de columna si hay encabezado."""
+
+    columnas = [list(columna) for columna in zip(*filas)]
+
+    if not encabezado:
+        return columnas
+
+    nombres = nombres_columnas([columna[0] for columna in columnas], columna_inicial)
+    return {nombre: columna[1:] for nombre, columna in zip(nombres, columnas)}
+
+def exportar_parquet(filas, ruta, encabezado, columna_inicial):
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    columnas = [list(columna) for columna in zip(*filas)]
+
+    if encabezado:
+        nombres = nombres_columnas([columna[0] for columna in columnas], columna_inicial)
+        columnas = [columna[1:] for columna in columnas]
+    else:
+        nombres = [letra_columna(columna_inicial + indice) for indice in range(len(columnas))]
+
+    pq.write_table(pa.table(dict(zip(nombres, columnas))), ruta)
+
+def reemplazar_si_cambio(module, temporal, destino):
+    """Mueve el archivo temporal al destino solo si su contenido cambió. Retorna si el destino fue modificado.
+
+    atomic_move conserva el modo y el dueño de un destino existente y aplica el umask a uno nuevo.
+    """
+
+    if os.path.exists(destino) and filecmp.cmp(temporal, destino, shallow=False):
+        os.unlink(temporal)
+        return False
+
+    module.atomic_move(temporal, os.path.abspath(destino))
+    return True
+
+def exportar_excel(module, ruta, consulta, motor, tipos, destino, formato_destino, encabezado):
+    """Escribe el rango directamente en CSV o Parquet sobre el host, sin retornarlo en el resultado del módulo.
+
+    El CSV se escribe fila por fila mientras se recorre la hoja. Retorna las filas exportadas,
+    las filas recorridas y si el archivo de destino cambió.
+    """
+
+    descriptor, temporal = tempfile.mkstemp(dir=os.path.dirname(destino) or '.', prefix=f".{os.path.basename(destino)}.", suffix='.tmp')
+
+    try:
+        if formato_destino == 'csv':
+            with os.fdopen(descriptor, 'w', newline='', encoding='utf-8') as archivo:
+                escritor = EscritorCsv(archivo)
+                _, filas_recorridas, _ = leer_consultas(ruta, [consulta], motor, tipos, {consulta['nombre']: escritor})
+            filas_exportadas = escritor.filas
+        else:
+            os.close(descriptor)
+            resultados, filas_recorridas, resueltos = leer_consultas(ruta, [consulta], motor, tipos)
+            filas = resultados[consulta['nombre']]
+            exportar_parquet(filas, temporal, encabezado, resueltos[consulta['nombre']]['columna_inicial'])
+            filas_exportadas = len(filas) - 1 if encabezado and filas else len(filas)
+
+        return filas_exportadas, filas_recorridas, reemplazar_si_cambio(module, temporal, destino)
+    finally:
+        if os.path.exists(temporal):
+            os.unlink(temporal)
 
 def iniciar_proceso():
     module_args = dict(
         ruta=dict(type='str', required=True),
-        hoja=dict(type='str', required=True),
-        celda_inicial=dict(type='str', required=True),
+        hoja=dict(type='str', required=False, default=None),
+        celda_inicial=dict(type='str', required=False, default=None),
         num_columnas=dict(type='int', required=False, default=None),
         delimitador=dict(type='str', required=False, default=None),
-        celda_final=dict(type='str', required=False, default=None)
+        celda_final=dict(type='str', required=False, default=None),
+        rango=dict(type='str', required=False, default=None),
+        consultas=dict(
+            type='list',
+            elements='dict',
+            required=False,
+            default=None,
+            options=dict(
+                nombre=dict(type='str', required=True),
+                hoja=dict(type='str', required=False, default=None),
+                celda_inicial=dict(type='str', required=False, default=None),
+                num_columnas=dict(type='int', required=False, default=None),
+                delimitador=dict(type='str', required=False, default=None),
+                celda_final=dict(type='str', required=False, default=None),
+                rango=dict(type='str', required=False, default=None),
+            ),
+            required_one_of=[('celda_inicial', 'rango')],
+            mutually_exclusive=[('rango', 'celda_inicial'), ('rango', 'celda_final'), ('rango', 'delimitador')],
+        ),
+        motor=dict(type='str', required=False, choices=MOTORES, default='streaming'),
+        tipos=dict(type='str', required=False, choices=TIPOS, default='texto'),
+        estructura=dict(type='str', required=False, choices=ESTRUCTURAS, default='filas'),
+        encabezado=dict(type='bool', required=False, default=False),
+        destino=dict(type='path', required=False, default=None),
+        formato_destino=dict(type='str', required=False, choices=FORMATOS_DESTINO, default=None)
     )
 
     resultado = dict(
@@ -136,17 +590,83 @@ def iniciar_proceso():
     )
 
     try:
-        module = AnsibleModule(argument_spec=module_args, supports_check_mode=False)
-
-        resultado['datos'] = leer_excel(
-            module.params['ruta'],
-            module.params['hoja'],
-            module.params['celda_inicial'],
-            module.params['num_columnas'],
-            module.params.get('delimitador'),
-            module.params.get('celda_final')
+        module = AnsibleModule(
+            argument_spec=module_args,
+            required_one_of=[('celda_inicial', 'rango', 'consultas')],
+            mutually_exclusive=[
+                ('hoja', 'consultas'),
+                ('celda_inicial', 'consultas'),
+                ('rango', 'consultas'),
+                ('destino', 'consultas'),
+                ('rango', 'celda_inicial'),
+                ('rango', 'celda_final'),
+                ('rango', 'delimitador'),
+            ],
+            supports_check_mode=False
         )
 
+        inicio = time.perf_counter()
+        consultas = module.params['consultas']
+        destino = module.params['destino']
+        tipos = module.params['tipos']
+
+        if consultas:
+            nombres = [consulta['nombre'] for consulta in consultas]
+            repetidos = sorted({nombre for nombre in nombres if nombres.count(nombre) > 1})
+            if repetidos:
+                module.fail_json(msg=f"Los nombres de las consultas deben ser únicos: {', '.join(repetidos)}")
+        else:
+            consultas = [{
+                'nombre': 'datos',
+                'hoja': module.params['hoja'],
+                'celda_inicial': module.params['celda_inicial'],
+                'num_columnas': module.params['num_columnas'],
+                'delimitador': module.params.get('delimitador'),
+                'celda_final': module.params.get('celda_final'),
+                'rango': module.params['rango'],
+            }]
+
+        if destino:
+            formato_destino = module.params['formato_destino'] or ('parquet' if destino.lower().endswith('.parquet') else 'csv')
+
+            if formato_destino == 'parquet':
+                try:
+                    import pyarrow  # noqa: F401
+                except ImportError as error:
+                    module.fail_json(msg=missing_required_lib('pyarrow'), exception=str(error))
+
+            filas_exportadas, filas_recorridas, resultado['changed'] = exportar_excel(
+                module,
+                module.params['ruta'],
+                consultas[0],
+                module.params['motor'],
+                tipos,
+                destino,
+                formato_destino,
+                module.params['encabezado']
+            )
+
+            resultado['destino'] = destino
+            resultado['filas_exportadas'] = filas_exportadas
+        else:
+            datos, filas_recorridas, resueltos = leer_consultas(module.params['ruta'], consultas, module.params['motor'], tipos)
+
+            if module.params['estructura'] == 'columnas':
+                for nombre, rango in resueltos.items():
+                    datos[nombre] = a_columnas(datos[nombre], module.params['encabezado'], rango['columna_inicial'])
+
+            if module.params['consultas']:
+                resultado['resultados'] = datos
+            else:
+                resultado['datos'] = datos['datos']
+
+        resultado['rendimiento'] = {
+            'motor': module.params['motor'],
+            'filas_recorridas': filas_recorridas,
+            'memoria_pico_mb': memoria_pico_mb(),
+            'segundos': round(time.perf_counter() - inicio, 3),
+        }
+
         module.exit_json(**resultado)
 
     except Exception as e:
@@ -154,4 +674,3 @@ def iniciar_proceso():
 
 if __name__ == '__main__':
     iniciar_proceso()
-
@@ -10,15 +10,27 @@ description:
   - Se puede usar un delimitador como referencia para insertar datos, o un rango de celdas definido por el usuario.
   - Si se usa el delimitador, este será reemplazado con los datos y movido a la siguiente fila.
   - Si se define un rango (`celda_inicial` y `celda_final`), se escriben los datos en la primera fila vacía disponible.
+  - Con C(modo=generar) crea un libro nuevo en modo solo escritura a partir de C(data) o de un archivo CSV o JSON lines.
 options:
   ruta:
     description:
-      - Ruta absoluta al archivo de Excel a modificar.
+      - Ruta absoluta al archivo de Excel a modificar, o a generar con C(modo=generar).
     required: true
     type: str
+  modo:
+    description:
+      - C(modificar) edita un libro existente.
+      - C(generar) crea un libro nuevo con openpyxl en modo solo escritura; las filas se agregan a medida que se leen
+        de C(data) u C(origen) y la memoria se mantiene constante sin importar la cantidad de filas. Si C(ruta) existe
+        se reemplaza.
+    required: false
+    type: str
+    choices: ['modificar', 'generar']
+    default: "modificar"
   hoja:
     description:
       - Nombre de la hoja donde se desea escribir. Si se omite, se usará la hoja activa.
+      - Con C(modo=generar) es el nombre de la hoja del libro nuevo. Por defecto C(Hoja1).
     required: false
     type: str
   delimitador:
@@ -29,7 +41,7 @@ options:
     type: str
   celda_inicial:
     description:
-      - Celda inicial del rango (por ejemplo, A34). Requiere también C(celda_final).
+      - Celda inicial del rango en notación A1 (por ejemplo, A34, AB34 o $AB$34). Requiere también C(celda_final).
     required: false
     type: str
   celda_final:
@@ -37,12 +49,104 @@ options:
       - Celda final del rango (por ejemplo, J37). Requiere también C(celda_inicial).
     required: false
     type: str
+  rango:
+    description:
+      - Rango donde escribir en lugar de C(celda_inicial) y C(celda_final); una dirección A1 (C(A34:J37)), una dirección
+        con hoja (C(Formulario!A34:J37)) o un rango con nombre definido en el libro. La hoja del rango tiene prioridad sobre C(hoja).
+      - No se puede usar junto con C(delimitador), C(celda_inicial) ni C(celda_final).
+    required: false
+    type: str
   data:
     description:
       - Lista de listas o lista plana con los datos que se van a escribir.
-      - Si se usa el delimitador, debe ser una lista plana. Si se usan rangos, se permite lista de listas.
-    required: true
+      - Una lista plana se escribe como una sola fila.
+      - Con el delimitador, una lista de listas escribe cada fila debajo de la anterior a partir de la celda del
+        delimitador, que se mueve a la fila siguiente a la última escrita.
+      - Con rangos, cada fila se escribe en la siguiente fila vacía del rango.
+      - Se pueden escribir miles de filas en una sola tarea; la hoja se indexa una sola vez por ejecución.
+      - Requerido si no se usa C(operaciones) ni C(origen).
+    required: false
     type: list
+  operaciones:
+    description:
+      - Lista de escrituras a aplicar en una sola ejecución, cada una por delimitador o por rango y posiblemente en distintas hojas.
+      - El libro se carga una sola vez, las operaciones se aplican en orden sobre el libro en memoria y se guarda una sola vez
+        en un archivo temporal que luego reemplaza al original.
+      - Si alguna operación falla, el archivo no se modifica.
+      - Si ninguna celda cambia, el archivo no se guarda y el módulo reporta C(changed=false).
+      - No se puede usar junto con C(data), C(delimitador), C(celda_inicial) ni C(celda_final).
+    required: false
+    type: list
+    elements: dict
+    suboptions:
+      hoja:
+        description: Hoja de la operación. Por defecto la indicada en C(hoja) o la hoja activa.
+        required: false
+        type: str
+      delimitador:
+        description: Delimitador donde escribir los datos. No se puede usar junto con C(celda_inicial) o C(celda_final).
+        required: false
+        type: str
+      celda_inicial:
+        description: Celda inicial del rango. Requiere también C(celda_final).
+        required: false
+        type: str
+      celda_final:
+        description: Celda final del rango. Requiere también C(celda_inicial).
+        required: false
+        type: str
+      rango:
+        description: Rango donde escribir (dirección A1, dirección con hoja o rango con nombre), en lugar de las celdas.
+        required: false
+        type: str
+      data:
+        description: Datos a escribir, con las mismas reglas que C(data).
+        required: true
+        type: list
+  origen:
+    description:
+      - Archivo CSV o JSON lines en el host con las filas a escribir con C(modo=generar). Se lee línea por línea.
+      - En CSV los enteros y decimales simples se escriben como números y los valores vacíos como celdas vacías.
+      - En JSON lines cada línea es una lista (una fila) o un objeto. Los objetos se ordenan según C(encabezado) o
+        según las claves del primero, que se escriben como encabezado si no se usa C(encabezado) ni C(plantilla).
+      - No se puede usar junto con C(data).
+    required: false
+    type: path
+  formato_origen:
+    description:
+      - Formato de C(origen). Por defecto se deduce de la extensión; C(.jsonl) y C(.ndjson) son JSON lines y cualquier otra CSV.
+    required: false
+    type: str
+    choices: ['csv', 'jsonl']
+  encabezado:
+    description:
+      - Fila de títulos a escribir antes de los datos con C(modo=generar).
+      - No se puede usar junto con C(plantilla).
+    required: false
+    type: list
+  plantilla:
+    description:
+      - Libro de Excel desde el que se copian las primeras C(filas_encabezado) filas con sus estilos, el ancho de las
+        columnas y el panel inmovilizado, con C(modo=generar).
+      - Solo se copia el encabezado; la plantilla debe ser un libro pequeño.
+    required: false
+    type: path
+  hoja_plantilla:
+    description:
+      - Hoja de C(plantilla) desde la que se copia el encabezado. Por defecto la hoja activa.
+    required: false
+    type: str
+  filas_encabezado:
+    description:
+      - Cantidad de filas a copiar desde C(plantilla).
+    required: false
+    type: int
+    default: 1
+requirements:
+  - openpyxl >= 3.0, < 3.2
+notes:
+  - El archivo se guarda de forma atómica y solo cuando alguna celda cambió.
+  - En check mode las escrituras se aplican en memoria para reportar C(changed) sin guardar el archivo.
 author:
   - John (@Xploit999)
 '''
@@ -78,111 +182,505 @@ EXAMPLES = r'''
       - ["dato1", "dato2", "dato3"]
       - ["dato4", "dato5", "dato6"]
       - ["dato7", "dato8", "dato9"]
+
+# Llenar un formulario completo con una sola carga y un solo guardado del libro
+- name: Escribir varias operaciones
+  mod_excel:
+    ruta: "/ruta/al/formulario.xlsx"
+    hoja: "Formulario"
+    operaciones:
+      - delimitador: "*/"
+        data: ["valor1", "valor2"]
+      - celda_inicial: "A34"
+        celda_final: "J37"
+        data:
+          - ["dato1", "dato2", "dato3"]
+      - hoja: "Anexo"
+        delimitador: "#fin"
+        data: ["observación"]
+      - rango: "Firmas"
+        data: ["Responsable", "Fecha"]
+
+# Generar un reporte grande desde un CSV con el encabezado de una plantilla
+- name: Generar reporte
+  mod_excel:
+    ruta: "/ruta/al/reporte.xlsx"
+    modo: generar
+    hoja: "Ventas"
+    origen: "/ruta/al/ventas.csv"
+    plantilla: "/ruta/a/la/plantilla.xlsx"
+    filas_encabezado: 2
+
+# Generar un libro desde datos del playbook
+- name: Generar libro simple
+  mod_excel:
+    ruta: "/ruta/al/resumen.xlsx"
+    modo: generar
+    encabezado: ["servidor", "estado"]
+    data: "{{ resumen }}"
+
+# Agregar todos los registros del día antes del delimitador
+- name: Escribir múltiples filas con delimitador
+  mod_excel:
+    ruta: "/ruta/al/archivo.xlsx"
+    hoja: "Registros"
+    delimitador: "*/"
+    data: "{{ registros_del_dia }}"
+'''
+
+RETURN = r'''
+msg:
+  description: Mensaje con el resultado de la operación.
+  type: str
+  returned: success
+  sample: "El archivo se modificó correctamente."
+filas_escritas:
+  description:
+    - Cantidad de filas escritas en la hoja.
+    - Con C(modo=generar) no incluye las filas copiadas de C(plantilla) ni C(encabezado).
+  type: int
+  returned: cuando no se usa C(operaciones)
+  sample: 3
+operaciones:
+  description:
+    - Estado de cada operación en el orden recibido; C(indice), C(hoja), C(changed), C(failed), C(filas_escritas)
+      y C(celdas_modificadas), o C(msg) si falló.
+  type: list
+  elements: dict
+  returned: cuando se usa C(operaciones)
+  sample: [{"indice": 0, "hoja": "Formulario", "changed": true, "failed": false, "filas_escritas": 1, "celdas_modificadas": 3}]
 '''
+import csv
+import json
+import os
+import re
+import tempfile
+from copy import copy
+
 import openpyxl
+from openpyxl.cell import WriteOnlyCell
 from ansible.module_utils.basic import AnsibleModule
 
+from ansible_collections.xploit9999.utilidades.plugins.module_utils.celdas import parsear_celda, resolver_rango
+
+MODOS = ['modificar', 'generar']
+FORMATOS_ORIGEN = ['csv', 'jsonl']
+PATRON_NUMERO = re.compile(r'^-?(0|[1-9]\d*)(\.\d+)?$')
+
+def celdas_existentes(sheet):
+    """Itera (fila, columna, valor) de las celdas de la hoja que tienen algún valor.
+
+    Con openpyxl 3.0 y 3.1 se recorre el diccionario interno C(_cells), que solo contiene las celdas que existen en
+    el archivo. Si una versión futura no lo tiene, se recorre el rectángulo de la hoja con C(iter_rows()).
+    """
+
+    celdas = getattr(sheet, '_cells', None)
+    if isinstance(celdas, dict):
+        for (fila, columna), celda in celdas.items():
+            if celda.value is not None and celda.value != "":
+                yield fila, columna, celda.value
+        return
+
+    filas = sheet.iter_rows(min_row=sheet.min_row, max_row=sheet.max_row, min_col=sheet.min_column, values_only=True)
+    for fila, valores in enumerate(filas, start=sheet.min_row):
+        for columna, valor in enumerate(valores, start=sheet.min_column):
+            if valor is not None and valor != "":
+                yield fila, columna, valor
+
+def indexar_hoja(sheet, delimitador=None, col_inicio=None, col_fin=None):
+    """Recorre una sola vez las celdas existentes de la hoja.
+
+    Retorna la posición (fila, columna) del primer delimitador en orden de lectura y el conjunto de filas
+    con algún valor entre C(col_inicio) y C(col_fin). Solo se visitan las celdas que existen en el archivo,
+    sin crear las celdas vacías del rectángulo que ocupa la hoja como hace C(iter_rows()).
+    """
+
+    posicion = None
+    filas_ocupadas = set()
+
+    for fila, columna, valor in celdas_existentes(sheet):
+        if delimitador is not None and valor == delimitador and (posicion is None or (fila, columna) < posicion):
+            posicion = (fila, columna)
+
+        if col_inicio is not None and col_inicio <= columna <= col_fin:
+            filas_ocupadas.add(fila)
+
+    return posicion, filas_ocupadas
+
 def busca_delimitador(sheet, delimitador):
-    for row in sheet.iter_rows():
-        for cell in row:
-            if cell.value == delimitador:
-                return cell
-    return None
-
-def celda_a_fila_columna(celda):
-    col = ord(celda[0].upper()) - ord('A') + 1
-    row = int(celda[1:])
-    return row, col
-
-def es_fila_vacia(sheet, fila, col_inicio, col_fin):
-    for col in range(col_inicio, col_fin + 1):
-        if sheet.cell(row=fila, column=col).value not in [None, ""]:
-            return False
-    return True
-
-def escribir_datos_en_rango(sheet, celda_inicial, celda_final, data):
-    fila_ini, col_ini = celda_a_fila_columna(celda_inicial)
-    fila_fin, col_fin = celda_a_fila_columna(celda_final)
-    
+    posicion, _ = indexar_hoja(sheet, delimitador)
+    if posicion is None:
+        return None
+    return sheet.cell(row=posicion[0], column=posicion[1])
+
+def escribir_fila(sheet, fila, col_inicio, valores, col_fin=None):
+    """Escribe los valores hacia la derecha desde C(col_inicio). Retorna la cantidad de celdas cuyo valor cambió."""
+
+    cambios = 0
+    for offset, value in enumerate(valores):
+        col_actual = col_inicio + offset
+        if col_fin is not None and col_actual > col_fin:
+            break
+        celda = sheet.cell(row=fila, column=col_actual)
+        if celda.value == value or (celda.value in (None, "") and value in (None, "")):
+            continue
+        celda.value = value
+        cambios += 1
+    return cambios
+
+def escribir_en_delimitador(sheet, delimitador, data):
+    """Escribe las filas desde la celda del delimitador hacia abajo y mueve el delimitador a la fila siguiente.
+
+    Retorna la cantidad de filas escritas y de celdas modificadas; lanza ValueError si no se encontró el delimitador.
+    """
+
+    celda = busca_delimitador(sheet, delimitador)
+    if celda is None:
+        raise ValueError(f"Delimitador '{delimitador}' no encontrado.")
+
+    row, col = celda.row, celda.column
+    celda.value = None
+    cambios = 1
+
+    for offset, valores in enumerate(data):
+        cambios += escribir_fila(sheet, row + offset, col, valores)
+
+    cambios += escribir_fila(sheet, row + len(data), col, [delimitador])
+    return len(data), cambios
+
+def escribir_datos_en_rango(sheet, rango, data):
+    """Escribe cada fila de C(data) en la siguiente fila vacía del rango.
+
+    Las filas ocupadas se obtienen de un único índice de la hoja, por lo que el costo crece con la cantidad
+    de filas escritas y no con el tamaño del rango. Retorna la cantidad de filas escritas y de celdas modificadas.
+    """
+
+    fila_ini, col_ini = rango['fila_inicial'], rango['columna_inicial']
+    fila_fin, col_fin = rango['fila_final'], rango['columna_final']
+
+    _, filas_ocupadas = indexar_hoja(sheet, col_inicio=col_ini, col_fin=col_fin)
+
     datos_escritos = 0
+    cambios = 0
 
     for fila in range(fila_ini, fila_fin + 1):
         if datos_escritos >= len(data):
             break
 
-        if es_fila_vacia(sheet, fila, col_ini, col_fin):
-            for offset, value in enumerate(data[datos_escritos]):
-                col_actual = col_ini + offset
-                if col_actual <= col_fin:
-                    sheet.cell(row=fila, column=col_actual).value = value
+        if fila not in filas_ocupadas:
+            cambios += escribir_fila(sheet, fila, col_ini, data[datos_escritos], col_fin)
             datos_escritos += 1
 
-    return datos_escritos
+    return datos_escritos, cambios
+
+def aplicar_operacion(workbook, operacion):
+    """Aplica una escritura (por delimitador o por rango) sobre el libro en memoria.
+
+    Retorna el estado de la operación; lanza ValueError si la operación no se puede aplicar.
+    """
+
+    hoja = operacion.get('hoja')
+    delimitador = operacion.get('delimitador')
+    celda_inicial = operacion.get('celda_inicial')
+    celda_final = operacion.get('celda_final')
+    referencia = operacion.get('rango')
+    data = operacion['data']
+
+    if delimitador and (celda_inicial or celda_final or referencia):
+        raise ValueError("No se puede usar 'delimitador' con 'celda_inicial', 'celda_final' o 'rango'.")
+    if referencia and (celda_inicial or celda_final):
+        raise ValueError("No se puede usar 'rango' con 'celda_inicial' o 'celda_final'.")
+
+    rango = None
+    if referencia:
+        rango = resolver_rango(workbook, referencia, hoja)
+        hoja = rango['hoja']
+    elif not delimitador:
+        if not celda_inicial or not celda_final:
+            raise ValueError("Debe especificar 'celda_inicial' y 'celda_final' (o 'rango') si no se usa 'delimitador'.")
+
+        fila_inicial, columna_inicial = parsear_celda(celda_inicial)
+        fila_final, columna_final = parsear_celda(celda_final)
+        rango = {
+            'fila_inicial': fila_inicial,
+            'columna_inicial': columna_inicial,
+            'fila_final': fila_final,
+            'columna_final': columna_final,
+        }
+
+    if hoja and hoja not in workbook.sheetnames:
+        raise ValueError(f"La hoja '{hoja}' no existe.")
+
+    sheet = workbook[hoja] if hoja else workbook.active
+
+    if not data:
+        raise ValueError("'data' no puede estar vacío.")
+
+    if not isinstance(data[0], list):
+        data = [data]
+
+    estado = {'hoja': sheet.title, 'advertencia': None}
+
+    if delimitador:
+        filas_escritas, cambios = escribir_en_delimitador(sheet, delimitador, data)
+
+    else:
+        filas_escritas, cambios = escribir_datos_en_rango(sheet, rango, data)
+        if filas_escritas == 0:
+            raise ValueError("No se encontraron filas vacías en el rango para escribir datos.")
+        if filas_escritas < len(data):
+            estado['advertencia'] = f"Solo {filas_escritas} de {len(data)} filas cupieron en las filas vacías del rango."
+
+    estado.update(changed=cambios > 0, filas_escritas=filas_escritas, celdas_modificadas=cambios)
+    return estado
+
+def guardar_atomico(modulo, workbook, ruta):
+    """Guarda el libro en un archivo temporal del mismo directorio y lo mueve sobre el original."""
+
+    descriptor, temporal = tempfile.mkstemp(dir=os.path.dirname(os.path.abspath(ruta)), prefix=f".{os.path.basename(ruta)}.", suffix='.tmp')
+    os.close(descriptor)
+
+    try:
+        workbook.save(temporal)
+        modulo.atomic_move(temporal, os.path.abspath(ruta))
+    finally:
+        if os.path.exists(temporal):
+            os.unlink(temporal)
 
 def modificar_excel(modulo):
+    """Aplica todas las operaciones sobre una sola carga del libro y lo guarda una sola vez.
+
+    Si alguna operación falla el archivo no se modifica. Solo se guarda si alguna celda cambió.
+    """
+
     ruta = modulo.params['ruta']
-    hoja = modulo.params.get('hoja')
-    delimitador = modulo.params.get('delimitador')
-    data = modulo.params['data']
-    celda_inicial = modulo.params.get('celda_inicial')
-    celda_final = modulo.params.get('celda_final')
+    lote = modulo.params['operaciones'] is not None
 
-    if delimitador and (celda_inicial or celda_final):
-        modulo.fail_json(msg="No se puede usar 'delimitador' con 'celda_inicial' o 'celda_final'.")
+    if lote:
+        operaciones = [dict(operacion, hoja=operacion['hoja'] or modulo.params.get('hoja')) for operacion in modulo.params['operaciones']]
+    else:
+        operaciones = [{
+            'hoja': modulo.params.get('hoja'),
+            'delimitador': modulo.params.get('delimitador'),
+            'celda_inicial': modulo.params.get('celda_inicial'),
+            'celda_final': modulo.params.get('celda_final'),
+            'rango': modulo.params.get('rango'),
+            'data': modulo.params['data'],
+        }]
 
     try:
         workbook = openpyxl.load_workbook(ruta)
-        sheet = workbook[hoja] if hoja else workbook.active
+        estados = []
 
-        if delimitador:
-            celda = busca_delimitador(sheet, delimitador)
-            if not celda:
-                modulo.fail_json(msg=f"Delimitador '{delimitador}' no encontrado.")
+        for indice, operacion in enumerate(operaciones):
+            try:
+                estado = aplicar_operacion(workbook, operacion)
+            except ValueError as error:
+                if not lote:
+                    modulo.fail_json(msg=str(error))
+                estados.append({'indice': indice, 'hoja': operacion['hoja'] or workbook.active.title, 'failed': True, 'changed': False, 'msg': str(error)})
+                modulo.fail_json(
+                    msg=f"La operación {indice} falló, no se modificó el archivo: {str(error)}",
+                    operaciones=estados,
+                )
 
-            col = celda.column
-            row = celda.row
+            advertencia = estado.pop('advertencia')
+            if advertencia:
+                modulo.warn(advertencia if not lote else f"Operación {indice}: {advertencia}")
 
-            sheet.cell(row=row, column=col).value = None
+            estados.append(dict(estado, indice=indice, failed=False))
 
-            for i, val in enumerate(data):
-                sheet.cell(row=row, column=col + i).value = val
+        changed = any(estado['changed'] for estado in estados)
 
-            sheet.cell(row=row + 1, column=col).value = delimitador
+        if changed and not modulo.check_mode:
+            guardar_atomico(modulo, workbook, ruta)
 
-        else:
-            if not celda_inicial or not celda_final:
-                modulo.fail_json(msg="Debe especificar 'celda_inicial' y 'celda_final' si no se usa 'delimitador'.")
+        msg = "El archivo se modificó correctamente." if changed else "El archivo ya contenía los datos."
+
+        if lote:
+            modulo.exit_json(changed=changed, msg=msg, operaciones=estados)
+        modulo.exit_json(changed=changed, msg=msg, filas_escritas=estados[0]['filas_escritas'])
+
+    except Exception as e:
+        modulo.fail_json(msg=str(e))
+
+def valor_csv(valor):
+    """Convierte a número los valores numéricos de un CSV; los valores vacíos quedan como celdas vacías.
+
+    Solo se convierten enteros y decimales simples, para no alterar códigos con ceros a la izquierda.
+    """
 
-            if not isinstance(data[0], list):
-                data = [data]  
+    if valor == "":
+        return None
+    if PATRON_NUMERO.match(valor):
+        return float(valor) if '.' in valor else int(valor)
+    return valor
 
-            filas_escritas = escribir_datos_en_rango(sheet, celda_inicial, celda_final, data)
-            if filas_escritas == 0:
-                modulo.fail_json(msg="No se encontraron filas vacías en el rango para escribir datos.")
+def filas_origen(ruta, formato, columnas=None, escribir_columnas=False):
+    """Genera las filas del archivo de origen línea por línea, sin cargarlo completo en memoria.
 
-        workbook.save(ruta)
-        modulo.exit_json(changed=True, msg="El archivo se modificó correctamente.")
+    En JSON lines cada línea puede ser una lista (una fila) o un objeto; los objetos se ordenan según C(columnas)
+    o, si no se indican, según las claves del primero, que se escriben como encabezado si C(escribir_columnas).
+    """
+
+    with open(ruta, newline='', encoding='utf-8') as archivo:
+        if formato == 'csv':
+            for fila in csv.reader(archivo):
+                yield [valor_csv(valor) for valor in fila]
+            return
+
+        for numero, linea in enumerate(archivo, start=1):
+            if not linea.strip():
+                continue
+
+            try:
+                registro = json.loads(linea)
+            except ValueError as error:
+                raise ValueError(f"Línea {numero} de '{ruta}' no es JSON válido: {error}")
+
+            if isinstance(registro, dict):
+                if columnas is None:
+                    columnas = list(registro)
+                    if escribir_columnas:
+                        yield columnas
+                yield [registro.get(columna) for columna in columnas]
+            else:
+                yield registro
+
+def copiar_encabezado(hoja, plantilla, hoja_plantilla, filas):
+    """Copia las primeras filas de la plantilla con sus estilos, el ancho de las columnas y el panel inmovilizado."""
+
+    libro = openpyxl.load_workbook(plantilla)
+    origen = libro[hoja_plantilla] if hoja_plantilla else libro.active
+
+    for letra, dimension in origen.column_dimensions.items():
+        if dimension.width:
+            hoja.column_dimensions[letra].width = dimension.width
+
+    if origen.freeze_panes:
+        hoja.freeze_panes = origen.freeze_panes
+
+    for fila in origen.iter_rows(min_row=1, max_row=filas):
+        celdas = []
+        for celda in fila:
+            nueva = WriteOnlyCell(hoja, value=celda.value)
+            if celda.has_style:
+                nueva.font = copy(celda.font)
+                nueva.fill = copy(celda.fill)
+                nueva.border = copy(celda.border)
+                nueva.alignment = copy(celda.alignment)
+                nueva.protection = copy(celda.protection)
+                nueva.number_format = celda.number_format
+            celdas.append(nueva)
+        hoja.append(celdas)
+
+    libro.close()
+
+def generar_excel(modulo):
+    """Genera un libro nuevo en modo solo escritura, agregando las filas a medida que se leen.
+
+    La memoria se mantiene constante sin importar la cantidad de filas; el archivo se escribe en un temporal
+    que luego reemplaza a C(ruta).
+    """
+
+    ruta = modulo.params['ruta']
+    origen = modulo.params['origen']
+    plantilla = modulo.params['plantilla']
+    encabezado = modulo.params['encabezado']
+
+    for opcion in ('delimitador', 'celda_inicial', 'celda_final', 'rango', 'operaciones'):
+        if modulo.params.get(opcion) is not None:
+            modulo.fail_json(msg=f"'{opcion}' no se puede usar con 'modo: generar'.")
+
+    for archivo in (origen, plantilla):
+        if archivo and not os.path.exists(archivo):
+            modulo.fail_json(msg=f"El archivo no existe en la ruta: {archivo}")
+
+    if modulo.check_mode:
+        modulo.exit_json(changed=True, msg="El archivo sería generado (check mode).")
+
+    try:
+        workbook = openpyxl.Workbook(write_only=True)
+        hoja = workbook.create_sheet(title=modulo.params.get('hoja') or 'Hoja1')
+
+        if plantilla:
+            copiar_encabezado(hoja, plantilla, modulo.params['hoja_plantilla'], modulo.params['filas_encabezado'])
+        elif encabezado:
+            hoja.append(encabezado)
+
+        if origen:
+            formato = modulo.params['formato_origen'] or ('jsonl' if origen.lower().endswith(('.jsonl', '.ndjson')) else 'csv')
+            filas = filas_origen(origen, formato, encabezado, escribir_columnas=not (plantilla or encabezado))
+        else:
+            data = modulo.params['data']
+            filas = data if data and isinstance(data[0], list) else [data]
+
+        filas_escritas = 0
+        for fila in filas:
+            hoja.append(fila)
+            filas_escritas += 1
+
+        guardar_atomico(modulo, workbook, ruta)
+        modulo.exit_json(changed=True, msg="El archivo se generó correctamente.", filas_escritas=filas_escritas)
 
     except Exception as e:
         modulo.fail_json(msg=str(e))
 
 def iniciar_proceso():
+    operacion = dict(
+        hoja=dict(type='str', required=False, default=None),
+        delimitador=dict(type='str', required=False, default=None),
+        celda_inicial=dict(type='str', required=False, default=None),
+        celda_final=dict(type='str', required=False, default=None),
+        rango=dict(type='str', required=False, default=None),
+        data=dict(type='list', required=True)
+    )
+
     argumentos = dict(
         ruta=dict(type='str', required=True),
+        modo=dict(type='str', required=False, choices=MODOS, default='modificar'),
         hoja=dict(type='str', required=False),
         delimitador=dict(type='str', required=False, default=None),
-        data=dict(type='list', required=True),
+        data=dict(type='list', required=False, default=None),
         celda_inicial=dict(type='str', required=False, default=None),
-        celda_final=dict(type='str', required=False, default=None)
+        celda_final=dict(type='str', required=False, default=None),
+        rango=dict(type='str', required=False, default=None),
+        operaciones=dict(type='list', elements='dict', required=False, default=None, options=operacion),
+        origen=dict(type='path', required=False, default=None),
+        formato_origen=dict(type='str', required=False, choices=FORMATOS_ORIGEN, default=None),
+        encabezado=dict(type='list', required=False, default=None),
+        plantilla=dict(type='path', required=False, default=None),
+        hoja_plantilla=dict(type='str', required=False, default=None),
+        filas_encabezado=dict(type='int', required=False, default=1)
     )
 
     modulo = AnsibleModule(
         argument_spec=argumentos,
+        required_if=[
+            ('modo', 'modificar', ('data', 'operaciones'), True),
+            ('modo', 'generar', ('data', 'origen'), True),
+        ],
+        mutually_exclusive=[
+            ('operaciones', 'data'),
+            ('operaciones', 'delimitador'),
+            ('operaciones', 'celda_inicial'),
+            ('operaciones', 'celda_final'),
+            ('operaciones', 'rango'),
+            ('rango', 'delimitador'),
+            ('rango', 'celda_inicial'),
+            ('rango', 'celda_final'),
+            ('origen', 'data'),
+            ('plantilla', 'encabezado'),
+        ],
         supports_check_mode=True
     )
 
-    if modulo.check_mode:
-        modulo.exit_json(changed=False)
+    if modulo.params['modo'] == 'generar':
+        generar_excel(modulo)
+
+    for opcion in ('origen', 'plantilla', 'encabezado'):
+        if modulo.params.get(opcion) is not None:
+            modulo.fail_json(msg=f"'{opcion}' solo se puede usar con 'modo: generar'.")
 
     modificar_excel(modulo)
 
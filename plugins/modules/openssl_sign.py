@@ -4,9 +4,11 @@
 DOCUMENTATION = r'''
 ---
 module: openssl_sign
-short_description: Firma contenido o archivos usando OpenSSL a través de un script bash.
+short_description: Firma contenido o archivos con una llave privada.
 description:
-  - Este módulo permite firmar un texto o archivo usando el comando OpenSSL.
+  - Este módulo permite firmar un texto o archivo con una llave privada PEM (RSA, EC, Ed25519 o Ed448).
+  - Por defecto firma en proceso con la librería C(cryptography), sin ejecutar OpenSSL ni crear archivos temporales.
+  - Si la librería no está instalada, firma con el comando OpenSSL a través de un script bash.
   - Soporta métodos de firma con "dgst" o "pkeyutl" y varios algoritmos hash.
 options:
   content:
@@ -19,8 +21,32 @@ options:
     description:
       - Ruta a archivo cuyo contenido será firmado.
       - No puede usarse junto con content.
+      - Con llaves RSA o EC el archivo se recorre por bloques sobre un mapeo en memoria y se firma el digest,
+        por lo que la memoria utilizada no crece con el tamaño del archivo.
+      - El avance del hash de archivos de más de 1 GiB se registra en el log del sistema cada 10%.
     required: false
     type: str
+  items:
+    description:
+      - Lista de textos y archivos a firmar en una sola ejecución; la llave se lee e interpreta una sola vez.
+      - Los elementos se firman en paralelo con C(workers) hilos.
+      - No puede usarse junto con content ni path.
+    required: false
+    type: list
+    elements: dict
+    suboptions:
+      name:
+        description: Clave del elemento en C(signatures). Por defecto la ruta o el texto.
+        required: false
+        type: str
+      content:
+        description: Texto a firmar.
+        required: false
+        type: str
+      path:
+        description: Ruta a archivo cuyo contenido será firmado.
+        required: false
+        type: str
   algorithm:
     description:
       - Algoritmo hash usado para la firma (ej: sha256, md5).
@@ -32,13 +58,44 @@ options:
       - Ruta al archivo con la clave privada para firmar.
     required: true
     type: str
+  passphrase:
+    description:
+      - Contraseña de la clave privada, si está cifrada.
+    required: false
+    type: str
   signed_with:
     description:
       - Comando OpenSSL para firmar, puede ser "dgst" o "pkeyutl".
+      - Con "pkeyutl" se calcula el hash del contenido con C(algorithm) y se firma el digest, por lo que la firma
+        es equivalente a la de "dgst".
     required: false
     type: str
     choices: ['dgst', 'pkeyutl']
     default: 'dgst'
+  engine:
+    description:
+      - Forma de firmar.
+      - C(auto) firma con C(cryptography) y, si la librería no está instalada, con OpenSSL.
+      - C(cryptography) firma en proceso y falla si la librería no está instalada.
+      - C(openssl) ejecuta el script bash con el comando OpenSSL.
+    required: false
+    type: str
+    choices: ['auto', 'cryptography', 'openssl']
+    default: 'auto'
+  workers:
+    description:
+      - Número de hilos usados para firmar C(items) con el motor C(cryptography).
+      - Por defecto el número de CPUs, hasta 8.
+    required: false
+    type: int
+  return_digest:
+    description:
+      - Retorna también el digest hexadecimal del contenido firmado y su tamaño en bytes.
+    required: false
+    type: bool
+    default: false
+requirements:
+  - cryptography (opcional, para firmar sin ejecutar OpenSSL)
 author:
   - John Freidman (@xploit9999)
 '''
@@ -56,6 +113,33 @@ EXAMPLES = r'''
     algorithm: "sha512"
     privatekey: "/ruta/a/mi_key.pem"
     signed_with: "pkeyutl"
+
+- name: Firmar un respaldo de varios GB y obtener su digest
+  xploit9999.utilidades.openssl_sign:
+    path: "/backups/respaldo.tar.gz"
+    algorithm: "sha512"
+    privatekey: "/ruta/a/mi_key.pem"
+    return_digest: true
+  register: respaldo
+
+- name: Firmar los artefactos de un manifiesto con una llave cifrada
+  xploit9999.utilidades.openssl_sign:
+    items:
+      - path: "/srv/artefactos/app-1.0.tar.gz"
+      - path: "/srv/artefactos/app-1.0.rpm"
+      - name: "manifiesto"
+        content: "{{ lookup('file', 'manifiesto.json') }}"
+    algorithm: "sha256"
+    privatekey: "/ruta/a/mi_key.pem"
+    passphrase: "{{ clave_llave }}"
+  register: firmas
+
+- name: Firmar siempre con el comando OpenSSL
+  xploit9999.utilidades.openssl_sign:
+    content: "Este es mi texto a firmar"
+    algorithm: "sha256"
+    privatekey: "/ruta/a/mi_key.pem"
+    engine: "openssl"
 '''
 
 RETURN = r'''
@@ -63,6 +147,49 @@ signature:
   description: Firma generada en base64 URL-safe (sin signos +/=).
   type: str
   returned: success
+sig:
+  description: Igual a C(signature); se mantiene por compatibilidad con los playbooks existentes.
+  type: str
+  returned: success
+digest:
+  description: Digest hexadecimal del contenido firmado, calculado con C(algorithm).
+  type: str
+  returned: cuando return_digest es true y no se usa items
+size:
+  description: Tamaño en bytes del contenido firmado.
+  type: int
+  returned: cuando return_digest es true y no se usa items
+digests:
+  description: C(digest) y C(size) de cada elemento de C(items), con la misma clave que C(signatures).
+  type: dict
+  returned: cuando return_digest es true y se usa items
+signatures:
+  description: Firma de cada elemento de C(items), con C(name) (o la ruta o el texto) como clave.
+  type: dict
+  returned: cuando se usa items
+  sample: {"/backups/app.tar.gz": "kq3V...", "manifiesto": "Xb9c..."}
+performance:
+  description: Métricas de la firma de C(items).
+  type: dict
+  returned: cuando se usa items
+  contains:
+    signatures:
+      description: Número de firmas generadas.
+      type: int
+    seconds:
+      description: Segundos empleados en firmar, incluida la carga de la llave.
+      type: float
+    signatures_per_second:
+      description: Firmas por segundo.
+      type: float
+    workers:
+      description: Hilos utilizados.
+      type: int
+engine:
+  description: Motor con el que se firmó, C(cryptography) u C(openssl).
+  type: str
+  returned: success
+  sample: cryptography
 changed:
   description: Si la operación realizó una firma
   type: bool
@@ -73,62 +200,250 @@ failed:
   returned: always
 '''
 
-from ansible.module_utils.basic import AnsibleModule
+import hashlib
+import json
+import os
+import shlex
 import subprocess
 import tempfile
-import os
-import json
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from ansible.module_utils.basic import AnsibleModule, missing_required_lib
+
+from ansible_collections.xploit9999.utilidades.plugins.module_utils.firmas import (
+    ALGORITMOS,
+    METODOS,
+    ErrorFirma,
+    b64url,
+    cargar_llave,
+    digest_archivo,
+    firmar,
+    firmar_archivo,
+)
+
+MOTORES = ['auto', 'cryptography', 'openssl']
+UMBRAL_PROGRESO = 1024 ** 3
+
+def normalizar_firma(firma):
+    """Convierte una firma en base64 estándar a base64 URL-safe sin relleno."""
+
+    return firma.strip().replace('+', '-').replace('/', '_').rstrip('=')
+
+def seguimiento(module, nombre):
+    """Retorna una función que registra en el log del sistema el avance del hash de archivos grandes."""
+
+    avance = dict(ultimo=0)
+
+    def progreso(procesados, total):
+        if total < UMBRAL_PROGRESO:
+            return
+        porcentaje = procesados * 100 // total
+        if porcentaje >= avance['ultimo'] + 10:
+            avance['ultimo'] = porcentaje - porcentaje % 10
+            module.log(f"openssl_sign: {nombre} {porcentaje}% ({procesados} de {total} bytes)")
+
+    return progreso
+
+def digest_elemento(elemento, algorithm, progreso=None):
+    """Calcula el digest (hexadecimal) y el tamaño en bytes del contenido de un elemento."""
+
+    if elemento['content']:
+        datos = elemento['content'].encode('utf-8')
+        return hashlib.new(algorithm, datos).hexdigest(), len(datos)
+
+    digest, tamano = digest_archivo(elemento['path'], algorithm, progreso=progreso)
+    return digest.hex(), tamano
+
+def firmar_elemento(llave, elemento, algorithm, progreso=None):
+    """Firma el C(content) o el archivo C(path) de un elemento con la llave ya cargada.
+
+    Retorna un diccionario con C(signature), C(digest) y C(size).
+    """
+
+    try:
+        if elemento['content']:
+            datos = elemento['content'].encode('utf-8')
+            firma = firmar(llave, datos, algorithm)
+            return dict(signature=b64url(firma), digest=hashlib.new(algorithm, datos).hexdigest(), size=len(datos))
+
+        firma, digest, tamano = firmar_archivo(llave, elemento['path'], algorithm, progreso)
+        return dict(signature=b64url(firma), digest=digest.hex(), size=tamano)
+    except OSError as error:
+        raise ErrorFirma(f"No se pudo firmar '{elemento['name']}': {error.strerror}")
+
+def firmar_nativo(module, elementos, algorithm, privatekey, passphrase, workers):
+    """Firma en proceso con cryptography, cargando la llave una sola vez.
+
+    Los elementos se reparten en un pool de hilos; el hash de los archivos se calcula por bloques y
+    libera el GIL, por lo que varios archivos se procesan en paralelo. Lanza ImportError si la
+    librería no está instalada.
+    """
+
+    llave = cargar_llave(privatekey, passphrase)
+
+    def firmar_uno(elemento):
+        return firmar_elemento(llave, elemento, algorithm, seguimiento(module, elemento['name']))
+
+    if len(elementos) == 1:
+        return {elementos[0]['name']: firmar_uno(elementos[0])}
+
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        resultados = pool.map(firmar_uno, elementos)
+        return dict(zip((elemento['name'] for elemento in elementos), resultados))
+
+def firmar_openssl(module, content, path, algorithm, privatekey, signed_with, passphrase=None):
+    """Firma ejecutando openssl_sign.bash, que recibe los parámetros en un archivo de variables."""
+
+    script_path = os.path.join(os.path.dirname(__file__), 'bash_scripts', 'openssl_sign.bash')
+
+    variables = dict(content=content, path=path, algorithm=algorithm, privatekey=privatekey, signed_with=signed_with)
+
+    with tempfile.NamedTemporaryFile(mode='w', delete=False) as var_file:
+        for nombre, valor in variables.items():
+            if valor:
+                var_file.write(f"{nombre}={shlex.quote(valor)}\n")
+        var_file_path = var_file.name
+
+    entorno = dict(os.environ)
+    if passphrase:
+        entorno['OPENSSL_SIGN_PASSPHRASE'] = passphrase
+
+    try:
+        result = subprocess.run(['bash', script_path, var_file_path], capture_output=True, text=True, check=True, env=entorno)
+    except subprocess.CalledProcessError as e:
+        module.fail_json(msg="Error ejecutando openssl_sign.bash", stdout=e.stdout, stderr=e.stderr, rc=e.returncode)
+    finally:
+        os.unlink(var_file_path)
+
+    output_json = json.loads(result.stdout)
+    if output_json.get("failed", False):
+        module.fail_json(**output_json)
+
+    return normalizar_firma(output_json['sig'])
+
+def validar_elemento(module, elemento):
+    """Valida que el elemento tenga un texto o un archivo existente y completa su nombre."""
+
+    content = elemento.get('content')
+    path = elemento.get('path')
+
+    if not content and not path:
+        module.fail_json(msg="Debes proporcionar 'content' o 'path'.")
+    if content and path:
+        module.fail_json(msg="No puedes usar ambos: 'content' y 'path'.")
+    if content and os.path.isfile(content):
+        module.fail_json(msg="El parámetro 'content' debe contener un texto, no la ruta de un archivo.")
+    if path and not os.path.isfile(path):
+        module.fail_json(msg=f"El archivo indicado en 'path' no existe: {path}")
+
+    elemento['name'] = elemento.get('name') or path or content
 
 def run_module():
     module_args = dict(
         content=dict(type='str', required=False, default=None),
         path=dict(type='str', required=False, default=None),
-        algorithm=dict(type='str', required=True,
-                       choices=['sha1', 'sha224', 'sha256', 'sha384', 'sha512', 'md5']),
-        privatekey=dict(type='str', required=True),
-        signed_with=dict(type='str', required=False, choices=['dgst', 'pkeyutl'], default='dgst'),
+        items=dict(
+            type='list',
+            elements='dict',
+            required=False,
+            default=None,
+            options=dict(
+                name=dict(type='str', required=False),
+                content=dict(type='str', required=False),
+                path=dict(type='str', required=False),
+            ),
+        ),
+        algorithm=dict(type='str', required=True, choices=ALGORITMOS),
+        privatekey=dict(type='str', required=True, no_log=False),
+        passphrase=dict(type='str', required=False, no_log=True),
+        signed_with=dict(type='str', required=False, choices=METODOS, default='dgst'),
+        engine=dict(type='str', required=False, choices=MOTORES, default='auto'),
+        workers=dict(type='int', required=False, default=None),
+        return_digest=dict(type='bool', required=False, default=False),
     )
 
-    module = AnsibleModule(argument_spec=module_args, supports_check_mode=False)
+    module = AnsibleModule(
+        argument_spec=module_args,
+        mutually_exclusive=[('items', 'content'), ('items', 'path')],
+        supports_check_mode=False,
+    )
 
-    content = module.params['content']
-    path = module.params['path']
+    items = module.params['items']
     algorithm = module.params['algorithm']
     privatekey = module.params['privatekey']
+    passphrase = module.params['passphrase']
     signed_with = module.params['signed_with']
+    engine = module.params['engine']
+    workers = module.params['workers']
+    return_digest = module.params['return_digest']
 
-    if not content and not path:
-        module.fail_json(msg="Debes proporcionar 'content' o 'path'.")
-    if content and path:
-        module.fail_json(msg="No puedes usar ambos: 'content' y 'path'.")
+    if items is not None and not items:
+        module.fail_json(msg="'items' debe contener al menos un elemento.")
+    if workers is not None and workers < 1:
+        module.fail_json(msg="'workers' debe ser mayor o igual a 1.")
+    workers = workers or min(8, os.cpu_count() or 1)
 
-    script_dir = os.path.join(os.path.dirname(__file__), '../../bash_scripts')
-    script_path = os.path.join(script_dir, 'openssl_sign.bash')
+    elementos = items or [dict(content=module.params['content'], path=module.params['path'])]
+    for elemento in elementos:
+        validar_elemento(module, elemento)
 
-    with tempfile.NamedTemporaryFile(mode='w', delete=False) as var_file:
-        if content:
-            var_file.write(f"content='{content}'\n")
-        if path:
-            var_file.write(f"path='{path}'\n")
-        var_file.write(f"algorithm='{algorithm}'\n")
-        var_file.write(f"privatekey='{privatekey}'\n")
-        var_file.write(f"signed_with='{signed_with}'\n")
-        var_file_path = var_file.name
+    nombres = [elemento['name'] for elemento in elementos]
+    repetidos = sorted({nombre for nombre in nombres if nombres.count(nombre) > 1})
+    if repetidos:
+        module.fail_json(msg=f"Hay elementos repetidos en 'items'; use 'name' para distinguirlos: {', '.join(repetidos)}")
 
-    try:
-        result = subprocess.run([script_path, var_file_path], capture_output=True, text=True, check=True)
-        output_json = json.loads(result.stdout)
-        os.unlink(var_file_path)
+    if not os.path.isfile(privatekey):
+        module.fail_json(msg=f"El archivo de llave privada {privatekey} no existe.")
 
-        if output_json.get("failed", False):
-            module.fail_json(msg=output_json.get("msg", "Error desconocido"), **output_json)
-        else:
-            module.exit_json(**output_json)
+    inicio = time.monotonic()
+    resultados = None
+    if engine != 'openssl':
+        try:
+            resultados = firmar_nativo(module, elementos, algorithm, privatekey, passphrase, workers)
+            engine = 'cryptography'
+        except ImportError as error:
+            if engine == 'cryptography':
+                module.fail_json(msg=missing_required_lib('cryptography'), exception=str(error))
+        except ErrorFirma as error:
+            module.fail_json(msg=str(error))
+        except Exception as error:
+            module.fail_json(msg=f"Error firmando con cryptography: {error}")
 
-    except subprocess.CalledProcessError as e:
-        if os.path.exists(var_file_path):
-            os.unlink(var_file_path)
-        module.fail_json(msg="Error ejecutando openssl_sign.bash", stdout=e.stdout, stderr=e.stderr, rc=e.returncode)
+    if resultados is None:
+        resultados = {}
+        for elemento in elementos:
+            resultado = dict(signature=firmar_openssl(
+                module, elemento['content'], elemento['path'], algorithm, privatekey, signed_with, passphrase
+            ))
+            if return_digest:
+                resultado['digest'], resultado['size'] = digest_elemento(elemento, algorithm, seguimiento(module, elemento['name']))
+            resultados[elemento['name']] = resultado
+        engine = 'openssl'
+
+    segundos = time.monotonic() - inicio
+
+    if items is None:
+        resultado = resultados[elementos[0]['name']]
+        salida = dict(changed=True, signature=resultado['signature'], sig=resultado['signature'], engine=engine)
+        if return_digest:
+            salida.update(digest=resultado['digest'], size=resultado['size'])
+        module.exit_json(**salida)
+
+    salida = dict(
+        changed=True,
+        signatures={nombre: resultado['signature'] for nombre, resultado in resultados.items()},
+        engine=engine,
+        performance=dict(
+            signatures=len(resultados),
+            seconds=round(segundos, 3),
+            signatures_per_second=round(len(resultados) / segundos, 1) if segundos else None,
+            workers=workers if engine == 'cryptography' else 1,
+        ),
+    )
+    if return_digest:
+        salida['digests'] = {nombre: dict(digest=resultado['digest'], size=resultado['size']) for nombre, resultado in resultados.items()}
+    module.exit_json(**salida)
 
 def main():
     run_module()